@@ -0,0 +1,104 @@
+""" Benchmark of the generation of the dot code of large graphs.
+
+    Generates the dot code of a synthetic graph shaped like a large SoT (5,000
+    entities of a few dozen classes by default, chained by their signals, with
+    some constant inputs), as Graph does, and reports the generation time with
+    and without the html table templates cache (see
+    `dot_data_generator.html_table_template`).
+
+    Usage: python benchmarks/bench_dot_generation.py [nodes_nb] [repeats]
+"""
+from typing import List, Tuple
+from time import perf_counter
+import random
+import sys
+
+from sot_gui import dot_data_generator
+from sot_gui.dot_data_generator import DotDataGenerator, html_table_template
+
+
+def generate_graph(nodes_nb: int, classes_nb: int = 40, seed: int = 0) \
+                   -> Tuple[List[tuple], List[tuple], List[tuple]]:
+    """ Returns the input nodes (name, value), entities (name, label, inputs,
+        outputs) and edges (tail, head, value) of a synthetic graph.
+    """
+    rng = random.Random(seed)
+    classes = []
+    for class_index in range(classes_nb):
+        inputs = [f'sin{i}' for i in range(rng.randint(1, 6))]
+        outputs = [f'sout{i}' for i in range(rng.randint(1, 4))]
+        classes.append((f'Class{class_index}', inputs, outputs))
+
+    input_nodes = []
+    entities = []
+    edges = []
+    for index in range(nodes_nb):
+        (class_name, inputs, outputs) = classes[rng.randrange(classes_nb)]
+        name = f'entity{index}'
+        entities.append((name, f'{class_name}({name})', inputs, outputs))
+        for input_name in inputs:
+            if index > 0 and rng.random() < 0.8:
+                (tail_name, _, _, tail_outputs) = entities[rng.randrange(index)]
+                edges.append(((tail_name, rng.choice(tail_outputs)),
+                              (name, input_name), f'"{rng.random():.3f}"'))
+            else:
+                input_node_name = f'input_{name}_{input_name}'
+                input_nodes.append((input_node_name, f'"{rng.random():.3f}"'))
+                edges.append(((input_node_name, None), (name, input_name),
+                              None))
+    return (input_nodes, entities, edges)
+
+
+def generate_dot_code(input_nodes: List[tuple], entities: List[tuple],
+                      edges: List[tuple]) -> bytes:
+    """ Generates the dot code of a graph, in the same way as Graph. """
+    generator = DotDataGenerator()
+    generator.set_graph_attributes({'rankdir': 'LR', 'ranksep': 0.4})
+    generator.set_edge_attributes({'arrowsize': 0.5})
+    for (name, value) in input_nodes:
+        generator.add_node(name, {'label': value})
+    generator.set_node_attributes({'shape': 'none'})
+    for (name, label, inputs, outputs) in entities:
+        generator.add_html_node(name, (inputs, outputs), label)
+    for (tail, head, value) in edges:
+        generator.add_edge(tail, head,
+                           None if value is None else {'label': value})
+    return generator.get_encoded_dot_string()
+
+
+def measure(graph: tuple, repeats: int) -> Tuple[float, int]:
+    """ Returns the best generation time of the graph's dot code, in seconds,
+        and the size of the code.
+    """
+    best_time = None
+    for _ in range(repeats):
+        start_time = perf_counter()
+        dot_code = generate_dot_code(*graph)
+        duration = perf_counter() - start_time
+        best_time = duration if best_time is None else min(best_time, duration)
+    return (best_time, len(dot_code))
+
+
+def main(nodes_nb: int = 5000, repeats: int = 5) -> None:
+    graph = generate_graph(nodes_nb)
+    (input_nodes, entities, edges) = graph
+    print(f"{len(entities)} entities, {len(input_nodes)} input nodes, "
+          f"{len(edges)} edges")
+
+    # Without the templates cache:
+    dot_data_generator.html_table_template = html_table_template.__wrapped__
+    try:
+        (uncached_time, size) = measure(graph, repeats)
+    finally:
+        dot_data_generator.html_table_template = html_table_template
+    print(f"Without templates cache: {uncached_time * 1000:8.1f} ms "
+          f"({size / 1e6:.1f} MB of dot code)")
+
+    html_table_template.cache_clear()
+    (cached_time, _) = measure(graph, repeats)
+    print(f"With templates cache:    {cached_time * 1000:8.1f} ms "
+          f"({html_table_template.cache_info().currsize} templates)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
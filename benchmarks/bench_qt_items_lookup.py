@@ -0,0 +1,93 @@
+""" Benchmark of the retrieval of the qt items of large graphs.
+
+    Lays out synthetic graphs of increasing sizes with LayeredLayout (see
+    bench_dot_generation.py for their shape), and reports the time taken by
+    JsonToQtGenerator to find the json data of every node, port and edge, as
+    Graph does when generating the qt items. With the generator's indexes,
+    the time per item stays constant as the graph grows.
+
+    The qt items themselves are not created, so that only the lookups are
+    measured, but PySide2 must be installed to import the generator.
+
+    Usage: python benchmarks/bench_qt_items_lookup.py [max_nodes_nb] [repeats]
+"""
+from typing import Tuple
+from time import perf_counter
+import json
+import sys
+
+from sot_gui.json_to_qt_generator import JsonToQtGenerator
+from sot_gui.layered_layout import LayeredLayout
+from sot_gui.graph_ir import LayoutNode, LayoutEdge
+
+from bench_dot_generation import generate_graph
+
+
+def generate_json(nodes_nb: int) -> Tuple[str, tuple]:
+    """ Returns the json layout of a synthetic graph, and the graph. """
+    graph = generate_graph(nodes_nb)
+    (input_nodes, entities, edges) = graph
+    nodes = [LayoutNode(name, value.strip('"'))
+             for (name, value) in input_nodes]
+    nodes += [LayoutNode(name, label, inputs, outputs)
+              for (name, label, inputs, outputs) in entities]
+    layout_edges = [LayoutEdge(tail, head,
+                               None if value is None else value.strip('"'))
+                    for (tail, head, value) in edges]
+    # Serialized, as dot's json output is:
+    return (json.dumps(LayeredLayout().layout(nodes, layout_edges)), graph)
+
+
+def look_up(generator: JsonToQtGenerator, graph: tuple) -> int:
+    """ Finds the json data of every item of the graph, and returns the
+        number of items.
+    """
+    (input_nodes, entities, edges) = graph
+    for (name, _) in input_nodes:
+        generator._get_node_id_per_name(name)
+    for (name, _, inputs, outputs) in entities:
+        generator._get_node_id_per_name(name)
+        for port_name in inputs + outputs:
+            assert (name, port_name) in generator._cell_per_port
+    for ((tail_name, tail_port), (head_name, head_port), _) in edges:
+        edge = generator._get_edge_per_nodes_names(head_name, tail_name,
+                                                   head_port, tail_port)
+        assert edge is not None
+    return (len(input_nodes) + len(edges)
+            + sum(1 + len(inputs) + len(outputs)
+                  for (_, _, inputs, outputs) in entities))
+
+
+def measure(json_string: str, graph: tuple, repeats: int) \
+            -> Tuple[float, float, int]:
+    """ Returns the best times to build a generator (indexes included) and to
+        look up all the items, in seconds, and the number of items.
+    """
+    best_init_time = best_lookup_time = None
+    for _ in range(repeats):
+        start_time = perf_counter()
+        generator = JsonToQtGenerator(json_string)
+        init_time = perf_counter() - start_time
+        start_time = perf_counter()
+        items_nb = look_up(generator, graph)
+        lookup_time = perf_counter() - start_time
+        best_init_time = min(init_time, best_init_time or init_time)
+        best_lookup_time = min(lookup_time, best_lookup_time or lookup_time)
+    return (best_init_time, best_lookup_time, items_nb)
+
+
+def main(max_nodes_nb: int = 4000, repeats: int = 3) -> None:
+    nodes_nb = max(max_nodes_nb // 8, 1)
+    while nodes_nb <= max_nodes_nb:
+        (json_string, graph) = generate_json(nodes_nb)
+        (init_time, lookup_time, items_nb) = measure(json_string, graph,
+                                                     repeats)
+        print(f"{nodes_nb:6} entities, {items_nb:7} items: "
+              f"init {init_time * 1000:8.1f} ms, "
+              f"lookups {lookup_time * 1000:8.1f} ms "
+              f"({lookup_time / items_nb * 1e6:.2f} us per item)")
+        nodes_nb *= 2
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,82 @@
+from typing import Any, Dict
+from collections import deque
+from threading import Lock
+from math import ceil
+import json
+
+
+class CallStats:
+    """ Statistics on the calls of several operations (e.g the kernel
+        commands sent by DynamicGraphCommunication, or the stages of a graph
+        refresh): number of calls, latency and payload size, per operation
+        name.
+
+        The statistics can be recorded from several threads.
+
+        Constructor argument:
+        - `samples_nb`: number of latest latencies kept per operation, to
+          compute their 95th percentile
+    """
+
+    def __init__(self, samples_nb: int = 1000):
+        self._samples_nb = samples_nb
+        # Data recorded per operation name:
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+
+
+    def record(self, name: str, duration: float, payload_size: int = 0) \
+               -> None:
+        """ Records a call of an operation.
+
+            Args:
+                name: name of the operation.
+                duration: duration of the call, in seconds.
+                payload_size: size of the data transferred by the call, in
+                    bytes.
+        """
+        with self._lock:
+            calls = self._calls.get(name)
+            if calls is None:
+                calls = dict(count = 0, total_time = 0., payload_size = 0,
+                             durations = deque(maxlen=self._samples_nb))
+                self._calls[name] = calls
+            calls['count'] += 1
+            calls['total_time'] += duration
+            calls['payload_size'] += payload_size
+            calls['durations'].append(duration)
+
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """ Returns the statistics, as a dictionary whose keys are the
+            operations' names, and whose values are dictionaries containing:
+            - `calls`: number of calls
+            - `total_time`: total duration of the calls, in seconds
+            - `mean_time`: mean duration of a call, in seconds
+            - `p95_time`: 95th percentile of the duration of the latest calls,
+              in seconds
+            - `payload_size`: total size of the data transferred, in bytes
+        """
+        with self._lock:
+            stats = {}
+            for (name, calls) in sorted(self._calls.items()):
+                durations = sorted(calls['durations'])
+                p95_index = max(0, ceil(len(durations) * 0.95) - 1)
+                stats[name] = dict(
+                    calls = calls['count'],
+                    total_time = calls['total_time'],
+                    mean_time = calls['total_time'] / calls['count'],
+                    p95_time = durations[p95_index],
+                    payload_size = calls['payload_size'],
+                )
+            return stats
+
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+
+
+    def to_json(self) -> str:
+        """ Returns the statistics (see `get_stats`) as a JSON string. """
+        return json.dumps(self.get_stats(), indent=4)
@@ -1,4 +1,12 @@
-from typing import Dict, Tuple, List, Any
+from __future__ import annotations
+from typing import Dict, Tuple, List, Any, BinaryIO, Iterator
+from math import ceil
+from functools import lru_cache
+from html import escape
+
+from sot_gui.html_table_geometry import html_table_rows, LABEL
+from sot_gui.graph_ir import GraphIR, ELLIPSE_NODE, TABLE_NODE
+from sot_gui.utils import quoted
 
 
 # Graphviz documentation:
@@ -8,21 +16,90 @@ from typing import Dict, Tuple, List, Any
 # Interactive tool to test dot code's output (xdot, json, svg...):
 # https://dreampuf.github.io/GraphvizOnline/
 
+# Approximate size of the blocks of utf-8 encoded dot code written by
+# `DotDataGenerator.write`, in characters:
+WRITE_BLOCK_SIZE = 1 << 16
+
+# Maximum number of html table templates kept in memory (see
+# `html_table_template`):
+HTML_TEMPLATES_CACHE_SIZE = 1024
+
+# Placeholder of the label in the html table templates:
+_LABEL_MARK = '\0'
+
 
 class DotDataGenerator:
-    """ This class allows to generate dot code through a simple API. """
+    """ This class allows to generate dot code through a simple API.
+
+        The code is stored as a list of chunks (one per statement), so that
+        adding a statement takes a constant time, and the code can be written
+        to a stream (e.g dot's standard input) or hashed (see `write`) without
+        building the whole string.
+    """
 
     def __init__(self, graph_name: str = "G"):
         self._graph_name = graph_name
-        self._graph_content_str = ""
+        self._graph_content_chunks: List[str] = []
+
+
+    @classmethod
+    def from_graph_ir(cls, graph_ir: GraphIR,
+                      graph_name: str = "G") -> DotDataGenerator:
+        """ Returns a generator containing the dot code of a graph's
+            intermediate representation: its graph attributes, its ellipse
+            nodes, its table nodes (as html nodes) and its edges, with their
+            labels.
+        """
+        generator = cls(graph_name)
+        generator.set_graph_attributes(graph_ir.graph_attributes())
+
+        # From now on, every added node will be round:
+        generator.set_node_attributes({'shape': 'ellipse'})
+        for node_id in range(graph_ir.nodes_nb()):
+            if graph_ir.node_kind(node_id) == ELLIPSE_NODE:
+                label = quoted(graph_ir.node_label(node_id))
+                generator.add_node(graph_ir.node_name(node_id),
+                                   {'label': label})
+
+        # From now on, every added node will have no shape (the html label will
+        # make the shape):
+        generator.set_node_attributes({'shape': 'none'})
+        for node_id in range(graph_ir.nodes_nb()):
+            if graph_ir.node_kind(node_id) == TABLE_NODE:
+                generator.add_html_node(graph_ir.node_name(node_id),
+                                        graph_ir.node_ports(node_id),
+                                        graph_ir.node_label(node_id),
+                                        graph_ir.node_label_size(node_id))
+
+        for edge_id in range(graph_ir.edges_nb()):
+            (tail, head, label) = graph_ir.edge(edge_id)
+            generator.add_edge(tail, head, None if label is None
+                               else {'label': quoted(label)})
+        return generator
+
+
+    def copy(self) -> DotDataGenerator:
+        """ Returns a generator containing the same dot code, which can be
+            completed independently of this one. The chunks are shared, and
+            not copied.
+        """
+        generator = DotDataGenerator(self._graph_name)
+        generator._graph_content_chunks = list(self._graph_content_chunks)
+        return generator
+
+
+    def chunks(self) -> Iterator[str]:
+        """ Returns an iterator over the chunks of the generated dot code,
+            whose concatenation is the dot code.
+        """
+        yield "digraph " + self._graph_name + " {\n"
+        yield from self._graph_content_chunks
+        yield "}\n"
 
 
     def get_dot_string(self) -> str:
         """ Returns the generated dot code as a string. """
-        final_string = "digraph " + self._graph_name + " {\n"
-        final_string += self._graph_content_str
-        final_string += "}\n"
-        return final_string
+        return ''.join(self.chunks())
 
 
     def get_encoded_dot_string(self) -> bytes:
@@ -30,6 +107,32 @@ class DotDataGenerator:
         return self.get_dot_string().encode()
 
 
+    def write(self, stream: BinaryIO) -> None:
+        """ Writes the generated dot code, encoded in utf-8, to a binary
+            stream (or any object with a `write(bytes)` method), by blocks of
+            about WRITE_BLOCK_SIZE characters. The output is the same as
+            `get_encoded_dot_string`'s.
+        """
+        block: List[str] = []
+        block_size = 0
+        for chunk in self.chunks():
+            block.append(chunk)
+            block_size += len(chunk)
+            if block_size >= WRITE_BLOCK_SIZE:
+                stream.write(''.join(block).encode())
+                block = []
+                block_size = 0
+        if block:
+            stream.write(''.join(block).encode())
+
+
+    def update_hash(self, digest) -> None:
+        """ Updates a hash object (e.g `hashlib.sha256()`) with the generated
+            dot code, encoded in utf-8, without building the whole string.
+        """
+        self.write(_HashWriter(digest))
+
+
     def add_node(self, name: str, attributes: Dict[str, Any] = None) -> None:
         """ Adds a node to the graph, with optional attributes.
 
@@ -45,17 +148,18 @@ class DotDataGenerator:
         if ':' in name:
             raise ValueError("Node name cannot contain a colon ':'")
 
-        new_line = f"\t{name}"
+        new_line = f"\t{quoted(name)}"
         if attributes is not None:
             new_line += ' '
             new_line += self._generate_list_of_attributes(attributes)
         new_line += "\n"
 
-        self._graph_content_str += new_line
+        self._graph_content_chunks.append(new_line)
 
 
     def add_html_node(self, name: str, ports: Tuple[List[Tuple[str]]],
-                      label: str = None) -> None:
+                      label: str = None,
+                      label_size: Tuple[float, float] = None) -> None:
         """ Adds an html-style node to the graph.
 
         Args:
@@ -64,6 +168,9 @@ class DotDataGenerator:
                 Each element of this tuple is a list of the ports' names.
             label: label of the node. If None, the name of the node will be
                 used.
+            label_size: if given, minimum (width, height) of the label's cell,
+                in points. The label is then at the top of the cell (e.g to
+                leave room for the content of an expanded cluster).
 
         Raises:
             RuntimeError: there are no inputs or outputs.
@@ -74,118 +181,34 @@ class DotDataGenerator:
         if label is None:
             label = name
 
-        table_content = self._get_html_rows_for_node(label, inputs, outputs)
+        # The entities of the same class share their table, and only their
+        # label differs:
+        (rows_start, rows_end) = html_table_template(tuple(inputs),
+                                                     tuple(outputs), label_size)
         html = (f'<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" '
-                f'CELLPADDING="4">\n{table_content}\t</TABLE>>')
+                f'CELLPADDING="4">\n{rows_start}{escape(label)}{rows_end}'
+                '\t</TABLE>>')
 
-        self._graph_content_str += f'\t{name} [label={html}]\n'
+        self._graph_content_chunks.append(f'\t{quoted(name)} [label={html}]\n')
 
 
-    # When the number of inputs is not a multiple of the number of
-    # outputs (or vice versa), the height of the cells will vary in the column
-    # with less elements.
-    # Regular html allows for a balanced table thanks to empty rows (<TR></TR>),
-    # but dot does not support them.
-    # If support for empty rows is added to dot in the future, this method
-    # should be updated to allow for a more even display of the ports.
-    # Online tool to help understand where to use empty rows:
-    # https://www.tablesgenerator.com/html_tables
     def _get_html_rows_for_node(self, label: str, input_names: List[str],
-                                output_names: List[str]) -> str:
+                                output_names: List[str],
+                                label_size: Tuple[float, float] = None) -> str:
         """ Generates html code for the rows of a node.
 
         Args:
             label: label of the node
             inputs: names of the input ports.
             outputs: names of the output ports.
+            label_size: minimum (width, height) of the label's cell, if any.
 
         Returns:
             Html code for the rows of the node, as a string.
         """
-        if output_names == []:
-            raise RuntimeError('An html node cannot have no output.')
-
-        # We determine which column (inputs or outputs) has more rows
-        inputs_nb = len(input_names)
-        outputs_nb = len(output_names)
-        max_nb = None
-        if inputs_nb > outputs_nb:
-            max_nb = 'inputs'
-        elif inputs_nb < outputs_nb:
-            max_nb = 'outputs'
-        nb_rows = max(inputs_nb, outputs_nb)
-
-        input_count, output_count = 0, 0
-
-        # For each row, we add its elements from left to right.
-        # Online tool to generate html tables based on the desired layout:
-        # https://www.tablesgenerator.com/html_tables
-        rows_html = ""
-        for i in range(nb_rows):
-            input_name, output_name = None, None
-            rowspan_input, rowspan_output = 1, 1
-            remaining_nb_rows = nb_rows - i
-
-            if inputs_nb == 0:
-                input_name = None
-                output_name = output_names[i]
-                output_count += 1
-
-            # If there are more inputs, each input cell will have a rowspan of
-            # 1, the middle column (node's label) will have a rowspan of
-            # `inputs_nb`, and each output cell will span over
-            # `inputs_nb // outputs_nb` nb of lines, except the last one which
-            # will span over the remaining available rows.
-            elif max_nb == 'inputs':
-                input_name = input_names[i]
-                rowspan_output = inputs_nb // outputs_nb
-                if (output_count < outputs_nb and
-                    i == output_count * rowspan_output):
-                    output_name = output_names[output_count]
-                    if output_count == outputs_nb - 1: # If it's the last output
-                        rowspan_output = remaining_nb_rows
-                    output_count += 1
-                input_count += 1
-
-            # The same logic applies if there are more outputs
-            elif max_nb == 'outputs':
-                output_name = output_names[i]
-                rowspan_input = outputs_nb // inputs_nb
-                if input_count < inputs_nb and i == input_count * rowspan_input:
-                    input_name = input_names[input_count]
-                    if input_count == inputs_nb - 1: # If it's the last input
-                        rowspan_input = remaining_nb_rows
-                    input_count += 1
-                output_count += 1
-
-            # If `inputs_nb` and `outputs_nb` are equal, we add one input and
-            # one output on each row, so both with a rowspan of 1
-            else:
-                input_name = input_names[i]
-                output_name = output_names[i]
-                input_count += 1
-                output_count += 1
-
-            # Creating the html code for the row
-            input_cell = ''
-            if input_name is not None:
-                input_cell = (f'\t\t\t<TD ROWSPAN="{rowspan_input}" '
-                    f'PORT="{input_name}">{input_name}</TD>\n')
-
-            # The node's label is added to the first row and spans over each row
-            label_cell = ''
-            if i == 0:
-                label_cell = f'\t\t\t<TD ROWSPAN="{nb_rows}">{label}</TD>\n'
-
-            output_cell = ''
-            if output_name is not None:
-                output_cell = (f'\t\t\t<TD ROWSPAN="{rowspan_output}" '
-                    f'PORT="{output_name}">{output_name}</TD>\n')
-
-            row_content = input_cell + label_cell + output_cell
-            rows_html += f'\t\t<TR>\n{row_content}\t\t</TR>\n'
-
-        return rows_html
+        (rows_start, rows_end) = html_table_template(
+            tuple(input_names), tuple(output_names), label_size)
+        return rows_start + escape(label) + rows_end
 
 
     def add_edge(self, tail: Tuple[str, str], head: Tuple[str, str],
@@ -206,13 +229,14 @@ class DotDataGenerator:
         head_node, head_port = head
 
         # The head and tail are in the form: `node:port`, or simply `node` if
-        # no port is specified.
-        tail_str = tail_node
+        # no port is specified. The names are quoted, so that any name gives
+        # valid dot code.
+        tail_str = quoted(tail_node)
         if tail_port is not None:
-            tail_str += f':{tail_port}'
-        head_str = head_node
+            tail_str += f':{quoted(tail_port)}'
+        head_str = quoted(head_node)
         if head_port is not None:
-            head_str += f':{head_port}'
+            head_str += f':{quoted(head_port)}'
 
         # If the edge's tip (head or tail) is an output, we add ':e' so the
         # edge is bound to the east of the output (be it a port or a node). If
@@ -226,7 +250,7 @@ class DotDataGenerator:
             new_line += self._generate_list_of_attributes(attributes)
         new_line += '\n'
 
-        self._graph_content_str += new_line
+        self._graph_content_chunks.append(new_line)
 
 
 
@@ -241,11 +265,9 @@ class DotDataGenerator:
                 `attributes['rankdir'] = 'LR'` corresponds to `rankdir=LR`
                 in dot.
         """
-        new_lines = ""
         if attributes is not None:
             for (key, value) in attributes.items():
-                new_lines += f"\t{key}={str(value)}\n"
-        self._graph_content_str += new_lines
+                self._graph_content_chunks.append(f"\t{key}={str(value)}\n")
 
 
     def set_node_attributes(self, attributes: Dict[str, Any]) -> None:
@@ -265,7 +287,7 @@ class DotDataGenerator:
         new_line = '\tnode '
         new_line += self._generate_list_of_attributes(attributes)
         new_line += '\n'
-        self._graph_content_str += new_line
+        self._graph_content_chunks.append(new_line)
 
 
     def set_edge_attributes(self, attributes: Dict[str, Any]) -> None:
@@ -285,7 +307,7 @@ class DotDataGenerator:
         new_line = '\tedge '
         new_line += self._generate_list_of_attributes(attributes)
         new_line += '\n'
-        self._graph_content_str += new_line
+        self._graph_content_chunks.append(new_line)
 
 
     def _generate_list_of_attributes(self, attributes: Dict[str, Any]) -> str:
@@ -301,10 +323,74 @@ class DotDataGenerator:
 
         # Example of a list of attributes: [label='add1', color=red]
         if len(attributes) > 0:
-            string = "["
-            for i, (key, value) in enumerate(attributes.items()):
-                string += f"{key}={str(value)}"
-                if i < len(attributes) - 1:
-                    string += ", "
-            string += "]"
-        return string
+            return "[" + ", ".join(f"{key}={str(value)}"
+                                   for (key, value) in attributes.items()) + "]"
+
+
+# When the number of inputs is not a multiple of the number of outputs (or vice
+# versa), the height of the cells will vary in the column with less elements.
+# Regular html allows for a balanced table thanks to empty rows (<TR></TR>),
+# but dot does not support them.
+# If support for empty rows is added to dot in the future, this function
+# should be updated to allow for a more even display of the ports.
+# Online tool to help understand where to use empty rows:
+# https://www.tablesgenerator.com/html_tables
+@lru_cache(maxsize=HTML_TEMPLATES_CACHE_SIZE)
+def html_table_template(input_names: Tuple[str, ...],
+                        output_names: Tuple[str, ...],
+                        label_size: Tuple[float, float] = None) \
+                        -> Tuple[str, str]:
+    """ Returns the html code of the rows of a node's table, as a tuple (code
+        before the label, code after the label).
+
+        The templates are cached per signature (ports and label size): the
+        entities of the same class have the same table, which is only generated
+        once. The texts are escaped, so that any name gives a valid table.
+
+    Args:
+        input_names: names of the input ports.
+        output_names: names of the output ports.
+        label_size: minimum (width, height) of the label's cell, if any.
+
+    Raises:
+        RuntimeError: there are no outputs.
+    """
+    # For each row, we add its elements from left to right (see
+    # `html_table_rows` for the rowspans of the ports).
+    # Online tool to generate html tables based on the desired layout:
+    # https://www.tablesgenerator.com/html_tables
+    rows_html = []
+    for row_cells in html_table_rows(list(input_names), list(output_names)):
+        rows_html.append('\t\t<TR>\n')
+        for (cell_type, name, rowspan) in row_cells:
+            if cell_type != LABEL:
+                name = escape(name)
+                rows_html.append(f'\t\t\t<TD ROWSPAN="{rowspan}" '
+                                 f'PORT="{name}">{name}</TD>\n')
+                continue
+
+            # The node's label is added to the first row and spans over each
+            # row
+            size_attributes = ''
+            if label_size is not None:
+                # Sizes are integers in html labels:
+                (width, height) = (ceil(size) for size in label_size)
+                size_attributes = (f' WIDTH="{width}" HEIGHT="{height}"'
+                                   ' VALIGN="TOP"')
+            rows_html.append(f'\t\t\t<TD ROWSPAN="{rowspan}"'
+                             f'{size_attributes}>{_LABEL_MARK}</TD>\n')
+        rows_html.append('\t\t</TR>\n')
+
+    (rows_start, rows_end) = ''.join(rows_html).split(_LABEL_MARK)
+    return (rows_start, rows_end)
+
+
+class _HashWriter:
+    """ Binary stream updating a hash with the data written to it. """
+
+    def __init__(self, digest):
+        self._digest = digest
+
+
+    def write(self, data: bytes) -> None:
+        self._digest.update(data)
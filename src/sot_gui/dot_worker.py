@@ -0,0 +1,245 @@
+from __future__ import annotations
+from typing import BinaryIO, List, Union
+from subprocess import Popen, PIPE, TimeoutExpired
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from sot_gui.dot_data_generator import DotDataGenerator
+
+
+# Dot code given to the pool: encoded in utf-8, or as a generator which is
+# written to dot's standard input without building the whole string:
+DotCode = Union[bytes, DotDataGenerator]
+
+# Period at which a running layout checks its cancellation and deadline, in
+# seconds:
+POLL_PERIOD = 0.1
+
+
+class DotWorkerPool:
+    """ Pool of dot processes started in advance, used to compute layouts.
+
+        Starting dot (process spawn, plugins loading and configuration) can
+        take hundreds of milliseconds on slow computers. The pool keeps `size`
+        dot processes started and waiting for their input, so that a layout
+        does not wait for dot to start: each layout is given to a waiting
+        process, and a new process is started in the background to replace it.
+        The processes can be started before the first layout (see `start`).
+        When layouts are computed concurrently, `size` should be the number of
+        concurrent layouts.
+
+        A layout taking more than `timeout` seconds is stopped. A waiting
+        process which died, or a process which crashed during a layout, is
+        automatically replaced.
+
+        The pool can be used from several threads.
+
+        Constructor arguments:
+        - `size`: number of processes kept waiting
+        - `timeout`: maximum duration of a layout, in seconds
+        - `command`: command starting dot
+    """
+
+    def __init__(self, size: int = 1, timeout: float = 60.,
+                 command: List[str] = ['dot', '-Tjson']):
+        self._size = size
+        self._timeout = timeout
+        self._command = list(command)
+        # Processes waiting for a layout:
+        self._idle_processes: List[Popen] = []
+        # Thread starting the missing processes, if one is running (see
+        # `_fill_in_background`):
+        self._fill_thread: Thread = None
+        # Number of calls to `close`, so that the processes started before a
+        # call are not kept waiting:
+        self._generation = 0
+        self._lock = Lock()
+
+
+    def timeout(self) -> float:
+        return self._timeout
+    def set_timeout(self, timeout: float) -> None:
+        self._timeout = timeout
+
+
+    def layout(self, dot_code: DotCode, cancel_event: Event = None,
+               timeout: float = None) -> str | None:
+        """ Computes the layout of some dot code, and returns dot's output.
+
+            Args:
+                dot_code: the dot code, encoded in utf-8, or a DotDataGenerator
+                    whose code is written to dot's standard input chunk by
+                    chunk.
+                cancel_event: if given and set while dot is running, dot is
+                    stopped and None is returned.
+                timeout: maximum duration of this layout, in seconds. If None,
+                    the pool's timeout is used.
+
+            Raises:
+                TimeoutError: The layout took more than `timeout` seconds.
+                RuntimeError: dot failed to compute the layout.
+        """
+        if timeout is None:
+            timeout = self._timeout
+        (returncode, out, err) = self._run_process(dot_code, cancel_event,
+                                                   timeout)
+        # A process killed by a signal (e.g out of memory) may be a one-time
+        # crash: the layout is tried once more with a new process.
+        if returncode is not None and returncode < 0:
+            (returncode, out, err) = self._run_process(dot_code, cancel_event,
+                                                       timeout)
+        if returncode is None:
+            return None
+        if returncode != 0:
+            raise RuntimeError(f"dot failed with code {returncode}: "
+                               f"{err.decode('utf-8', 'replace').strip()}")
+        return out.decode('utf-8')
+
+
+    def start(self) -> None:
+        """ Starts the waiting processes in the background, without waiting for
+            them, so that the first layouts do not wait for dot to start.
+        """
+        self._fill_in_background()
+
+
+    def close(self) -> None:
+        """ Stops the waiting processes. The pool can still be used afterwards:
+            new processes are then started.
+        """
+        with self._lock:
+            processes = self._idle_processes
+            self._idle_processes = []
+            self._generation += 1
+        for process in processes:
+            process.kill()
+            process.communicate()
+
+
+    def _run_process(self, dot_code: DotCode, cancel_event: Event,
+                     timeout: float) -> tuple:
+        """ Runs a layout on a waiting process, and returns a tuple (return
+            code, stdout, stderr). The return code is None if the layout was
+            cancelled.
+
+            Raises:
+                TimeoutError: The layout took more than `timeout` seconds.
+        """
+        process = self._take_process()
+        deadline = monotonic() + timeout
+        # The code is written to dot's standard input by another thread, while
+        # this one reads the outputs and checks the cancellation and deadline:
+        # a write blocked on a full pipe (e.g if dot writes a lot of warnings
+        # before reading the rest of its input) is then stopped with dot.
+        # communicate only reads the outputs, as the standard input belongs to
+        # the writing thread.
+        stdin = process.stdin
+        process.stdin = None
+        writer = Thread(target=_write_dot_code, args=(dot_code, stdin),
+                        daemon=True)
+        writer.start()
+        try:
+            while True:
+                try:
+                    (out, err) = process.communicate(timeout=POLL_PERIOD)
+                    return (process.returncode, out, err)
+                except TimeoutExpired:
+                    pass
+                if cancel_event is not None and cancel_event.is_set():
+                    process.kill()
+                    process.communicate()
+                    return (None, None, None)
+                if monotonic() > deadline:
+                    process.kill()
+                    process.communicate()
+                    raise TimeoutError(f"dot did not compute the layout in "
+                                       f"{timeout} seconds.")
+        finally:
+            # Once the process is stopped, the writing thread is not blocked
+            # anymore:
+            if process.poll() is None:
+                process.kill()
+                process.communicate()
+            writer.join()
+            # The process is replaced without delaying the result:
+            self._fill_in_background()
+
+
+    def _take_process(self) -> Popen:
+        """ Returns a waiting process, or a new one if there is none. The
+            processes which died while waiting are discarded.
+        """
+        with self._lock:
+            while self._idle_processes:
+                process = self._idle_processes.pop(0)
+                if process.poll() is None:
+                    return process
+                process.communicate()
+        return self._start_process()
+
+
+    def _fill_in_background(self) -> None:
+        """ Starts the missing processes (see `_fill`) in another thread, unless
+            it is already being done.
+        """
+        with self._lock:
+            if self._fill_thread is not None:
+                return
+            self._fill_thread = Thread(target=self._fill,
+                                       args=(self._generation,), daemon=True)
+            self._fill_thread.start()
+
+
+    def _fill(self, generation: int) -> None:
+        """ Starts processes until `size` processes are waiting (see
+            `_fill_in_background`), unless the pool is closed meanwhile (i.e
+            its generation is no longer `generation`). The processes are
+            started outside of the lock, so that the waiting processes can be
+            taken meanwhile. If dot cannot be started, the error is raised by
+            the next layout, which starts its own process.
+        """
+        while True:
+            with self._lock:
+                self._idle_processes = [process for process
+                                        in self._idle_processes
+                                        if process.poll() is None]
+                if (len(self._idle_processes) >= self._size
+                        or generation != self._generation):
+                    self._fill_thread = None
+                    return
+            try:
+                process = self._start_process()
+            except OSError:
+                with self._lock:
+                    self._fill_thread = None
+                return
+            with self._lock:
+                if generation == self._generation:
+                    self._idle_processes.append(process)
+                    continue
+                self._fill_thread = None
+            # The pool was closed while the process was starting:
+            process.kill()
+            process.communicate()
+            return
+
+
+    def _start_process(self) -> Popen:
+        return Popen(self._command, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+
+
+def _write_dot_code(dot_code: DotCode, stdin: BinaryIO) -> None:
+    """ Writes some dot code to dot's standard input, and closes it. """
+    try:
+        if isinstance(dot_code, DotDataGenerator):
+            dot_code.write(stdin)
+        else:
+            stdin.write(dot_code)
+        stdin.flush()
+    except (OSError, ValueError): # dot stopped, e.g on a syntax error
+        pass
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
@@ -1,17 +1,113 @@
-from typing import Any, List
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Tuple
+from functools import wraps
+from inspect import getsource
+from threading import Lock, local
+from time import perf_counter
+
 from sot_ipython_connection.sot_client import SOTClient
 
+from sot_gui import kernel_helpers
+from sot_gui.call_stats import CallStats
+from sot_gui.signal_values import NOT_LOADED, decode_value
+
+
+# Source code of the helpers installed on the kernel at each connection:
+KERNEL_HELPERS_SOURCE = getsource(kernel_helpers)
+
+
+class SignalError:
+    """ Replaces the value or execution time of a signal when getting it raised
+        an error on the kernel.
+    """
+
+    def __init__(self, message: str):
+        self._message = message
+
+
+    def message(self) -> str:
+        return self._message
+
+
+    def __eq__(self, other: Any) -> bool:
+        return (isinstance(other, SignalError)
+                and other.message() == self._message)
+
+
+    def __str__(self) -> str:
+        return f"Error ({self._message})"
+
+
+def _recorded(method: Callable) -> Callable:
+    """ Decorator recording the calls of a DynamicGraphCommunication method in
+        its call statistics (see `DynamicGraphCommunication.call_stats`): their
+        duration, and the size of the code sent to the kernel and of the
+        results it returned.
+    """
+    @wraps(method)
+    def recorded_method(self, *args, **kwargs):
+        # The payload size of nested recorded calls is also counted in the
+        # outer one:
+        outer_payload_size = getattr(self._payload_size, 'value', None)
+        self._payload_size.value = 0
+        start_time = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            duration = perf_counter() - start_time
+            payload_size = self._payload_size.value
+            if outer_payload_size is None:
+                del self._payload_size.value
+            else:
+                self._payload_size.value = outer_payload_size + payload_size
+            self._call_stats.record(method.__name__, duration, payload_size)
+    return recorded_method
+
 
 class DynamicGraphCommunication():
     """ This class allows to communicate with a SoT dynamic graph on a remote
         kernel.
+
+        Its methods can be called from several threads (e.g a refresh thread
+        and a live values thread): the commands are sent to the kernel one at a
+        time.
+
+        The number of calls and the latency of each API method are recorded
+        (see `call_stats`), as well as their payload size if enabled (see
+        `set_payload_size_recorded`).
     """
 
     def __init__(self):
         self._client = SOTClient()
+        # The client cannot handle several commands at the same time:
+        self._client_lock = Lock()
+        self._call_stats = CallStats()
+        # Size of the data exchanged with the kernel by the current recorded
+        # call, per thread:
+        self._payload_size = local()
+        self._payload_size_recorded = False
         self.connect_to_kernel()
 
 
+    def call_stats(self) -> CallStats:
+        """ Returns the statistics on the calls of the API methods: number of
+            calls, latency (including the kernel and the IPython transport) and
+            payload size.
+        """
+        return self._call_stats
+
+
+    def payload_size_recorded(self) -> bool:
+        return self._payload_size_recorded
+    def set_payload_size_recorded(self, recorded: bool) -> None:
+        """ Enables or disables the recording of the payload size in the call
+            statistics. It is disabled by default, as measuring the size of the
+            results (the length of their repr) is costly for large results.
+        """
+        self._payload_size_recorded = recorded
+
+
+    @_recorded
     def connect_to_kernel(self) -> bool:
         """ Launches a new client that will attempt a connection with the latest
             kernel.
@@ -20,10 +116,13 @@ class DynamicGraphCommunication():
               True if the connection was successful, False if not.
         """
 
-        if self._client.connect_to_kernel() is False:
+        with self._client_lock:
+            connected = self._client.connect_to_kernel()
+        if connected is False:
             return False
         try:
             self._import_dynamic_graph()
+            self._install_kernel_helpers()
             return True
         except ConnectionError:
             print('DynamicGraphCommunication.connect_to_kernel: could not'
@@ -40,6 +139,24 @@ class DynamicGraphCommunication():
         self._run("import dynamic_graph as dg")
 
 
+    def _install_kernel_helpers(self) -> None:
+        """ Installs the helper functions of the `kernel_helpers` module in a
+            `_sotgui` namespace on the kernel, unless the same version of the
+            helpers is already installed.
+
+            Raises:
+                ConnectionError: The kernel is not running.
+        """
+        installed_version = self._run(
+            "getattr(globals().get('_sotgui'), 'VERSION', None)")
+        if installed_version == kernel_helpers.VERSION:
+            return
+
+        self._run("import types as _types\n"
+                  "_sotgui = _types.ModuleType('_sotgui')\n"
+                  f"exec({KERNEL_HELPERS_SOURCE!r}, _sotgui.__dict__)")
+
+
     def _run(self, code: str) -> Any:
         """ Runs code on the remote kernel.
 
@@ -55,17 +172,25 @@ class DynamicGraphCommunication():
         Raises:
             ConnectionError: The kernel is not running.
         """
-        response = self._client.run_python_command(code)
+        with self._client_lock:
+            response = self._client.run_python_command(code)
 
         if response.stdout:
             print(response.stdout)
         if response.stderr:
             print(response.stderr)
 
+        if (self._payload_size_recorded
+                and hasattr(self._payload_size, 'value')):
+            self._payload_size.value += len(code)
+            if response.result:
+                self._payload_size.value += len(repr(response.result))
+
         if response.result:
             return response.result
 
 
+    @_recorded
     def is_kernel_alive(self) -> bool:
         return self._client.is_kernel_alive()
 
@@ -74,15 +199,17 @@ class DynamicGraphCommunication():
     # DYNAMIC GRAPH API
     #
 
+    @_recorded
     def get_all_entities_names(self) -> List[str]:
         """ Returns a list of the names of the dynamic graph's entities.
 
         Raises:
             ConnectionError: The kernel is not running.
         """
-        return self._run("dg.entity.Entity.entities.keys()")
+        return self._run("_sotgui.entity_names()")
 
 
+    @_recorded
     def entity_exists(self, entity_name: str) -> bool:
         """ Returns True if the dynamic graph contains the given entity.
 
@@ -92,9 +219,10 @@ class DynamicGraphCommunication():
         Raises:
             ConnectionError: The kernel is not running.
         """
-        return self._run(f"{entity_name} + in dg.node.Entity.entities")
+        return self._run(f"_sotgui.entity_exists('{entity_name}')")
 
 
+    @_recorded
     def get_entity_type(self, entity_name: str) -> str:
         """ Returns the type of the entity, as a string.
 
@@ -104,10 +232,10 @@ class DynamicGraphCommunication():
         Raises:
             ConnectionError: The kernel is not running.
         """
-        return self._run(f"dg.entity.Entity.entities['{entity_name}']"
-                         ".className")
+        return self._run(f"_sotgui.entity_type('{entity_name}')")
 
 
+    @_recorded
     def get_entity_signals(self, entity_name: str) -> List[str]:
         """ Returns information on an entity's signals.
 
@@ -120,10 +248,10 @@ class DynamicGraphCommunication():
         Raises:
             ConnectionError: The kernel is not running.
         """
-        return self._run(f"[s.name for s in dg.entity.Entity"
-            f".entities['{entity_name}'].signals()]")
+        return self._run(f"_sotgui.entity_signals('{entity_name}')")
 
 
+    @_recorded
     def is_signal_plugged(self, entity_name: str, signal_name: str) -> bool:
         """ Returns True if an entity's signal is plugged to another entity.
 
@@ -134,10 +262,11 @@ class DynamicGraphCommunication():
         Raises:
             ConnectionError: The kernel is not running.
         """
-        return self._run(f"dg.entity.Entity.entities"
-            f"['{entity_name}'].signal('{signal_name}').isPlugged()")
+        return self._run(f"_sotgui.sig_plugged('{entity_name}', "
+                         f"'{signal_name}')")
 
 
+    @_recorded
     def get_linked_signal(self, entity_name: str, signal_name: str) -> str:
         """ Returns the name of the signal linked to an entity's signal.
 
@@ -148,12 +277,15 @@ class DynamicGraphCommunication():
         Raises:
             ConnectionError: The kernel is not running.
         """
-        return self._run(f"dg.entity.Entity.entities"
-            f"['{entity_name}'].signal('{signal_name}').getPlugged().name")
+        return self._run(f"_sotgui.sig_linked('{entity_name}', "
+                         f"'{signal_name}')")
 
 
+    @_recorded
     def get_signal_value(self, entity_name: str, signal_name: str) -> Any:
-        """ Returns the value of an entity's signal.
+        """ Returns the value of an entity's signal. Numeric vectors and
+        matrices are returned as SignalArrays, or as SignalValueSummaries if
+        they are large (see `kernel_helpers.LARGE_VALUE_SIZE`).
 
         Args:
             entity_name: Name of the entity owning the signal.
@@ -162,10 +294,11 @@ class DynamicGraphCommunication():
         Raises:
             ConnectionError: The kernel is not running.
         """
-        return self._run(f"dg.entity.Entity.entities\
-            ['{entity_name}'].signal('{signal_name}').value")
+        return decode_value(self._run(f"_sotgui.sig_value('{entity_name}', "
+                                      f"'{signal_name}')"))
 
 
+    @_recorded
     def get_exec_time(self, entity_name: str, signal_name: str) -> int:
         """ Returns the time of the last execution of a signal.
 
@@ -176,5 +309,253 @@ class DynamicGraphCommunication():
         Raises:
             ConnectionError: The kernel is not running.
         """
-        return self._run(f"dg.entity.Entity.entities"
-            f"['{entity_name}'].signal('{signal_name}').time")
+        return self._run(f"_sotgui.sig_time('{entity_name}', "
+                         f"'{signal_name}')")
+
+
+    @_recorded
+    def get_graph_snapshot(self, with_values: bool = True) \
+                           -> Dict[str, Dict[str, Any]]:
+        """ Returns the whole dynamic graph's data, fetched with a single
+            kernel command.
+
+        The snapshot is a dictionary whose keys are the entities' names, and
+        whose values are dictionaries containing:
+        - `type`: the class name of the entity (e.g `'Add_of_double'`)
+        - `signals`: a list of dictionaries, one for each signal, containing:
+            - `description`: description of the signal (see
+              `get_entity_signals`)
+            - `linked_signal`: description of the signal plugged to this one if
+              it is a plugged input (see `get_linked_signal`), else None
+            - `value`: value of the signal (None for unplugged inputs), see
+              `get_signal_value`
+            - `time`: time of the last execution of the signal (None for
+              unplugged inputs)
+
+        Args:
+            with_values: if False, only the topology of the graph is fetched:
+                the values and times of the signals are NOT_LOADED (or None
+                for unplugged inputs).
+
+        Returns None if the dynamic graph contains no entity.
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        return _parse_snapshot(
+            self._run(f"_sotgui.graph_snapshot({with_values})"), with_values)
+
+
+    @_recorded
+    def get_graph_values(self) -> Dict[str, Dict[str, Tuple[Any, int]]]:
+        """ Returns the value and last execution time of every signal, fetched
+            with a single kernel command.
+
+        The result is a dictionary whose keys are the entities' names, and
+        whose values are dictionaries of tuples (value, time) per signal name
+        (e.g `'sin0'`). Unplugged inputs are omitted. The values are in the
+        same form as those returned by `get_signal_value`.
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        return _parse_graph_values(self._run("_sotgui.graph_values()"))
+
+
+    @_recorded
+    def get_topology_fingerprint(self) -> str:
+        """ Returns a hash of the graph's topology (entities' names and
+            classes, signals and plugs). Two graphs with the same topology have
+            the same fingerprint, regardless of their signals' values.
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        return self._run("_sotgui.topology_fingerprint()")
+
+
+    @_recorded
+    def get_graph_update(self, known_fingerprint: str | None,
+                         with_values: bool = True) \
+                         -> Tuple[str, Dict[str, Dict[str, Any]] | None,
+                                  Dict[str, Dict[str, Tuple[Any, int]]] | None]:
+        """ Returns the data needed to refresh a graph whose topology had the
+            given fingerprint, fetched with a single kernel command, as a tuple
+            (fingerprint, snapshot, values):
+            - if the topology did not change, the snapshot is None, and the
+              values are those of `get_graph_values` (None if `with_values` is
+              False)
+            - otherwise, the snapshot is the one of `get_graph_snapshot` (None
+              if the graph is empty), and the values are None
+
+            The fingerprint (see `get_topology_fingerprint`) and the data are
+            read by the same command, so that the graph cannot change between
+            them.
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        result = self._run(f"_sotgui.graph_update({known_fingerprint!r}, "
+                           f"{with_values})")
+        if result is None:
+            return (None, None, None)
+        (fingerprint, raw_snapshot, raw_values) = result
+        if fingerprint is not None and fingerprint == known_fingerprint:
+            return (fingerprint, None, _parse_graph_values(raw_values))
+        return (fingerprint, _parse_snapshot(raw_snapshot, with_values), None)
+
+
+    @_recorded
+    def get_signal_values(self, pairs: List[Tuple[str, str]]) -> List[Any]:
+        """ Returns the values of several signals, fetched with a single kernel
+            command.
+
+        Args:
+            pairs: list of tuples (entity name, signal name).
+
+        Returns:
+            The list of the values (see `get_signal_value`), in the same order
+            as `pairs`. If getting the value of a signal raised an error, it is
+            replaced by a SignalError.
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        return [decode_value(value) for value
+                in self._run_for_signals('sig_values', pairs)]
+
+
+    @_recorded
+    def get_full_signal_values(self, pairs: List[Tuple[str, str]]) \
+                               -> List[Any]:
+        """ Same as `get_signal_values`, but large vectors and matrices are
+        returned as full SignalArrays instead of SignalValueSummaries.
+
+        Args:
+            pairs: list of tuples (entity name, signal name).
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        return [decode_value(value) for value
+                in self._run_for_signals('sig_full_values', pairs)]
+
+
+    @_recorded
+    def get_exec_times(self, pairs: List[Tuple[str, str]]) -> List[Any]:
+        """ Returns the times of the last execution of several signals, fetched
+            with a single kernel command.
+
+        Args:
+            pairs: list of tuples (entity name, signal name).
+
+        Returns:
+            The list of the times, in the same order as `pairs`. If getting the
+            time of a signal raised an error, it is replaced by a SignalError.
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        return self._run_for_signals('sig_times', pairs)
+
+
+    @_recorded
+    def get_signals_data(self, pairs: List[Tuple[str, str]],
+                         full_values: bool = False) \
+                         -> Dict[str, Dict[str, Tuple[Any, Any]]]:
+        """ Returns the values and execution times of several signals (see
+            `get_signal_values` and `get_exec_times`), in the same form as
+            `get_graph_values`. The values and times are fetched with a single
+            kernel command.
+
+        Args:
+            pairs: list of tuples (entity name, signal name).
+            full_values: if True, large values are not summarized (see
+                `get_full_signal_values`).
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        helper_name = 'sig_full_data' if full_values else 'sig_data'
+        results = self._run_for_signals(helper_name, pairs)
+
+        signals_data = {}
+        for ((entity_name, signal_name), result) in zip(pairs, results):
+            # If reading the signal raised an error, it replaces both the value
+            # and the time:
+            if isinstance(result, SignalError):
+                (value, time) = (result, result)
+            else:
+                (value, time) = (decode_value(result[0]), result[1])
+            signals_data.setdefault(entity_name, {})[signal_name] = \
+                (value, time)
+        return signals_data
+
+
+    def _run_for_signals(self, helper_name: str,
+                         pairs: List[Tuple[str, str]]) -> List[Any]:
+        """ Runs a batched kernel helper on a list of signals, and replaces the
+            error markers of its results by SignalErrors.
+
+        Raises:
+            ConnectionError: The kernel is not running.
+        """
+        pairs = [(str(entity_name), str(signal_name))
+                 for (entity_name, signal_name) in pairs]
+        if pairs == []:
+            return []
+
+        results = self._run(f"_sotgui.{helper_name}({pairs!r})")
+        if results is None:
+            error = SignalError('no result from the kernel')
+            return [error] * len(pairs)
+
+        return [SignalError(result[1]) if _is_error_marker(result) else result
+                for result in results]
+
+
+def _parse_snapshot(raw_snapshot: Dict[str, Any] | None,
+                    with_values: bool) -> Dict[str, Dict[str, Any]] | None:
+    """ Converts a snapshot returned by the kernel (see
+        `kernel_helpers.graph_snapshot`) to the form returned by
+        `DynamicGraphCommunication.get_graph_snapshot`.
+    """
+    if raw_snapshot is None:
+        return None
+
+    # For each signal, the kernel returns a tuple (description, linked signal,
+    # value, time):
+    snapshot = {}
+    for (name, (entity_type, signals)) in raw_snapshot.items():
+        signals_data = []
+        for (description, linked_signal, value, time) in signals:
+            if (not with_values and (linked_signal is not None
+                                     or '::input(' not in description)):
+                value, time = NOT_LOADED, NOT_LOADED
+            signals_data.append(dict(description = description,
+                                     linked_signal = linked_signal,
+                                     value = decode_value(value),
+                                     time = time))
+        snapshot[name] = dict(type = entity_type, signals = signals_data)
+    return snapshot
+
+
+def _parse_graph_values(graph_values: Dict[str, Dict[str, Any]] | None) \
+                        -> Dict[str, Dict[str, Tuple[Any, int]]] | None:
+    """ Converts the values returned by the kernel (see
+        `kernel_helpers.graph_values`) to the form returned by
+        `DynamicGraphCommunication.get_graph_values`.
+    """
+    if graph_values is None:
+        return None
+    return {entity_name: {signal_name: (decode_value(value), time)
+                          for (signal_name, (value, time))
+                          in entity_values.items()}
+            for (entity_name, entity_values) in graph_values.items()}
+
+
+def _is_error_marker(result: Any) -> bool:
+    """ Returns True if a result of a batched kernel helper is an error marker.
+    """
+    return (isinstance(result, (tuple, list)) and len(result) == 2
+            and result[0] == kernel_helpers.ERROR_MARKER)
@@ -1,14 +1,40 @@
 from __future__ import annotations # To prevent circular dependencies of typing
-from typing import List, Any, Dict, Union
-from subprocess import Popen, PIPE
-from copy import deepcopy
-
-from PySide2.QtWidgets import QGraphicsItem
+from typing import List, Any, Dict, Set, Tuple, Union
+from threading import Event, Lock
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
+from time import perf_counter
+from hashlib import sha256
+import os
+
+from PySide2.QtWidgets import (QGraphicsItem, QGraphicsTextItem,
+    QGraphicsPathItem)
+from PySide2.QtCore import QRectF
 
 from sot_gui.dynamic_graph_communication import DynamicGraphCommunication
 from sot_gui.dot_data_generator import DotDataGenerator
-from sot_gui.json_to_qt_generator import JsonToQtGenerator
-from sot_gui.utils import quoted
+from sot_gui.graph_ir import GraphIR
+from sot_gui.json_to_qt_generator import ComponentsQtGenerator, JsonOutput
+from sot_gui.utils import quoted, natural_sort_key
+from sot_gui.signal_values import NOT_LOADED, VALUE_PLACEHOLDER, value_label
+from sot_gui.value_cache import ValueCache
+from sot_gui.layout_cache import LayoutCache
+from sot_gui.dot_worker import DotWorkerPool
+from sot_gui.layout_budget import LayoutBudget, LayoutMode
+from sot_gui.layered_layout import LayeredLayout, LAYERED_LAYOUT_MODE
+from sot_gui.lean_layout import (render_lean_layout, LEAN_OUTPUT_FORMAT,
+    RENDERED_LEAN_FORMAT)
+
+
+# The components whose layout size (see `Graph._get_layout_size`) is at most
+# SMALL_COMPONENT_SIZE, e.g isolated nodes, are laid out together in batches
+# whose total size is at most MAX_BATCH_SIZE (see `Graph._batch_components`):
+SMALL_COMPONENT_SIZE = 3
+MAX_BATCH_SIZE = 200
+
+# Maximum number of components laid out concurrently, which is also the number
+# of dot processes kept waiting for them (see DotWorkerPool):
+LAYOUT_WORKERS_NB = min(os.cpu_count() or 1, 8)
 
 
 class GraphElement:
@@ -151,14 +177,16 @@ class EntityNode(Node):
 
 
 class Cluster(Node):
-    # Not the number or existing clusters, but the number of clusters ever created:
-    clusters_creation_count = 0
-
     def __init__(self, label: str, nodes: List[Node]):
         super().__init__()
 
-        self._name: str = str(Cluster.clusters_creation_count)
-        Cluster.clusters_creation_count += 1
+        # The name only depends on the names of the nodes (which belong to a
+        # single cluster), so that the canonical dot code and the structural
+        # digest of a graph do not depend on the order nor on the session in
+        # which its clusters were created:
+        member_names = sorted(node.name() for node in nodes)
+        members_digest = sha256('\0'.join(member_names).encode()).hexdigest()
+        self._name: str = f"cluster_{members_digest[:16]}"
 
         self._label: str = label
         self._nodes: List[Node] = nodes
@@ -169,13 +197,20 @@ class Cluster(Node):
         # by a rectangle):
         self._expanded: bool = False
 
+        for node in self._nodes:
+            node.set_cluster(self)
+        self.update_ports()
+
+
+    def update_ports(self) -> None:
+        """ (Re)computes the cluster's ports. This must be done each time the
+            edges linked to the cluster's nodes change.
+        """
         # The cluster's ports are its nodes' ports that are not linked to a node
         # in the same cluster
         self._inputs: List[ClusterPort] = []
         self._outputs: List[ClusterPort] = []
         for node in self._nodes:
-            node.set_cluster(self)
-
             for port in node.ports():
                 if self.is_port_internal(port):
                     continue
@@ -208,6 +243,8 @@ class Cluster(Node):
         return self._label
     def is_expanded(self) -> bool:
         return self._expanded
+    def set_expanded(self, expanded: bool) -> None:
+        self._expanded = expanded
 
     def get_cluster_port_per_node_port(self, port: Port) -> ClusterPort | None:
         for cluster_port in self.ports():
@@ -253,6 +290,15 @@ class Port(GraphElement):
             raise ValueError("Port type must be either 'input' or 'output'")
 
 
+    def remove_edge(self) -> None:
+        """ Unplugs the port from its edge. Its value and last execution time
+            are reset.
+        """
+        self._edge = None
+        self.set_value(None)
+        self.set_last_exec(None)
+
+
     def plugged_port(self) -> Port:
         edge = self.edge()
         if edge is not None:
@@ -274,6 +320,11 @@ class ClusterPort(Port):
     """ This class represents a cluster port. Each node port of a cluster which
         is linked to a node external to the cluster will be considered as a
         cluster port.
+
+        When the cluster is expanded, the edge plugged to an input port is
+        displayed in two parts: from outside of the cluster to the cluster's
+        port (the edge's qt item), and from the side of the cluster's interior
+        to the node port (the port's interior edge qt item).
     """
     def __init__(self, node_port: Port, node: Cluster):
         super().__init__(None, None, None)
@@ -282,10 +333,23 @@ class ClusterPort(Port):
         self._node = node
         self._edge = node_port.edge()
         self._node_port: Port = node_port
+        self._interior_edge_qt_item: QGraphicsItem = None
 
     def node_port(self) -> Port:
         return self._node_port
 
+    def interior_edge_qt_item(self) -> QGraphicsItem:
+        return self._interior_edge_qt_item
+    def set_interior_edge_qt_item(self, qt_item: QGraphicsItem) -> None:
+        self._interior_edge_qt_item = qt_item
+
+    def interior_node_name(self) -> str:
+        """ Returns the name of the node standing for this input port in the
+            layout of the cluster's interior: the port's interior edge starts
+            from it. This node has no qt item.
+        """
+        return f"cluster_{self._node.name()}_{self._name}"
+
 
 class Edge(GraphElement):
     def __init__(self, value: Any = None, value_type: str = None,
@@ -299,6 +363,8 @@ class Edge(GraphElement):
 
     def value(self) -> Any:
         return self._value
+    def set_value(self, value: Any) -> None:
+        self._value = value
 
 
     def value_type(self) -> str:
@@ -331,15 +397,95 @@ class Edge(GraphElement):
         return None
 
 
+class GraphChanges:
+    """ This class describes the changes applied to the graph by a refresh.
+
+        Attributes:
+        - `added_nodes`, `removed_nodes`: entity nodes and input nodes added to
+          or removed from the graph
+        - `added_edges`, `removed_edges`: edges (i.e plugs) added to or removed
+          from the graph
+        - `changed_values`: edges and unplugged ports whose value or last
+          execution time changed
+        - `removed_clusters`: clusters which were removed because they contained
+          a removed node, or because their nodes are no longer linked
+    """
+
+    def __init__(self):
+        self.added_nodes: List[Node] = []
+        self.removed_nodes: List[Node] = []
+        self.added_edges: List[Edge] = []
+        self.removed_edges: List[Edge] = []
+        self.changed_values: List[Union[Edge, Port]] = []
+        self.removed_clusters: List[Cluster] = []
+
+
+    def topology_changed(self) -> bool:
+        """ Returns True if nodes or edges were added or removed, meaning that a
+            new layout is needed.
+        """
+        return bool(self.added_nodes or self.removed_nodes or self.added_edges
+                    or self.removed_edges or self.removed_clusters)
+
+
+    def affected_nodes(self) -> List[Node]:
+        """ Returns the nodes of the graph whose display changed: added nodes,
+            and the remaining nodes linked to an added or removed edge.
+        """
+        affected_nodes: Dict[Node, None] = dict.fromkeys(self.added_nodes)
+        removed_nodes = set(self.removed_nodes)
+        for edge in self.added_edges + self.removed_edges:
+            for node in (edge.tail_node(), edge.head_node()):
+                if node is not None and node not in removed_nodes:
+                    affected_nodes[node] = None
+        return list(affected_nodes)
+
+
+class GraphUpdate:
+    """ This class holds the data fetched from the dynamic graph to refresh
+        the graph (see `Graph.fetch_graph_update`).
+
+        Attributes:
+        - `known_fingerprint`: fingerprint of the topology of the graph when
+          the data was fetched
+        - `fingerprint`: fingerprint of the topology of the dynamic graph
+        - `snapshot`: snapshot of the dynamic graph (see
+          `DynamicGraphCommunication.get_graph_snapshot`) if its topology
+          changed, else None
+        - `values`: values of the signals (see
+          `DynamicGraphCommunication.get_graph_values`) if the topology did not
+          change and the values are not loaded lazily, else None
+    """
+
+    def __init__(self, known_fingerprint: str | None, fingerprint: str | None,
+                 snapshot: Dict[str, Dict[str, Any]] | None,
+                 values: Dict[str, Dict[str, Tuple[Any, int]]] | None):
+        self.known_fingerprint = known_fingerprint
+        self.fingerprint = fingerprint
+        self.snapshot = snapshot
+        self.values = values
+
+
+    def topology_changed(self) -> bool:
+        """ Returns True if the topology of the dynamic graph changed since the
+            data of the graph was last fetched.
+        """
+        return (self.fingerprint is None
+                or self.fingerprint != self.known_fingerprint)
+
+
 class Graph:
     """ This class holds the graph's information: it gets the dynamic graph's
         entities and signals, and generates their corresponding PySide items.
 
-        Constructor argument:
+        Constructor arguments:
         - `dg_communication`: will be used to fetch data from the dynamic graph
+        - `layout_cache`: cache of the layouts computed by dot. If None, a
+          cache with the default on-disk directory is used (see LayoutCache).
     """
 
-    def __init__(self, dg_communication: DynamicGraphCommunication):
+    def __init__(self, dg_communication: DynamicGraphCommunication,
+                 layout_cache: LayoutCache = None):
         self._dg_communication = dg_communication
         self._entities_labels_config = self._get_entities_labels_config()
 
@@ -351,6 +497,56 @@ class Graph:
         self._clusters: List[Cluster] = []
         # Information about the graph as a whole (name, dimensions, background color...):
         self._graph_info: Dict[str, Any] = {}
+        # Hash of the topology of the dynamic graph at the last refresh:
+        self._topology_fingerprint: str = None
+        # If True, the refreshes only fetch the topology, and the values are
+        # loaded on demand (see `load_values`):
+        self._lazy_values = False
+        self._value_cache = ValueCache()
+        # If True, the values are not part of the layout, and are displayed by
+        # overlay items (see `set_value_overlays`):
+        self._value_overlays = False
+        # If True, the dot code does not depend on the order of the kernel's
+        # data nor on the values (see `set_canonical_dot`):
+        self._canonical_dot = False
+        # Layouts already computed by dot:
+        self._layout_cache = (layout_cache if layout_cache is not None
+                              else LayoutCache())
+        # dot processes computing the layouts:
+        self._dot_workers = DotWorkerPool(size=LAYOUT_WORKERS_NB)
+        # If True, dot only outputs the positions of the nodes and the splines
+        # of the edges, and the nodes are drawn by SoT GUI (see
+        # `set_lean_layout`):
+        self._lean_layout = False
+        # dot processes computing the lean layouts, started when the first one
+        # is computed (see `_get_lean_dot_workers`):
+        self._lean_dot_workers: DotWorkerPool = None
+        self._lean_dot_workers_lock = Lock()
+        # Choice of the layout mode, according to the size of the graph:
+        self._layout_budget = LayoutBudget()
+        # Fastest layout mode used by the last layout computation:
+        self._layout_mode: LayoutMode = None
+        # Engine computing the layouts: 'dot', or 'layered' for LayeredLayout:
+        self._layout_engine = 'dot'
+        self._layered_layout = LayeredLayout()
+        # If True, the unchanged components keep their position and qt items
+        # when the layout is computed again (see ComponentsQtGenerator):
+        self._stable_layout = False
+        # Generator of the current qt items:
+        self._qt_generator: ComponentsQtGenerator = None
+        # Copy of each element of the graph this one was copied from, if any
+        # (see `copy_model`):
+        self._element_copies: Dict[GraphElement, GraphElement] = {}
+
+
+    def close(self) -> None:
+        """ Stops the dot processes kept waiting for layouts (see
+            DotWorkerPool). It must be called once the graph is no longer used,
+            e.g when the application is closed.
+        """
+        self._dot_workers.close()
+        if self._lean_dot_workers is not None:
+            self._lean_dot_workers.close()
 
 
     def _get_entities_labels_config(self) -> Dict[str, str]:
@@ -376,6 +572,162 @@ class Graph:
         return [clust for clust in self._clusters if clust.is_expanded()]
 
 
+    def lazy_values(self) -> bool:
+        return self._lazy_values
+    def set_lazy_values(self, lazy_values: bool) -> None:
+        """ Enables or disables the lazy loading of the values: if enabled, the
+            refreshes only fetch the topology of the graph, and the values
+            must be loaded with `load_values` for the elements which need them
+            (e.g the visible or selected ones).
+        """
+        self._lazy_values = lazy_values
+        self._value_cache.clear()
+
+
+    def value_overlays(self) -> bool:
+        return self._value_overlays
+    def set_value_overlays(self, value_overlays: bool) -> None:
+        """ Enables or disables the value overlays: if enabled, the labels of
+            the edges and input nodes are fixed-size placeholders in the layout
+            (see VALUE_PLACEHOLDER), and the values are displayed by overlay
+            items at the middle of the edges and on the input nodes. The layout
+            then does not depend on the values, which are updated in place
+            (see `update_qt_items_values`), and the layouts stay in the cache
+            when the values change.
+        """
+        self._value_overlays = value_overlays
+
+
+    def canonical_dot(self) -> bool:
+        return self._canonical_dot
+    def set_canonical_dot(self, canonical_dot: bool) -> None:
+        """ Enables or disables the canonical dot code: if enabled, the dot
+            code only depends on the structure of the graph, and not on the
+            order in which the kernel lists the entities and signals, nor on
+            the values. The nodes are sorted by name, their ports in natural
+            order (e.g `sin2` before `sin10`) and the edges by head, and the
+            values are displayed by overlay items (see `set_value_overlays`).
+            Logically identical graphs then have the same dot code, and share
+            their layouts in the cache (see also `structural_digest`).
+        """
+        self._canonical_dot = canonical_dot
+
+
+    def structural_digest(self, node_names: Set[str] = None,
+                          cluster: Cluster = None) -> str:
+        """ Returns a digest (sha256, in hexadecimal) of the canonical
+            representation of the graph (see `set_canonical_dot` and
+            `GraphIR.update_hash`), whatever the current mode: two graphs
+            with the same nodes, ports, edges and clusters have the same
+            digest, regardless of their values and of the order of the
+            kernel's data. It can be used as a cache key for anything derived
+            from the graph's structure.
+
+            Args:
+                node_names, cluster: see `_get_encoded_dot_code`.
+        """
+        digest = sha256()
+        self._get_graph_ir(node_names, cluster,
+                           canonical=True).update_hash(digest)
+        return digest.hexdigest()
+
+
+    def _uses_value_overlays(self) -> bool:
+        """ Returns True if the values are displayed by overlay items rather
+            than by the labels of the layout.
+        """
+        return self._value_overlays or self._canonical_dot
+
+
+    def stable_layout(self) -> bool:
+        return self._stable_layout
+    def set_stable_layout(self, stable_layout: bool) -> None:
+        """ Enables or disables the stable layout: if enabled, when the layout
+            is computed again, the components which did not change keep their
+            position and their qt items, and only the modified ones are placed
+            and generated again.
+
+            With dot, the stability is per component (or batch of small
+            components, see `_batch_components`): the nodes of a modified
+            component are all placed again, as dot cannot be given the
+            positions of some of them. The layered layout engine anchors
+            each node which was already laid out to its rank and vertical
+            position instead, so that only the nodes around the modified ones
+            move (see LayeredLayout).
+        """
+        self._stable_layout = stable_layout
+
+
+    def layout_timeout(self) -> float:
+        return self._dot_workers.timeout()
+    def set_layout_timeout(self, timeout: float) -> None:
+        """ Sets the maximum duration of a layout computation, in seconds. """
+        self._dot_workers.set_timeout(timeout)
+        if self._lean_dot_workers is not None:
+            self._lean_dot_workers.set_timeout(timeout)
+
+
+    def lean_layout(self) -> bool:
+        return self._lean_layout
+    def set_lean_layout(self, lean_layout: bool) -> None:
+        """ Enables or disables the lean layouts: if enabled, dot only outputs
+            the positions and sizes of the nodes and the splines of the edges
+            (`dot -Tjson0`), and the html tables and labels are drawn from the
+            graph's data (see `render_lean_layout`). dot's output is then much
+            smaller, and faster to produce and parse, than with the xdot
+            drawing operations of every cell.
+        """
+        self._lean_layout = lean_layout
+
+
+    def _get_lean_dot_workers(self) -> DotWorkerPool:
+        """ Returns the dot processes computing the lean layouts (see
+            `set_lean_layout`), creating them the first time. The components
+            are laid out concurrently, so they are only created once under a
+            lock.
+        """
+        with self._lean_dot_workers_lock:
+            if self._lean_dot_workers is None:
+                self._lean_dot_workers = DotWorkerPool(
+                    size=LAYOUT_WORKERS_NB,
+                    command=['dot', f"-T{LEAN_OUTPUT_FORMAT}"])
+                self._lean_dot_workers.set_timeout(self._dot_workers.timeout())
+            return self._lean_dot_workers
+
+
+    def layout_budget(self) -> float | None:
+        return self._layout_budget.budget()
+    def set_layout_budget(self, budget: float | None) -> None:
+        """ Sets the duration allowed for the layouts of a refresh, in
+            seconds: the layout mode of each component is chosen so that it
+            fits in this budget (see LayoutBudget). If None, the layouts are
+            always computed in the most accurate mode.
+        """
+        self._layout_budget.set_budget(budget)
+
+
+    def layout_engine(self) -> str:
+        return self._layout_engine
+    def set_layout_engine(self, engine: str) -> None:
+        """ Sets the engine computing the layouts: 'dot' (Graphviz), or
+            'layered' for the built-in layered layout (see LayeredLayout),
+            which does not run dot and scales to larger graphs.
+
+            Raises:
+                ValueError: The engine is unknown.
+        """
+        if engine not in ('dot', 'layered'):
+            raise ValueError(f"Unknown layout engine: {engine}")
+        self._layout_engine = engine
+
+
+    def layout_mode(self) -> LayoutMode | None:
+        """ Returns the fastest (i.e least accurate) layout mode used by the
+            last layout computation, or None if no layout was computed.
+        """
+        return self._layout_mode
+
+
     def _get_node_per_name(self, name: str) -> Node | None:
         for node in self._dg_entities + self._input_nodes:
             if node.name() == name:
@@ -383,13 +735,143 @@ class Graph:
         return None
 
 
-    def refresh_graph_data(self):
+    def refresh_graph_data(self) -> GraphChanges:
         """ This function updates the graph by fetching the dynamic graph's data,
             without generating a new graph layout nor creating the needed qt items.
             Raises a ConnectionError if there is no connection to the kernel.
+
+            Only the changes are applied to the graph: the nodes, ports, edges
+            and clusters which still exist are kept. If the topology of the
+            dynamic graph has not changed since the last refresh, only the
+            signals' values and execution times are fetched and updated, and the
+            current qt items can be reused (see `update_qt_items_values`).
+
+            If the values are loaded lazily (see `set_lazy_values`), only the
+            topology is fetched: the values which are not cached are
+            NOT_LOADED.
+
+            Returns:
+                The changes applied to the graph.
         """
-        self._clear_dg_data()
-        self._get_dg_data()
+        return self.apply_graph_update(self.fetch_graph_update())
+
+
+    def fetch_graph_update(self) -> GraphUpdate:
+        """ Fetches the dynamic graph's data needed to refresh the graph (see
+            `refresh_graph_data`), without modifying the graph: it can be
+            called outside of the qt GUI thread, and the update applied later
+            with `apply_graph_update`.
+            Raises a ConnectionError if there is no connection to the kernel.
+        """
+        # The fingerprint and the data are fetched by the same kernel command,
+        # so that the graph cannot change between them:
+        known_fingerprint = self._topology_fingerprint
+        (fingerprint, snapshot, graph_values) = \
+            self._dg_communication.get_graph_update(
+                known_fingerprint, with_values = not self._lazy_values)
+        return GraphUpdate(known_fingerprint, fingerprint, snapshot,
+                           graph_values)
+
+
+    def apply_graph_update(self, update: GraphUpdate) -> GraphChanges:
+        """ Applies data fetched by `fetch_graph_update` to the graph (see
+            `refresh_graph_data`).
+
+            Returns:
+                The changes applied to the graph.
+        """
+        # The graph is connected to the kernel: the dot processes are started
+        # before the layouts need them.
+        self._start_dot_workers()
+
+        if not update.topology_changed():
+            if update.values is None:
+                return GraphChanges()
+            return self.apply_graph_values(update.values)
+
+        changes = self._apply_dg_data(update.snapshot)
+        self._topology_fingerprint = update.fingerprint
+        return changes
+
+
+    def _start_dot_workers(self) -> None:
+        """ Starts, in the background, the dot processes of the next layouts
+            (see `DotWorkerPool.start`), if they are computed by dot.
+        """
+        if self._layout_engine == 'layered':
+            return
+        if self._lean_layout:
+            self._get_lean_dot_workers().start()
+        else:
+            self._dot_workers.start()
+
+
+    def copy_model(self) -> Graph:
+        """ Returns a copy of the graph whose nodes, ports, edges and clusters
+            are copies of this graph's, and which shares its settings, caches
+            and dot processes. The copied elements keep the qt items of the
+            original ones, so that the copy can keep them when it generates
+            its own (see `generate_qt_items`).
+
+            A refresh can then be applied to the copy outside of the qt GUI
+            thread while this graph is displayed, and the copy replace it once
+            the refresh succeeded (see `adopt_model`). The copy is made
+            element by element, as the graph can be too deep for
+            `copy.deepcopy`.
+        """
+        model = copy(self)
+        copies: Dict[GraphElement, GraphElement] = {}
+        pending: List[GraphElement] = []
+
+        def copied(value: Any) -> Any:
+            """ Returns the copy of an element (or a list of copies for a list
+                of elements), copying it if needed.
+            """
+            if isinstance(value, list):
+                return [copied(item) for item in value]
+            if not isinstance(value, GraphElement):
+                return value
+            element_copy = copies.get(value)
+            if element_copy is None:
+                element_copy = copy(value)
+                copies[value] = element_copy
+                pending.append(value)
+            return element_copy
+
+        model._dg_entities = copied(self._dg_entities)
+        model._input_nodes = copied(self._input_nodes)
+        model._clusters = copied(self._clusters)
+        # The references of each copied element are replaced by references to
+        # the copies:
+        while pending:
+            element = pending.pop()
+            attributes = vars(copies[element])
+            for (name, value) in vars(element).items():
+                attributes[name] = copied(value)
+
+        model._element_copies = copies
+        return model
+
+
+    def adopt_model(self, model: Graph) -> Dict[GraphElement, GraphElement]:
+        """ Replaces the nodes, ports, edges and clusters of the graph by
+            those of a copy returned by `copy_model` (e.g once a refresh was
+            applied to it), along with its data fetched from the kernel and
+            its layout mode. The settings of this graph are kept.
+
+            This method must be called in the qt GUI thread, before generating
+            the qt items of the new model.
+
+            Returns:
+                The copy of each element of this graph, per element.
+        """
+        self._dg_entities = model._dg_entities
+        self._input_nodes = model._input_nodes
+        self._clusters = model._clusters
+        self._graph_info = model._graph_info
+        self._topology_fingerprint = model._topology_fingerprint
+        self._layout_mode = model._layout_mode
+        return model._element_copies
 
 
     def add_cluster(self, name: str, nodes: List[Node]) -> Cluster:
@@ -420,6 +902,24 @@ class Graph:
                 return
 
 
+    def set_cluster_expanded(self, label: str, expanded: bool) -> None:
+        """ Expands or shrinks a cluster. An expanded cluster is displayed as a
+            box containing its nodes, with its ports on its sides.
+
+            Args:
+                label: label of the cluster.
+                expanded: True to expand the cluster, False to shrink it.
+
+            Raises:
+                ValueError: There is no cluster with this label.
+        """
+        for cluster in self._clusters:
+            if cluster.label() == label:
+                cluster.set_expanded(expanded)
+                return
+        raise ValueError(f"There is no cluster labeled {label}.")
+
+
     def check_clusterizability(self, nodes: List[Node]) -> bool:
         """ Returns True if a Cluster object can be contructed from the given
             list of Nodes.
@@ -456,103 +956,434 @@ class Graph:
     # DYNAMIC GRAPH DATA FETCHING
     #
 
-    def _get_dg_data(self) -> None:
-        """ Fetches the graph data from the dynamic graph and fills the `_dg_entities`
-            and `_input_nodes` lists with `Nodes`, `Ports` and `Edges`.
+    def _apply_dg_data(self, snapshot: Dict[str, Dict[str, Any]] | None) \
+                       -> GraphChanges:
+        """ Applies the graph data fetched from the dynamic graph (see
+            `DynamicGraphCommunication.get_graph_snapshot`) to the
+            `_dg_entities` and `_input_nodes` lists of `Nodes`, `Ports` and
+            `Edges` (see `_apply_dg_snapshot`).
             This method does not create their qt items.
-            Raises a ConnectionError if there is no connection to the kernel.
+
+            Returns:
+                The changes applied to the graph.
         """
+        if snapshot is None: # If the graph is empty
+            snapshot = {}
+        if self._lazy_values:
+            self._set_snapshot_cached_values(snapshot)
+        return self._apply_dg_snapshot(snapshot)
 
-        # Gettings every entity:
-        entities_names = self._dg_communication.get_all_entities_names()
-        if entities_names is None:
-            return
 
-        # For each entity, we will store its signals' infos to create edges later
-        # (they have to be created after all ports have been created):
-        entities_plugs_infos: Dict[EntityNode, List[str]] = {}
+    def _set_snapshot_cached_values(self, snapshot: Dict[str, Dict[str, Any]]) \
+                                    -> None:
+        """ Replaces the NOT_LOADED values of a snapshot fetched without values
+            by the cached ones, if any.
+        """
+        for (name, entity_data) in snapshot.items():
+            for signal_data in entity_data['signals']:
+                if signal_data['value'] is not NOT_LOADED:
+                    continue
+                signal_name = signal_data['description'].split('::')[-1]
+                cached = self._value_cache.get((name, signal_name))
+                if cached is not None:
+                    (signal_data['value'], signal_data['time']) = cached
+
 
-        for name in entities_names:
-            # Creating the node:
-            type = self._dg_communication.get_entity_type(name)
-            new_node = EntityNode(name, type)
-            self._dg_entities.append(new_node)
+    def _apply_dg_snapshot(self, snapshot: Dict[str, Dict[str, Any]]) \
+                           -> GraphChanges:
+        """ Compares a snapshot of the dynamic graph (see
+            `DynamicGraphCommunication.get_graph_snapshot`) with the current
+            graph data, and only applies the differences: added and removed
+            entities, added and removed plugs, changed values. The entities,
+            edges and clusters which did not change are kept.
 
-            # Creating the node's ports:
-            entities_plugs_infos[new_node] = []
-            sig_descriptions = self._dg_communication.get_entity_signals(name)
-            for sig_description in sig_descriptions:
-                plug_info = self._parse_signal_description(sig_description)
+            An entity whose type or signals changed is replaced by a new one.
+
+            Returns:
+                The changes applied to the graph.
+        """
+        changes = GraphChanges()
+
+        # Parsing the description of each entity's signals, and storing them
+        # along with their linked signal, value and last execution time:
+        plugs_infos_per_entity: Dict[str, List[Dict[str, Any]]] = {}
+        for (name, entity_data) in snapshot.items():
+            plugs_infos = []
+            for signal_data in entity_data['signals']:
+                plug_info = self._parse_signal_description(
+                    signal_data['description'])
                 if plug_info is None:
                     continue
-                # Storing this plug's info:
-                entities_plugs_infos[new_node].append(plug_info)
-                # Adding this port to the node:
-                new_node.add_port(plug_info['name'], plug_info['type'])
+                plug_info.update(linked_signal = signal_data['linked_signal'],
+                                 value = signal_data['value'],
+                                 last_exec = signal_data['time'])
+                plugs_infos.append(plug_info)
+            plugs_infos_per_entity[name] = plugs_infos
+
+        # Removing the entities which no longer exist, or whose type or signals
+        # changed:
+        entities_per_name: Dict[str, EntityNode] = {}
+        for entity in self._dg_entities.copy():
+            name = entity.name()
+            if (name in snapshot and self._entity_matches(entity,
+                    snapshot[name]['type'], plugs_infos_per_entity[name])):
+                entities_per_name[name] = entity
+            else:
+                self._remove_entity(entity, changes)
 
-        # Linking the ports with edges:
-        for (node, plugs_infos) in entities_plugs_infos.items():
+        # Adding the new entities and their ports:
+        for (name, entity_data) in snapshot.items():
+            if name in entities_per_name:
+                continue
+            new_node = EntityNode(name, entity_data['type'])
+            for plug_info in plugs_infos_per_entity[name]:
+                new_node.add_port(plug_info['name'], plug_info['type'])
+            self._dg_entities.append(new_node)
+            entities_per_name[name] = new_node
+            changes.added_nodes.append(new_node)
+
+        # Updating the edges plugged to the inputs (they have to be updated
+        # after all ports have been created). We only handle input signals to
+        # prevent handling an edge twice:
+        for (name, plugs_infos) in plugs_infos_per_entity.items():
+            node = entities_per_name[name]
             for plug_info in plugs_infos:
-                # Creating the edge that will be plugged to this port:
-                # We only handle input signals to prevent creating an edge twice
                 if plug_info['type'] == 'input':
-                    self._add_signal_to_dg_data(plug_info, node)
+                    self._update_signal_in_dg_data(plug_info, node,
+                                                   entities_per_name, changes)
 
-        # Getting the data of outputs with no edges:
-        for node in self._dg_entities:
-            for port in node.outputs():
+        # Updating the data of outputs with no edges:
+        for (name, plugs_infos) in plugs_infos_per_entity.items():
+            node = entities_per_name[name]
+            for plug_info in plugs_infos:
+                if plug_info['type'] != 'output':
+                    continue
+                port = node.get_port_per_name(plug_info['name'])
                 if port.edge() is None:
-                    value = self._dg_communication.get_signal_value(node.name(),
-                            port.name())
-                    port.set_value(value)
-                    last_exec = self._dg_communication.get_exec_time(
-                                node.name(), port.name())
-                    port.set_last_exec(last_exec)
+                    self._update_element_value(port, plug_info['value'],
+                                               plug_info['last_exec'], changes)
+
+        # An output can be plugged to several inputs, but a port only holds one
+        # edge: if the edge of an output was removed, it is replaced by one of
+        # its remaining edges.
+        for node in self._dg_entities:
+            for port in node.inputs():
+                edge = port.edge()
+                if (edge is not None and edge.tail() is not None
+                        and edge.tail().edge() is None):
+                    edge.tail().set_edge(edge)
 
+        self._update_clusters(changes)
+        return changes
 
-    def _add_signal_to_dg_data(self, plug_info: Dict[str, str],
-                                child_node: Node) -> None:
-        """ Adds a signal to the dynamic graph data stored in this object.
+
+    def _entity_matches(self, entity: EntityNode, entity_type: str,
+                        plugs_infos: List[Dict[str, Any]]) -> bool:
+        """ Returns True if an entity node has the given type, and ports
+            corresponding to the given signals (see `_apply_dg_snapshot`).
+        """
+        if entity.type() != entity_type:
+            return False
+        current_ports = [(port.name(), port.type()) for port in
+                         entity.inputs() + entity.outputs()]
+        new_ports = ([(info['name'], 'input') for info in plugs_infos
+                      if info['type'] == 'input'] +
+                     [(info['name'], 'output') for info in plugs_infos
+                      if info['type'] == 'output'])
+        return current_ports == new_ports
+
+
+    def _update_signal_in_dg_data(self, plug_info: Dict[str, Any],
+                                  child_node: EntityNode,
+                                  entities_per_name: Dict[str, EntityNode],
+                                  changes: GraphChanges) -> None:
+        """ Updates the edge plugged to an input signal in the dynamic graph
+            data stored in this object: the edge is kept if it is still plugged
+            to the same port (its value is then updated), else it is replaced.
 
             Args:
                 plug_info: data on the signal (see _parse_signal_description for
-                    details).
+                    details), with its `linked_signal` description, `value` and
+                    `last_exec` time as fetched in the graph snapshot.
                 child_node: head node of the signal, i.e the node having this
                     signal as an input.
+                entities_per_name: every entity node of the graph, per name.
+                changes: the changes applied to the graph, which will be
+                    completed.
         """
-        sig_name = plug_info['name']
-        child_node_name = child_node.name()
+        port = child_node.get_port_per_name(plug_info['name'])
+        current_edge = port.edge()
+
+        # Getting the port this signal is plugged to, i.e an output signal of
+        # the parent entity. If the signal is autoplugged (i.e has a fixed value
+        # instead of being plugged to a another entity), the entity appears as
+        # linked to itself through this signal:
+        is_plugged, is_autoplugged, parent_port = False, False, None
+        linked_plug_info = None
+        if plug_info['linked_signal'] is not None:
+            linked_plug_info = self._parse_signal_description(
+                plug_info['linked_signal'])
+        if linked_plug_info is not None:
+            parent_name = linked_plug_info['entity_name']
+            if parent_name == child_node.name():
+                is_plugged, is_autoplugged = True, True
+            elif parent_name in entities_per_name:
+                parent_port = entities_per_name[parent_name].get_port_per_name(
+                    linked_plug_info['name'])
+                is_plugged = parent_port is not None
+
+        # If the signal is still plugged to the same port, only the edge's value
+        # is updated:
+        if current_edge is None:
+            unchanged = not is_plugged
+        elif isinstance(current_edge.tail_node(), InputNode):
+            unchanged = is_autoplugged
+        else:
+            unchanged = (is_plugged and not is_autoplugged and
+                         current_edge.tail() is parent_port)
+        if unchanged:
+            if current_edge is not None:
+                current_edge.set_value_type(plug_info['value_type'])
+                self._update_element_value(current_edge, plug_info['value'],
+                                           plug_info['last_exec'], changes)
+            return
 
-        # Getting the description of the plug this signal is plugged to,
-        # i.e an output signal of the parent entity:
-        is_plugged = self._dg_communication.is_signal_plugged(child_node_name, sig_name)
+        # Else, the edge is replaced:
+        if current_edge is not None:
+            self._remove_edge(current_edge, changes)
         if not is_plugged:
             return
-        linked_plug_descr = self._dg_communication.get_linked_signal(child_node_name, sig_name)
-        if linked_plug_descr is None: # If the node doesn't have a parent node
-            return
-        linked_plug_info = self._parse_signal_description(linked_plug_descr)
 
-        signal_value = self._dg_communication.get_signal_value(child_node_name, sig_name)
-        new_edge = Edge(signal_value, plug_info['value_type'])
-        last_exec = self._dg_communication.get_exec_time(child_node_name, sig_name)
-        new_edge.set_last_exec(last_exec)
+        new_edge = Edge(plug_info['value'], plug_info['value_type'])
+        new_edge.set_last_exec(plug_info['last_exec'])
+        changes.added_edges.append(new_edge)
 
         # Linking the signal to the child port:
         child_node.set_edge_for_port(new_edge, plug_info['name'])
 
-        # If the signal is autoplugged (i.e has a fixed value instead of
-        # being plugged to a another entity), the entity will appear as
-        # linked to itself through this signal
-        if child_node_name == linked_plug_info['entity_name']:
+        if is_autoplugged:
             # If the signal is autoplugged, we add an InputNode to the graph
             # to represent the input value
             new_node = InputNode(new_edge)
             self._input_nodes.append(new_node)
+            changes.added_nodes.append(new_node)
         else:
             # If the signal is not autoplugged, we link it to the parent entity
-            parent_entity = self._get_node_per_name(linked_plug_info['entity_name'])
-            parent_entity.set_edge_for_port(new_edge, linked_plug_info['name'])
+            parent_port.set_edge(new_edge)
+
+
+    def _update_element_value(self, element: Union[Edge, Port], value: Any,
+                              last_exec: int, changes: GraphChanges) -> None:
+        """ Updates the value and last execution time of an edge (and of the
+            ports it links) or of an unplugged port, and stores it in the
+            changes if they differ from the previous ones.
+
+            A value which was not fetched (NOT_LOADED, see `set_lazy_values`)
+            does not replace the value of an element which already has one.
+        """
+        if value is NOT_LOADED and element.value() is not None:
+            return
+        if (not _values_equal(element.value(), value)
+                or element.last_exec() != last_exec):
+            changes.changed_values.append(element)
+
+        if isinstance(element, Edge):
+            element.set_value(value)
+            element.set_last_exec(last_exec)
+            # The edge's value is also the value of the ports it links:
+            ports = [port for port in (element.head(), element.tail())
+                     if port is not None and port.edge() is element]
+        else:
+            ports = [element]
+
+        for port in ports:
+            port.set_value(value)
+            port.set_last_exec(last_exec)
+
+
+    def _remove_entity(self, entity: EntityNode, changes: GraphChanges) -> None:
+        """ Removes an entity node and its edges from the graph. """
+        for port in entity.ports():
+            if port.edge() is not None:
+                self._remove_edge(port.edge(), changes)
+        self._dg_entities.remove(entity)
+        changes.removed_nodes.append(entity)
+
+
+    def _remove_edge(self, edge: Edge, changes: GraphChanges) -> None:
+        """ Removes an edge from the graph, along with its tail node if it is an
+            InputNode.
+        """
+        for port in (edge.head(), edge.tail()):
+            if port is not None and port.edge() is edge:
+                port.remove_edge()
+
+        tail_node = edge.tail_node()
+        if isinstance(tail_node, InputNode) and tail_node in self._input_nodes:
+            self._input_nodes.remove(tail_node)
+            changes.removed_nodes.append(tail_node)
+
+        changes.removed_edges.append(edge)
+
+
+    def _update_clusters(self, changes: GraphChanges) -> None:
+        """ Updates the clusters after the graph's topology changed: clusters
+            containing a removed node or whose nodes are no longer linked are
+            removed, and the ports of the other clusters are updated.
+        """
+        if not changes.topology_changed():
+            return
+
+        removed_nodes = set(changes.removed_nodes)
+        for cluster in self.clusters():
+            nodes = cluster.nodes()
+            if (any(node in removed_nodes for node in nodes)
+                    or not self.check_clusterizability(nodes)):
+                self.remove_cluster(cluster.label())
+                changes.removed_clusters.append(cluster)
+            else:
+                cluster.update_ports()
+
+
+    def apply_graph_values(self, graph_values: Dict[str, Dict[str, Any]]) \
+                           -> GraphChanges:
+        """ Updates the values and execution times of the current edges and
+            ports, without modifying the graph's topology.
+
+            Args:
+                graph_values: values and execution times of the signals, as
+                    returned by `DynamicGraphCommunication.get_graph_values`.
+                    Signals absent from it are not updated.
+
+            Returns:
+                The changes applied to the graph (only values).
+        """
+        if self._lazy_values:
+            self._value_cache.update(graph_values)
+        changes = GraphChanges()
+
+        for node in self._dg_entities:
+            node_values = graph_values.get(node.name(), {})
+
+            for port in node.inputs():
+                edge = port.edge()
+                if edge is None or port.name() not in node_values:
+                    continue
+                (value, last_exec) = node_values[port.name()]
+                self._update_element_value(edge, value, last_exec, changes)
+
+            for port in node.outputs():
+                if port.edge() is not None or port.name() not in node_values:
+                    continue
+                (value, last_exec) = node_values[port.name()]
+                self._update_element_value(port, value, last_exec, changes)
+
+        return changes
+
+
+    def update_signals_values(self, pairs: List[Tuple[str, str]],
+                              full_values: bool = False) -> GraphChanges:
+        """ Fetches the values and execution times of the given signals with
+            batched kernel commands, and updates those of the corresponding
+            edges and ports.
+            Raises a ConnectionError if there is no connection to the kernel.
+
+            Args:
+                pairs: list of tuples (entity name, signal name), e.g as
+                    returned by `get_elements_signals`.
+                full_values: if True, large values are fetched in full instead
+                    of as summaries.
+
+            Returns:
+                The changes applied to the graph (only values).
+        """
+        signals_data = self._dg_communication.get_signals_data(pairs,
+                                                               full_values)
+        return self.apply_graph_values(signals_data)
+
+
+    def load_values(self, pairs: List[Tuple[str, str]]) -> GraphChanges:
+        """ Loads the values of the given signals when they are loaded lazily
+            (see `set_lazy_values`): only the values which are not cached, or
+            whose cache entry expired, are fetched from the kernel.
+            Raises a ConnectionError if there is no connection to the kernel.
+
+            Args:
+                pairs: list of tuples (entity name, signal name), e.g as
+                    returned by `get_displayed_signals`.
+
+            Returns:
+                The changes applied to the graph (only values).
+        """
+        missing_pairs = self._value_cache.missing(pairs)
+        if missing_pairs == []:
+            return GraphChanges()
+        return self.update_signals_values(missing_pairs)
+
+
+    def get_elements_signals(self, elements: List[GraphElement]) \
+                             -> List[Tuple[str, str]]:
+        """ Returns the signals holding the values of the given graph elements
+            (all the ports of a node, the port itself, or the head of an edge),
+            as a list of tuples (entity name, signal name).
+
+            The value of a plugged output is the value of the input it is
+            plugged to: the input is returned instead of the output.
+        """
+        ports: List[Port] = []
+        for element in elements:
+            if isinstance(element, Cluster):
+                ports += [port.node_port() for port in element.ports()]
+            elif isinstance(element, EntityNode):
+                ports += element.ports()
+            elif isinstance(element, InputNode):
+                ports.append(element.child_port())
+            elif isinstance(element, ClusterPort):
+                ports.append(element.node_port())
+            elif isinstance(element, Port):
+                ports.append(element)
+            elif isinstance(element, Edge) and element.head() is not None:
+                ports.append(element.head())
+
+        pairs: Dict[Tuple[str, str], None] = {}
+        for port in ports:
+            if port.type() == 'output' and port.edge() is not None:
+                port = port.edge().head()
+            if port is None or not isinstance(port.node(), EntityNode):
+                continue
+            pairs[(port.node().name(), port.name())] = None
+        return list(pairs)
+
+
+    def get_displayed_signals(self, rect: QRectF = None) \
+                              -> List[Tuple[str, str]]:
+        """ Returns the signals whose values are currently displayed (by an
+            edge's label or an input node), as a list of tuples (entity name,
+            signal name).
+
+            Args:
+                rect: if given, only the signals displayed by qt items
+                    intersecting this rectangle (in scene coordinates) are
+                    returned, e.g the visible ones.
+        """
+        displayed_edges = []
+        for node in self._dg_entities:
+            for port in node.inputs():
+                edge = port.edge()
+                if edge is None:
+                    continue
+                tail_node = edge.tail_node()
+                if isinstance(tail_node, InputNode):
+                    qt_item = tail_node.qt_item()
+                else:
+                    qt_item = edge.qt_item()
+                if qt_item is None:
+                    continue
+                if (rect is not None
+                        and not qt_item.sceneBoundingRect().intersects(rect)):
+                    continue
+                displayed_edges.append(edge)
+        return self.get_elements_signals(displayed_edges)
 
 
     def _parse_signal_description(self, signal_description: str) -> Dict[str, str] | None:
@@ -580,79 +1411,230 @@ class Graph:
             return None
 
 
-    def _clear_dg_data(self) -> None:
-        """ Resets all the information on nodes, ports and edges and their qt items. """
-        self._dg_entities = []
-        self._input_nodes = []
-        self._clusters = []
-        self._graph_info = {}
-
-
     #
-    # DOT CODE GENERATION
+    # LAYOUT DATA GENERATION
     #
 
-    def _get_encoded_dot_code(self) -> bytes:
+    def _get_encoded_dot_code(self, node_names: Set[str] = None,
+                              cluster: Cluster = None,
+                              cluster_sizes: Dict[str, Tuple[float, float]]
+                              = None) -> bytes:
         """ Returns an encoded dot string of the graph data (as generated
-            by the `_get_dg_data` method).
+            by the `_apply_dg_data` method).
+
+            Args:
+                node_names: if given, only the nodes (and clusters) with these
+                    names, and their input edges, are added to the dot code
+                    (e.g the nodes of a connected component).
+                cluster: if given, the dot code of the interior of this
+                    cluster: its nodes and the edges between them.
+                cluster_sizes: size of the label's cell of each expanded
+                    cluster, per name (see
+                    `ComponentsQtGenerator.cluster_label_size`).
         """
+        return self._get_dot_data_generator(
+            node_names, cluster, cluster_sizes).get_encoded_dot_string()
+
 
-        dot_generator = DotDataGenerator()
+    def _get_dot_data_generator(self, node_names: Set[str] = None,
+                                cluster: Cluster = None,
+                                cluster_sizes: Dict[str, Tuple[float, float]]
+                                = None) -> DotDataGenerator:
+        """ Returns a dot data generator containing the graph data (see
+            `_get_encoded_dot_code`).
+        """
+        return DotDataGenerator.from_graph_ir(
+            self._get_graph_ir(node_names, cluster, cluster_sizes))
+
+
+    def _get_graph_ir(self, node_names: Set[str] = None,
+                      cluster: Cluster = None,
+                      cluster_sizes: Dict[str, Tuple[float, float]] = None,
+                      canonical: bool = None) -> GraphIR:
+        """ Returns the intermediate representation of the graph data given
+            to the layout backends (see `_get_encoded_dot_code` for the
+            arguments). If `canonical` is None, the representation is
+            canonical if the canonical dot code is enabled (see
+            `set_canonical_dot`).
+        """
+        if cluster is None:
+            nodes = self._get_displayed_nodes()
+        else:
+            nodes = cluster.nodes()
+        if node_names is not None:
+            nodes = [node for node in nodes if node.name() in node_names]
+        return self._get_graph_irs([nodes], cluster_sizes, canonical)[0]
+
+
+    def _get_graph_irs(self, node_groups: List[List[Node]],
+                       cluster_sizes: Dict[str, Tuple[float, float]] = None,
+                       canonical: bool = None) -> List[GraphIR]:
+        """ Returns the intermediate representations of several groups of
+            nodes (e.g the connected components, see `_get_components`, or
+            the interiors of expanded clusters), built in a single pass over
+            the graph. The nodes of a group must all be displayed at the top
+            level, or all be in the same cluster. See `_get_graph_ir` for the
+            other arguments.
+        """
+        if canonical is None:
+            canonical = self._canonical_dot
 
-        # Setting the graph's layout to `left to right`:
-        dot_generator.set_graph_attributes({'rankdir': quoted('LR')})
+        # Setting the graphs' layout to `left to right`:
+        graph_irs = [GraphIR({'rankdir': quoted('LR')}) for _ in node_groups]
+        graph_ir_per_node: Dict[Node, GraphIR] = {
+            node: graph_ir for (graph_ir, nodes) in zip(graph_irs, node_groups)
+            for node in nodes}
 
         # Adding the nodes and their ports (if needed), and then the edges:
-        self._add_input_nodes_to_dot_code(dot_generator)
-        self._add_entity_nodes_to_dot_code(dot_generator)
-        self._add_clusters_to_dot_code(dot_generator)
-        self._add_edges_to_dot_code(dot_generator)
+        self._add_input_nodes_to_graph_irs(graph_ir_per_node, canonical)
+        self._add_entity_nodes_to_graph_irs(graph_ir_per_node, canonical)
+        self._add_clusters_to_graph_irs(graph_ir_per_node, cluster_sizes,
+                                        canonical)
+        self._add_cluster_inputs_to_graph_irs(graph_ir_per_node, canonical)
+        self._add_edges_to_graph_irs(graph_ir_per_node, canonical)
 
-        return dot_generator.get_encoded_dot_string()
+        return graph_irs
 
 
-    def _add_input_nodes_to_dot_code(self, dot_generator: DotDataGenerator) \
-                                     -> None:
-        """ Adds all of the graph's input nodes to the given dot data generator. """
+    def _get_displayed_nodes(self) -> List[Node]:
+        """ Returns the nodes displayed at the top level of the graph: input
+            nodes, entity nodes and clusters, excluding the nodes which are in
+            a cluster.
+        """
+        return self._ordered([node for node in (self._input_nodes
+                                                + self._dg_entities
+                                                + self._clusters)
+                              if node.cluster() is None], self._canonical_dot)
 
-        # From now on, every added node will be round:
-        dot_generator.set_node_attributes({'shape': 'ellipse'})
 
-        # For every input, we only display a node (and not its output port):
-        for node in self._input_nodes:
+    def _get_interior_nodes(self) -> List[Node]:
+        """ Returns the nodes displayed inside the expanded clusters. """
+        return [node for node in self._input_nodes + self._dg_entities
+                if node.cluster() is not None and node.cluster().is_expanded()]
 
-            # If the node is in a cluster, we don't add it in the main graph
-            if node.cluster() is not None:
+
+    def _get_components(self) -> List[List[Node]]:
+        """ Returns the weakly connected components of the displayed graph (see
+            `_get_displayed_nodes`), as lists of nodes. The components are
+            sorted by the name of their first node, and the nodes of a
+            component are in the same order as in `_get_displayed_nodes`.
+        """
+        nodes = self._get_displayed_nodes()
+
+        # Union-find of the nodes' names:
+        parent_per_name: Dict[str, str] = {node.name(): node.name()
+                                           for node in nodes}
+        def find(name: str) -> str:
+            while parent_per_name[name] != name:
+                parent_per_name[name] = parent_per_name[parent_per_name[name]]
+                name = parent_per_name[name]
+            return name
+
+        for node in nodes:
+            if isinstance(node, InputNode):
                 continue
+            for port in node.inputs():
+                edge = port.edge()
+                if edge is None:
+                    continue
+                tail_node = edge.tail_node()
+                # An edge coming from a node in a cluster comes from the
+                # cluster:
+                if tail_node.cluster() is not None:
+                    tail_node = tail_node.cluster()
+                if tail_node.name() not in parent_per_name:
+                    continue
+                parent_per_name[find(node.name())] = find(tail_node.name())
 
-            output_ports = node.outputs()
-            if len(output_ports) != 1:
-                raise ValueError("An InputNode should have exactly one output.")
-            output_value = quoted(str(node.value()))
-            dot_generator.add_node(node.name(), {'label': output_value})
+        nodes_per_root: Dict[str, List[Node]] = {}
+        for node in nodes:
+            nodes_per_root.setdefault(find(node.name()), []).append(node)
+        return sorted(nodes_per_root.values(),
+                      key=lambda component: component[0].name())
 
 
-    def _add_entity_nodes_to_dot_code(self, dot_generator: DotDataGenerator) \
-                                      -> None:
-        """ Adds all of the graph's entity nodes, with their ports, to the given
-            dot data generator.
+    def _get_layout_size(self, component: List[Node]) -> int:
+        """ Returns the size of a component for its layout: its number of nodes
+            and of edges (see LayoutBudget).
         """
+        edges_nb = sum(1 for node in component
+                       if not isinstance(node, InputNode)
+                       for port in node.inputs() if port.edge() is not None)
+        return len(component) + edges_nb
+
+
+    def _get_layout_value_label(self, value: Any,
+                                canonical: bool = False) -> str:
+        """ Returns the label displaying a value in the layout: the value
+            itself, or a fixed-size placeholder if the values are displayed by
+            overlay items (see `set_value_overlays`) or if the dot code is
+            canonical.
+        """
+        if canonical or self._uses_value_overlays():
+            return VALUE_PLACEHOLDER
+        return value_label(value)
+
 
-        # From now on, every added node will have no shape (the html label will
-        # make the shape):
-        dot_generator.set_node_attributes({'shape': 'none'})
+    def _ordered(self, nodes: List[Node], canonical: bool) -> List[Node]:
+        """ Returns the nodes sorted by name if `canonical` is True, or in
+            the kernel's order otherwise.
+        """
+        if canonical:
+            return sorted(nodes, key=lambda node: node.name())
+        return nodes
 
-        for entity in self._dg_entities:
 
-            # If the node is in a cluster, we don't add it in the main graph
-            if entity.cluster() is not None:
+    def _get_ports_names(self, ports: List[Port], canonical: bool) \
+                         -> List[str]:
+        """ Returns the names of the ports, in natural order if `canonical`
+            is True, or in the kernel's order otherwise.
+        """
+        names = [port.name() for port in ports]
+        if canonical:
+            names.sort(key=natural_sort_key)
+        return names
+
+
+    def _add_input_nodes_to_graph_irs(self,
+                                      graph_ir_per_node: Dict[Node, GraphIR],
+                                      canonical: bool = False) -> None:
+        """ Adds the graph's input nodes to their graph representation (if
+            they have one in `graph_ir_per_node`), as ellipses. If `canonical`
+            is True, they are sorted by name.
+        """
+
+        # For every input, we only display a node (and not its output port):
+        for node in self._ordered(self._input_nodes, canonical):
+            graph_ir = graph_ir_per_node.get(node)
+            if graph_ir is None:
                 continue
 
-            inputs = [port.name() for port in entity.inputs()]
-            outputs = [port.name() for port in entity.outputs()]
+            output_ports = node.outputs()
+            if len(output_ports) != 1:
+                raise ValueError("An InputNode should have exactly one output.")
+            output_value = self._get_layout_value_label(node.value(),
+                                                        canonical)
+            graph_ir.add_ellipse_node(node.name(), output_value)
+
+
+    def _add_entity_nodes_to_graph_irs(self,
+                                       graph_ir_per_node: Dict[Node, GraphIR],
+                                       canonical: bool = False) -> None:
+        """ Adds the graph's entity nodes, with their ports, to their graph
+            representation (if they have one in `graph_ir_per_node`), as
+            tables. If `canonical` is True, the nodes are sorted by name and
+            their ports in natural order.
+        """
+        for entity in self._ordered(self._dg_entities, canonical):
+            graph_ir = graph_ir_per_node.get(entity)
+            if graph_ir is None:
+                continue
+
+            inputs = self._get_ports_names(entity.inputs(), canonical)
+            outputs = self._get_ports_names(entity.outputs(), canonical)
             label = self._generate_entity_node_label(entity)
 
-            dot_generator.add_html_node(entity.name(), (inputs, outputs), label)
+            graph_ir.add_table_node(entity.name(), label, inputs, outputs)
 
 
     def _generate_entity_node_label(self, node: EntityNode) -> str:
@@ -670,60 +1652,125 @@ class Graph:
         return f"{node_type}({node_name})"
 
 
-    def _add_clusters_to_dot_code(self, dot_generator: DotDataGenerator) \
-                                  -> None:
-        """ Adds a cluster to the given dot data generator.
+    def _add_clusters_to_graph_irs(self,
+                                   graph_ir_per_node: Dict[Node, GraphIR],
+                                   cluster_sizes: Dict[str, Tuple[float, float]]
+                                   = None, canonical: bool = False) -> None:
+        """ Adds the clusters to their graph representation (if they have one
+            in `graph_ir_per_node`), as tables (sorted by name, with their
+            ports in natural order, if `canonical` is True).
 
-            The cluster will be added as a subgraph if it is expanded. Else, it
-            will be added as an html node.
+            The label's cell of an expanded cluster has the size given in
+            `cluster_sizes`, so that its interior (laid out separately) can be
+            placed in it.
         """
-        for cluster in self._clusters:
-            if cluster.is_expanded():
-                raise NotImplementedError
-            else:
-                inputs = [port.name() for port in cluster.inputs()]
-                outputs = [port.name() for port in cluster.outputs()]
-                dot_generator.add_html_node(cluster.name(), (inputs, outputs),
-                                            cluster.label())
-
-
-    def _add_edges_to_dot_code(self, dot_generator: DotDataGenerator):
-        """ Adds all of the graph's edges to the given dot data generator. """
+        for cluster in self._ordered(self._clusters, canonical):
+            graph_ir = graph_ir_per_node.get(cluster)
+            if graph_ir is None:
+                continue
+            label_size = None
+            if cluster.is_expanded() and cluster_sizes is not None:
+                label_size = cluster_sizes.get(cluster.name())
+            inputs = self._get_ports_names(cluster.inputs(), canonical)
+            outputs = self._get_ports_names(cluster.outputs(), canonical)
+            graph_ir.add_table_node(cluster.name(), cluster.label(), inputs,
+                                    outputs, label_size)
+
+
+    def _add_cluster_inputs_to_graph_irs(self,
+                                         graph_ir_per_node: Dict[Node, GraphIR],
+                                         canonical: bool = False) -> None:
+        """ Adds, to the graph representation of each expanded cluster's
+            interior (if it is in `graph_ir_per_node`), an empty node for each
+            plugged input port of the cluster: the edges coming from outside of
+            the cluster start from it (see `ClusterPort.interior_node_name`).
+            If `canonical` is True, the clusters are sorted by name and their
+            ports in natural order.
+        """
+        for cluster in self._ordered(self._clusters, canonical):
+            graph_ir = next((graph_ir_per_node[node] for node in cluster.nodes()
+                             if node in graph_ir_per_node), None)
+            if graph_ir is None:
+                continue
+            ports = [port for port in cluster.inputs()
+                     if port.edge() is not None]
+            if canonical:
+                ports.sort(key=lambda port: natural_sort_key(port.name()))
+            for port in ports:
+                graph_ir.add_ellipse_node(port.interior_node_name(), '')
 
-        # We only handle input edges so as to not add an edge twice: only entity
-        # nodes and clusters can have inputs, and there is no final output
-        # displayed
-        for node in self._dg_entities + self.shrinked_clusters():
 
-            # If the node is in a cluster, we ignore it as the cluster will be
-            # handled later
-            if node.cluster() is not None:
+    def _add_edges_to_graph_irs(self, graph_ir_per_node: Dict[Node, GraphIR],
+                                canonical: bool = False):
+        """ Adds the input edges of the graph's nodes to the graph
+            representation of their head node (if it has one in
+            `graph_ir_per_node`). If `canonical` is True, the edges of each
+            representation are sorted by head node and port.
+        """
+        edges_per_graph_ir: Dict[GraphIR, List[Tuple[Edge, Port, Port]]] = {}
+        for node in self._dg_entities + self._clusters:
+            graph_ir = graph_ir_per_node.get(node)
+            if graph_ir is None:
                 continue
+            edges_per_graph_ir.setdefault(graph_ir, []).extend(
+                self._get_node_displayed_edges(node, node.cluster()))
+
+        for (graph_ir, edges) in edges_per_graph_ir.items():
+            if canonical:
+                edges.sort(key=lambda edge_data: (
+                    edge_data[1].node().name(),
+                    natural_sort_key(edge_data[1].name())))
+            for (edge, head_port, tail_port) in edges:
+                self._add_edge_to_graph_ir(edge, head_port, tail_port,
+                                           graph_ir, canonical)
+
+
+    def _get_node_displayed_edges(self, node: Node, cluster: Cluster = None) \
+                                  -> List[Tuple[Edge, Port, Port]]:
+        """ Returns the displayed input edges of an entity node or a cluster,
+            as tuples (edge, head port, tail port).
+
+            At the top level of the graph, if the tail is in a cluster, the
+            tail port is the cluster's port. If `cluster` is given, the node is
+            displayed inside it, and the tail port of an edge coming from
+            outside of the cluster is the cluster's input port (see
+            `ClusterPort.interior_node_name`).
+        """
+        displayed_edges = []
+        for port in node.inputs():
 
-            for port in node.inputs():
-
-                edge: Edge = port.edge()
-                if edge is None: # If that port is not plugged to a signal
-                    continue
+            edge: Edge = port.edge()
+            if edge is None: # If that port is not plugged to a signal
+                continue
 
-                head_port: Port = port
-                tail_port: Port = edge.tail()
+            head_port: Port = port
+            tail_port: Port = edge.tail()
+
+            # Inside a cluster, the edges coming from outside of the cluster
+            # come from the cluster's ports:
+            tail_cluster: Cluster = self._get_cluster_for_port(tail_port)
+            if cluster is not None:
+                if tail_cluster is not cluster:
+                    tail_port = cluster.get_cluster_port_per_node_port(
+                                head_port)
+                displayed_edges.append((edge, head_port, tail_port))
+                continue
 
-                # If the tail is in a shrunk cluster, we link the edge to the
-                # cluster port instead of the node port:
-                tail_cluster: Cluster = self._get_cluster_for_port(tail_port)
-                if tail_cluster is not None and not tail_cluster.is_expanded():
-                    tail_port = tail_cluster.get_cluster_port_per_node_port(
-                                tail_port)
+            # If the tail is in a cluster, we link the edge to the cluster
+            # port instead of the node port:
+            if tail_cluster is not None:
+                tail_port = tail_cluster.get_cluster_port_per_node_port(
+                            tail_port)
 
+            displayed_edges.append((edge, head_port, tail_port))
 
-                self._add_edge_to_dot_code(edge, head_port, tail_port,
-                                           dot_generator)
+        return displayed_edges
 
 
-    def _add_edge_to_dot_code(self, edge: Edge, head: Port, tail: Port,
-                              dot_generator: DotDataGenerator) -> None:
-        """ Adds an edge to a dot code generator.
+    def _add_edge_to_graph_ir(self, edge: Edge, head: Port, tail: Port,
+                              graph_ir: GraphIR,
+                              canonical: bool = False) -> None:
+        """ Adds an edge to a graph representation.
 
             Args:
                 edge: the edge to add.
@@ -731,7 +1778,8 @@ class Graph:
                     this edge.
                 tail: the tail port of the edge, i.e the node output plugged to
                     this edge.
-                dot_generator: the DotDataGenerator to add the edge to.
+                graph_ir: the GraphIR to add the edge to.
+                canonical: if True, the value is not part of the label.
         """
 
         child_port_name = head.name()
@@ -741,71 +1789,388 @@ class Graph:
         parent_node = tail.node()
         parent_node_name = tail.node().name()
 
-         # The value is displayed only if the parent node isn't an InputNode:
-        attributes = None
-        if not isinstance(tail.node(), InputNode):
-            attributes = {'label': quoted(str(edge.value()))}
+        # Inside an expanded cluster, the edges coming from outside of it start
+        # from the node standing for the cluster's input port:
+        from_cluster_input = parent_node is head.node().cluster()
+
+         # The value is displayed only if the parent node isn't an InputNode
+         # (and only once, by the part of the edge outside of a cluster):
+        label = None
+        if not isinstance(tail.node(), InputNode) and not from_cluster_input:
+            label = self._get_layout_value_label(edge.value(), canonical)
 
         # The tail port will not be displayed if the parent node is an input
         # value
         if isinstance(parent_node, InputNode):
             tail = (parent_node_name, None)
+        elif from_cluster_input:
+            tail = (tail.interior_node_name(), None)
         else:
             tail = (parent_node_name, parent_port_name)
 
         head = (child_node_name, child_port_name)
 
-        dot_generator.add_edge(tail, head, attributes)
+        graph_ir.add_edge(tail, head, label)
 
 
     #
     # QT ITEMS GENERATION
     #
 
-    def generate_qt_items(self) -> None:
+    def compute_layout(self, cancel_event: Event = None) \
+                       -> Tuple[List[JsonOutput],
+                                Dict[str, Tuple[JsonOutput, bool]]] | None:
+        """ Computes the graph's layout with the layout engine (see
+            `set_layout_engine`), and returns dot's json outputs (already
+            parsed for the layered layout, see JsonOutput).
+
+            Each weakly connected component of the graph is laid out separately,
+            concurrently with the others, in the order of `_get_components`.
+            The small components are laid out together in batches (see
+            `_batch_components`).
+            If the same dot code was already laid out (e.g a component which
+            did not change), the cached layout is used without running dot (see
+            LayoutCache).
+
+            The layout is hierarchical: the interior of each expanded cluster
+            is laid out first, as a separate graph, and the cluster is then laid
+            out at the top level as a node whose label's cell has the size of
+            its interior. An interior is thus laid out (and cached) once, and
+            expanding or shrinking a cluster only changes the layout of the top
+            level.
+
+            The layout mode of each component is chosen according to its size
+            and to the layout budget (see `set_layout_budget`), which is shared
+            by all the layouts. The fastest mode used can then be retrieved
+            with `layout_mode`.
+
+            This method does not create any qt item, and can be run outside of
+            the qt GUI thread.
+
+            Args:
+                cancel_event: if given and set while dot is running, dot is
+                    stopped and None is returned.
+
+            Returns:
+                A tuple (json output of each component, tuple (json output of
+                its interior, True if it has no input port) per expanded
+                cluster's name). It can be given to `create_qt_generator`.
+
+            Raises:
+                TimeoutError: The layout took longer than the layout timeout
+                    (see `set_layout_timeout`).
+                RuntimeError: dot failed to compute the layout.
+        """
+        # The layout budget is shared by all the layouts:
+        deadline = self._layout_budget.deadline()
+        clusters = self.expanded_clusters()
+        cluster_results = self._compute_layouts(
+            [cluster.nodes() for cluster in clusters], None, cancel_event,
+            deadline)
+        if any(layout is None for (layout, _) in cluster_results):
+            return None # If it was cancelled
+        cluster_layouts = {cluster.name(): (layout, cluster.inputs() == [])
+                           for (cluster, (layout, _))
+                           in zip(clusters, cluster_results)}
+
+        cluster_sizes = {name: ComponentsQtGenerator.cluster_label_size(layout)
+                         for (name, (layout, _)) in cluster_layouts.items()}
+        components = self._batch_components(self._get_components())
+        results = self._compute_layouts(components, cluster_sizes,
+                                        cancel_event, deadline)
+        layouts = [layout for (layout, _) in results]
+        if any(layout is None for layout in layouts): # If it was cancelled
+            return None
+
+        # The layered layout forgets the nodes which are no longer displayed:
+        if self._layout_engine == 'layered':
+            laid_out = components + [cluster.nodes() for cluster in clusters]
+            self._layered_layout.retain({node.name() for nodes in laid_out
+                                         for node in nodes})
+
+        modes = self._layout_budget.modes() + [LAYERED_LAYOUT_MODE]
+        self._layout_mode = max((mode for (_, mode)
+                                 in results + cluster_results),
+                                key=modes.index, default=None)
+        return (layouts, cluster_layouts)
+
+
+    def _batch_components(self, components: List[List[Node]]) \
+                          -> List[List[Node]]:
+        """ Groups the small components (e.g isolated nodes) in batches, which
+            are laid out as a single component, so that dot is not run for
+            each of them. A batch contains consecutive components whose layout
+            size is at most SMALL_COMPONENT_SIZE, up to a total size of
+            MAX_BATCH_SIZE, and takes the place of its first component.
+        """
+        batched_components: List[List[Node]] = []
+        (batch, batch_size) = (None, 0)
+        for component in components:
+            size = self._get_layout_size(component)
+            if size > SMALL_COMPONENT_SIZE:
+                batched_components.append(component)
+                continue
+            if batch is None or batch_size + size > MAX_BATCH_SIZE:
+                (batch, batch_size) = ([], 0)
+                batched_components.append(batch)
+            batch += component
+            batch_size += size
+        return batched_components
+
+
+    def _compute_layouts(self, components: List[List[Node]],
+                         cluster_sizes: Dict[str, Tuple[float, float]] | None,
+                         cancel_event: Event = None,
+                         deadline: float = None) \
+                         -> List[Tuple[JsonOutput | None, LayoutMode]]:
+        """ Computes the layouts of several components (or interiors of
+            clusters, see `_compute_component_layout`) with the layout engine,
+            concurrently. Their graph representations are built in a single
+            pass (see `_get_graph_irs`).
+        """
+        graph_irs = self._get_graph_irs(components, cluster_sizes)
+
+        def compute_component_layout(component: List[Node],
+                                     graph_ir: GraphIR) \
+                                     -> Tuple[JsonOutput | None, LayoutMode]:
+            if self._layout_engine == 'layered':
+                return self._compute_layered_layout(graph_ir, cancel_event)
+            return self._compute_component_layout(component, graph_ir,
+                                                  cancel_event, deadline)
+
+        if len(components) <= 1:
+            return [compute_component_layout(component, graph_ir)
+                    for (component, graph_ir) in zip(components, graph_irs)]
+
+        workers_nb = min(len(components), LAYOUT_WORKERS_NB)
+        with ThreadPoolExecutor(max_workers=workers_nb) as executor:
+            return list(executor.map(compute_component_layout, components,
+                                     graph_irs))
+
+
+    def _compute_layered_layout(self, graph_ir: GraphIR,
+                                cancel_event: Event = None) \
+                                -> Tuple[Dict[str, Any] | None, LayoutMode]:
+        """ Computes the layout of a component, given its graph representation,
+            with the built-in layered layout (see LayeredLayout), and returns
+            a tuple (layout in the format of dot's parsed json output,
+            LAYERED_LAYOUT_MODE). The layout is None if it was cancelled.
+        """
+        if cancel_event is not None and cancel_event.is_set():
+            return (None, LAYERED_LAYOUT_MODE)
+        # The nodes and edges are the same as in the dot code:
+        (nodes, edges) = graph_ir.layout_data()
+        return (self._layered_layout.layout(nodes, edges), LAYERED_LAYOUT_MODE)
+
+
+    def _compute_component_layout(self, component: List[Node],
+                                  graph_ir: GraphIR,
+                                  cancel_event: Event = None,
+                                  deadline: float = None) \
+                                  -> Tuple[JsonOutput | None, LayoutMode]:
+        """ Computes the layout of a component (or of the interior of a
+            cluster), given its nodes and its graph representation, and
+            returns a tuple (dot's json output, parsed for the lean layouts,
+            layout mode used). The output is None if the layout was cancelled.
+
+            The layout is first computed in the mode chosen for the size of the
+            component (see LayoutBudget). If it is not done by `deadline` (see
+            `LayoutBudget.deadline`), it is stopped and computed in the next,
+            faster, mode. The fastest mode gets at least a share of the budget
+            (see `LayoutBudget.timeout`). The layout timeout always applies.
+
+            Raises:
+                TimeoutError: The layout took longer than the layout timeout.
+                RuntimeError: dot failed to compute the layout.
+        """
+        dot_generator = DotDataGenerator.from_graph_ir(graph_ir)
+        size = self._get_layout_size(component)
+
+        # The dot code of each mode is hashed and written to dot chunk by
+        # chunk, without building the whole string:
+        def mode_dot_code(mode: LayoutMode) -> DotDataGenerator:
+            mode_generator = dot_generator.copy()
+            mode_generator.set_graph_attributes(mode.attributes())
+            return mode_generator
+
+        # With lean layouts, dot's output is converted to the format of its
+        # parsed full json output, which is cached in memory with the layout:
+        lean_layout = self._lean_layout
+        if lean_layout:
+            (output_format, dot_workers) = (LEAN_OUTPUT_FORMAT,
+                                            self._get_lean_dot_workers())
+        else:
+            (output_format, dot_workers) = ('json', self._dot_workers)
+
+        def cached(dot_code: DotDataGenerator) -> JsonOutput | None:
+            if lean_layout:
+                rendered_layout = self._layout_cache.get(dot_code,
+                                                         RENDERED_LEAN_FORMAT)
+                if rendered_layout is not None:
+                    return rendered_layout
+            layout = self._layout_cache.get(dot_code, output_format)
+            if layout is not None and lean_layout:
+                return rendered(dot_code, layout)
+            return layout
+
+        def rendered(dot_code: DotDataGenerator, layout: str) \
+                     -> Dict[str, Any]:
+            (nodes, edges) = graph_ir.layout_data()
+            rendered_layout = render_lean_layout(layout, nodes, edges,
+                                                 self._layered_layout)
+            self._layout_cache.put(dot_code, rendered_layout,
+                                   RENDERED_LEAN_FORMAT)
+            return rendered_layout
+
+        modes = self._layout_budget.modes_for_size(size)
+
+        # A layout already computed in a more accurate mode is preferred:
+        all_modes = self._layout_budget.modes()
+        for mode in all_modes[:all_modes.index(modes[0])]:
+            cached_layout = cached(mode_dot_code(mode))
+            if cached_layout is not None:
+                return (cached_layout, mode)
+
+        for mode in modes:
+            dot_code = mode_dot_code(mode)
+            cached_layout = cached(dot_code)
+            if cached_layout is not None:
+                return (cached_layout, mode)
+
+            # Each attempt only gets the time left before the deadline of the
+            # refresh, and is skipped if there is none left:
+            is_last_mode = mode is modes[-1]
+            timeout = self._layout_budget.timeout(deadline, is_last_mode)
+            if timeout is not None:
+                if timeout <= 0:
+                    continue
+                timeout = min(timeout, dot_workers.timeout())
+
+            # The layout is computed by a dot process started in advance:
+            start_time = perf_counter()
+            try:
+                layout = dot_workers.layout(dot_code, cancel_event, timeout)
+            except TimeoutError:
+                if is_last_mode:
+                    raise
+                self._layout_budget.record_timeout(mode, size, timeout)
+                continue
+
+            if layout is not None:
+                self._layout_budget.record(mode, size,
+                                           perf_counter() - start_time)
+                self._layout_cache.put(dot_code, layout, output_format)
+                if lean_layout:
+                    layout = rendered(dot_code, layout)
+            return (layout, mode)
+
+
+    def create_qt_generator(self, layouts: Tuple[List[JsonOutput],
+                                                 Dict[str, Tuple[JsonOutput,
+                                                                 bool]]]) \
+                            -> ComponentsQtGenerator:
+        """ Returns the generator of the qt items for the given layouts (see
+            `compute_layout`). If the layout is stable (see
+            `set_stable_layout`), the components are placed according to the
+            current layout.
+
+            This method does not create any qt item, and can be run outside of
+            the qt GUI thread.
+        """
+        (component_layouts, cluster_layouts) = layouts
+        previous = self._qt_generator if self._stable_layout else None
+        return ComponentsQtGenerator(component_layouts, previous,
+                                     cluster_layouts)
+
+
+    def generate_qt_items(self, qt_generator: ComponentsQtGenerator = None) \
+                          -> None:
         """ For each Node, Port and Edge, this function generates the
             corresponding list of qt items and stores it as their `_qt_item`
             attribute.
-        """
-        encoded_dot_code = self._get_encoded_dot_code()
-        #print(encoded_dot_code.decode())
 
-        (out, _) = Popen(['dot', '-Tjson'], stdin=PIPE, stdout=PIPE,
-                   stderr=PIPE).communicate(encoded_dot_code)
-        #print(out.decode())
+            The elements of the components whose layout did not change (see
+            `ComponentsQtGenerator.is_unchanged`) keep their current qt items.
+
+            Args:
+                qt_generator: generator created from the graph's layout (see
+                    `create_qt_generator`). If None, the layout is computed.
+        """
+        if qt_generator is None:
+            qt_generator = self.create_qt_generator(self.compute_layout())
+
+        displayed_nodes = self._get_displayed_nodes()
+        interior_nodes = self._get_interior_nodes()
+
+        # The qt items which can be kept, per element:
+        kept_qt_items: Dict[GraphElement, QGraphicsItem] = {}
+        # The kept qt items of the edges inside the expanded clusters, per
+        # input port of the clusters (see `ClusterPort`):
+        kept_interior_qt_items: Dict[ClusterPort, QGraphicsItem] = {}
+        for node in displayed_nodes + interior_nodes:
+            if not qt_generator.is_unchanged(node.name()):
+                continue
+            elements = [node]
+            if not isinstance(node, InputNode):
+                for port in node.ports():
+                    elements.append(port)
+                    if port.type() != 'input' or port.edge() is None:
+                        continue
+                    # The edges coming into a cluster from outside are part of
+                    # the top level's layout, and are displayed inside the
+                    # cluster by the cluster's ports:
+                    if (node.cluster() is None
+                            or node.cluster().is_port_internal(port)):
+                        elements.append(port.edge())
+                        continue
+                    cluster_port = \
+                        node.cluster().get_cluster_port_per_node_port(port)
+                    if cluster_port.interior_edge_qt_item() is not None:
+                        kept_interior_qt_items[cluster_port] = \
+                            cluster_port.interior_edge_qt_item()
+            for element in elements:
+                if element.qt_item() is not None:
+                    kept_qt_items[element] = element.qt_item()
 
         self._clear_qt_items()
-        qt_generator = JsonToQtGenerator(out.decode('utf-8'))
+        self._qt_generator = qt_generator
         # For every node, we get its qt item (as a parent item containing the
-        # other items):
-        for node in (self._input_nodes + self._dg_entities +
-                     self.shrinked_clusters()):
-
-            # If the node is in a cluster, we ignore it as the cluster will be
-            # handled later
-            if node.cluster() is not None:
-                continue
+        # other items). The nodes inside the expanded clusters come last, as
+        # the edges coming from outside of their cluster are displayed by the
+        # cluster's ports:
+        for node in displayed_nodes + interior_nodes:
 
             # If it's an InputNode, only qt items for the node are needed (its
             # ports are not displayed and they have no input edges)
             if isinstance(node, InputNode):
-                qt_item_node = qt_generator.get_qt_item_for_node(node.name())
+                qt_item_node = kept_qt_items.get(node)
+                if qt_item_node is None:
+                    qt_item_node = qt_generator.get_qt_item_for_node(
+                        node.name())
                 node.set_qt_item(qt_item_node)
                 continue
 
-            # If it's an EntityNode or a shrunk Cluster, the qt item
-            # corresponding to the node is the middle column of the html table
-            # (i.e the node's label)
-            no_input = node.inputs() == []
-            qt_item_node = qt_generator.get_qt_item_for_node(node.name(),
-                                                             no_input)
+            # If it's an EntityNode or a Cluster, the qt item corresponding to
+            # the node is the middle column of the html table (i.e the node's
+            # label)
+            qt_item_node = kept_qt_items.get(node)
+            if qt_item_node is None:
+                no_input = node.inputs() == []
+                qt_item_node = qt_generator.get_qt_item_for_node(node.name(),
+                                                                 no_input)
+            # The label's cell of an expanded cluster contains its interior,
+            # which must be displayed above it:
+            if isinstance(node, Cluster) and node.is_expanded():
+                qt_item_node.setZValue(-1)
             node.set_qt_item(qt_item_node)
 
             # Getting the qt items for each of the node's ports and edges:
             ports = node.ports()
             for port in ports:
-                qt_item_port = qt_generator.get_qt_item_for_port(node.name(),
-                                                                 port.name())
+                qt_item_port = kept_qt_items.get(port)
+                if qt_item_port is None:
+                    qt_item_port = qt_generator.get_qt_item_for_port(
+                        node.name(), port.name())
                 port.set_qt_item(qt_item_port)
 
                 if port.type() == 'output':
@@ -813,18 +2178,86 @@ class Graph:
                 edge = port.edge()
                 if edge is None:
                     continue
+                if (node.cluster() is not None
+                        and not node.cluster().is_port_internal(port)):
+                    self._set_interior_edge_qt_item(port, qt_generator,
+                                                    kept_interior_qt_items)
+                    continue
+                if edge in kept_qt_items:
+                    edge.set_qt_item(kept_qt_items[edge])
+                    continue
                 head_node_name = node.name()
 
                 tail_port = edge.tail()
                 tail_cluster_port = self._get_cluster_port_for_port(tail_port)
-                if tail_cluster_port is not None:
+                if tail_cluster_port is not None and node.cluster() is None:
                     tail_port = tail_cluster_port
                 tail_node_name = tail_port.node().name()
-
-                qt_item_edge = qt_generator.get_qt_item_for_edge(head_node_name,
-                                                                 tail_node_name)
+                # The tail of an edge from an input value has no port (see
+                # `_add_edge_to_graph_ir`):
+                tail_port_name = None
+                if not isinstance(tail_port.node(), InputNode):
+                    tail_port_name = tail_port.name()
+
+                qt_item_edge = qt_generator.get_qt_item_for_edge(
+                    head_node_name, tail_node_name, port.name(),
+                    tail_port_name)
                 edge.set_qt_item(qt_item_edge)
 
+        # The kept qt items already have their overlays, which are updated:
+        if self._uses_value_overlays():
+            self.update_qt_items_values()
+
+
+    def _set_interior_edge_qt_item(self, port: Port,
+                                   qt_generator: ComponentsQtGenerator,
+                                   kept_qt_items: Dict[ClusterPort,
+                                                       QGraphicsItem]) -> None:
+        """ Sets the qt item of the part of an edge coming into an expanded
+            cluster from outside which is inside the cluster, i.e from the
+            cluster's side to the head port (see `ClusterPort`).
+
+            Args:
+                port: the head port of the edge, in the cluster.
+                qt_generator: the generator of the new qt items.
+                kept_qt_items: the qt items which can be kept, per cluster port.
+        """
+        cluster_port = port.node().cluster().get_cluster_port_per_node_port(
+                       port)
+        qt_item = kept_qt_items.get(cluster_port)
+        if qt_item is None:
+            qt_item = qt_generator.get_qt_item_for_edge(
+                port.node().name(), cluster_port.interior_node_name(),
+                port.name(), None)
+        cluster_port.set_interior_edge_qt_item(qt_item)
+
+
+    def update_qt_items_values(self, changes: GraphChanges = None) -> None:
+        """ Updates the values displayed by the current qt items (edges' labels
+            and input nodes' labels), without generating a new layout.
+
+            Args:
+                changes: if given, only the elements whose value changed are
+                    updated.
+        """
+        if changes is not None:
+            edges = [elem for elem in changes.changed_values
+                     if isinstance(elem, Edge)]
+        else:
+            edges = [port.edge() for node in self._dg_entities
+                     for port in node.inputs() if port.edge() is not None]
+
+        set_text = (_set_qt_item_overlay_text if self._uses_value_overlays()
+                    else _set_qt_item_label_text)
+        for edge in edges:
+            # The value of an edge whose tail is an InputNode is displayed by
+            # the InputNode:
+            tail_node = edge.tail_node()
+            if isinstance(tail_node, InputNode):
+                set_text(tail_node.qt_item(), value_label(tail_node.value()))
+            else:
+                set_text(edge.qt_item(), value_label(edge.value()))
+
 
     def _clear_qt_items(self) -> None:
         """ Clears all of the graph elements' qt items. """
@@ -838,6 +2271,8 @@ class Graph:
             ports = node.ports()
             for port in ports:
                 port.set_qt_item(None)
+                if isinstance(port, ClusterPort):
+                    port.set_interior_edge_qt_item(None)
                 if port.type() == 'input' and port.edge() is not None:
                     port.edge().set_qt_item(None)
 
@@ -846,19 +2281,17 @@ class Graph:
         """ Returns a list of all the qt items necessary to display the graph.
         """
 
-        qt_items = []
+        # The edges coming into an expanded cluster are both the edges of the
+        # cluster's ports and of its nodes' ports, so the items are deduplicated:
+        qt_items: Dict[QGraphicsItem, None] = {}
 
         def add_qt_item(qt_item: QGraphicsItem) -> None:
             if qt_item is not None:
-                qt_items.append(qt_item)
+                qt_items[qt_item] = None
 
         # For each node, we add the qt items of the node, of its ports, and of the
         # port's edge if it's an input (so that edges are not handled twice)
-        nodes = self._dg_entities + self._input_nodes + self._clusters
-        for node in nodes:
-            if node.cluster() is not None:
-                continue
-
+        for node in self._get_displayed_nodes() + self._get_interior_nodes():
             add_qt_item(node.qt_item())
 
             if isinstance(node, InputNode):
@@ -869,8 +2302,12 @@ class Graph:
                 add_qt_item(port.qt_item())
                 if port.type() == 'input' and port.edge() is not None:
                     add_qt_item(port.edge().qt_item())
+                # The edges coming into an expanded cluster are continued
+                # inside of it:
+                if isinstance(port, ClusterPort):
+                    add_qt_item(port.interior_edge_qt_item())
 
-        return qt_items
+        return list(qt_items)
 
 
     def get_elem_per_qt_item(self, qt_item: QGraphicsItem) \
@@ -889,8 +2326,7 @@ class Graph:
         while item.parentItem() != None:
             item = item.parentItem()
 
-        for node in (self._dg_entities + self._input_nodes
-                     + self.shrinked_clusters()):
+        for node in self._get_displayed_nodes() + self._get_interior_nodes():
             if node.qt_item() == item:
                 return node
 
@@ -904,6 +2340,9 @@ class Graph:
                 edge = port.edge()
                 if edge is not None and edge.qt_item() == item:
                     return edge
+                if (isinstance(port, ClusterPort)
+                        and port.interior_edge_qt_item() == item):
+                    return edge
 
         return None
 
@@ -919,3 +2358,80 @@ class Graph:
     def _get_cluster_for_port(self, port: Port) -> Cluster:
         """ Returns the cluster containing the given node port. """
         return port.node().cluster()
+
+
+# Key of the data marking the overlay items displaying the values (see
+# `Graph.set_value_overlays`):
+_VALUE_OVERLAY_KEY = 0
+
+
+def _set_qt_item_label_text(qt_item: QGraphicsItem, text: str) -> None:
+    """ Replaces the text of the label of a node or edge's qt item (i.e its
+        first child text item), keeping the label centered on its previous
+        position.
+    """
+    if qt_item is None:
+        return
+    for child in qt_item.childItems():
+        if not isinstance(child, QGraphicsTextItem):
+            continue
+        previous_width = child.boundingRect().width()
+        # Multi-line labels are split into several text items: the first one
+        # will now contain the whole text.
+        for label_piece in child.childItems():
+            label_piece.setVisible(False)
+        child.setPlainText(text)
+        width_difference = child.boundingRect().width() - previous_width
+        child.setX(child.x() - width_difference / 2)
+        return
+
+
+def _get_value_overlay(qt_item: QGraphicsItem) -> QGraphicsTextItem | None:
+    """ Returns the overlay item displaying the value of a node or edge's qt
+        item, or None if it has none.
+    """
+    for child in qt_item.childItems():
+        if child.data(_VALUE_OVERLAY_KEY):
+            return child
+    return None
+
+
+def _set_qt_item_overlay_text(qt_item: QGraphicsItem, text: str) -> None:
+    """ Sets the text of the overlay item displaying the value of a node or
+        edge's qt item, creating it (and hiding the placeholder label given to
+        the layout) if needed.
+
+        The overlay of an edge is above the middle of its spline, and the
+        overlay of a node is centered on it.
+    """
+    if qt_item is None:
+        return
+    overlay = _get_value_overlay(qt_item)
+    if overlay is None:
+        for child in qt_item.childItems():
+            if isinstance(child, QGraphicsTextItem):
+                child.setVisible(False)
+        overlay = QGraphicsTextItem()
+        overlay.setData(_VALUE_OVERLAY_KEY, True)
+        overlay.setParentItem(qt_item)
+    overlay.setPlainText(text)
+
+    rect = overlay.boundingRect()
+    if isinstance(qt_item, QGraphicsPathItem):
+        middle = qt_item.path().pointAtPercent(0.5)
+        overlay.setPos(middle.x() - rect.width() / 2,
+                       middle.y() - rect.height())
+    else:
+        center = qt_item.boundingRect().center()
+        overlay.setPos(center.x() - rect.width() / 2,
+                       center.y() - rect.height() / 2)
+
+
+def _values_equal(value1: Any, value2: Any) -> bool:
+    """ Returns True if two signal values are equal. Values which cannot be
+        compared (e.g arrays) are considered different.
+    """
+    try:
+        return bool(value1 == value2)
+    except Exception:
+        return False
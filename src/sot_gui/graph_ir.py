@@ -0,0 +1,342 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+from array import array
+import struct
+
+
+# Kinds of nodes:
+ELLIPSE_NODE = 0 # A label in an ellipse, without ports (e.g an input value)
+TABLE_NODE = 1 # An html table with input ports, a label and output ports
+
+# Id of the missing port of an edge's end which is an ellipse node:
+NO_PORT = -1
+
+
+class LayoutNode:
+    """ A node to lay out, as given to the layout engines (see
+        `GraphIR.layout_data`): an html table with input ports, a label and
+        output ports (e.g an entity), or an ellipse containing a label (e.g an
+        input value) if it has no ports.
+
+        Constructor arguments:
+        - `name`: name of the node, as in the json output
+        - `label`: label of the node
+        - `inputs`: names of the input ports, or None for an ellipse
+        - `outputs`: names of the output ports, or None for an ellipse
+        - `label_size`: minimum (width, height) of the label's cell of a table
+          (e.g to contain the interior of an expanded cluster). The label is
+          then at the top of its cell.
+    """
+
+    def __init__(self, name: str, label: str, inputs: List[str] = None,
+                 outputs: List[str] = None,
+                 label_size: Tuple[float, float] = None):
+        self._name = name
+        self._label = label
+        self._inputs = inputs
+        self._outputs = outputs
+        self._label_size = label_size
+
+
+    def name(self) -> str:
+        return self._name
+
+
+    def label(self) -> str:
+        return self._label
+
+
+    def inputs(self) -> List[str] | None:
+        return self._inputs
+
+
+    def outputs(self) -> List[str] | None:
+        return self._outputs
+
+
+    def label_size(self) -> Tuple[float, float] | None:
+        return self._label_size
+
+
+    def is_table(self) -> bool:
+        return self._outputs is not None
+
+
+class LayoutEdge:
+    """ An edge to lay out, as given to the layout engines (see
+        `GraphIR.layout_data`), from an output port of its tail node to an
+        input port of its head node.
+
+        Constructor arguments:
+        - `tail`: (node name, port name) of the tail. The port name is None if
+          the tail is an ellipse.
+        - `head`: (node name, port name) of the head
+        - `label`: label of the edge, if any
+    """
+
+    def __init__(self, tail: Tuple[str, str | None], head: Tuple[str, str],
+                 label: str = None):
+        self._tail = tail
+        self._head = head
+        self._label = label
+
+
+    def tail(self) -> Tuple[str, str | None]:
+        return self._tail
+
+
+    def head(self) -> Tuple[str, str]:
+        return self._head
+
+
+    def label(self) -> str | None:
+        return self._label
+
+
+class GraphIR:
+    """ Intermediate representation of a graph to lay out, between Graph and
+        the layout backends: dot (see `DotDataGenerator.from_graph_ir`),
+        LayeredLayout (see `layout_data`) and the caches (see `update_hash`).
+
+        The graph is stored as three tables of columns, whose rows are
+        identified by integer ids (their index):
+        - nodes: name, label, kind (ELLIPSE_NODE or TABLE_NODE), minimum size
+          of the label's cell (or None), first port id, number of input and
+          output ports
+        - ports: node id and name. The ports of a node are contiguous: its
+          inputs, then its outputs.
+        - edges: tail node and port ids, head node and port ids (NO_PORT for an
+          ellipse) and label (or None)
+        The integer columns are arrays, and the names are only stored once.
+
+        Constructor arguments:
+        - `graph_attributes`: attributes of the graph, in the same form as in
+          dot code (e.g `{'rankdir': '"LR"'}`)
+    """
+
+    def __init__(self, graph_attributes: Dict[str, Any] = None):
+        self._graph_attributes = dict(graph_attributes or {})
+
+        # Nodes:
+        self._node_names: List[str] = []
+        self._node_labels: List[str] = []
+        self._node_kinds = array('b')
+        self._node_label_sizes: List[Tuple[float, float] | None] = []
+        self._node_first_ports = array('i')
+        self._node_inputs_nb = array('i')
+        self._node_outputs_nb = array('i')
+        self._node_ids: Dict[str, int] = {}
+
+        # Ports:
+        self._port_nodes = array('i')
+        self._port_names: List[str] = []
+        self._port_ids: Dict[Tuple[int, str], int] = {}
+
+        # Edges:
+        self._edge_tail_nodes = array('i')
+        self._edge_tail_ports = array('i')
+        self._edge_head_nodes = array('i')
+        self._edge_head_ports = array('i')
+        self._edge_labels: List[str | None] = []
+
+
+    def graph_attributes(self) -> Dict[str, Any]:
+        return dict(self._graph_attributes)
+
+
+    def nodes_nb(self) -> int:
+        return len(self._node_names)
+
+
+    def ports_nb(self) -> int:
+        return len(self._port_names)
+
+
+    def edges_nb(self) -> int:
+        return len(self._edge_labels)
+
+
+    #
+    # CONSTRUCTION
+    #
+
+    def add_ellipse_node(self, name: str, label: str) -> int:
+        """ Adds a node displaying a label in an ellipse, and returns its id.
+
+            Raises:
+                ValueError: A node with the same name was already added.
+        """
+        return self._add_node(name, label, ELLIPSE_NODE, [], [], None)
+
+
+    def add_table_node(self, name: str, label: str, input_names: List[str],
+                       output_names: List[str],
+                       label_size: Tuple[float, float] = None) -> int:
+        """ Adds a node displayed as an html table (see
+            `DotDataGenerator.add_html_node`), and returns its id.
+
+            Raises:
+                ValueError: A node with the same name was already added.
+        """
+        return self._add_node(name, label, TABLE_NODE, input_names,
+                              output_names, label_size)
+
+
+    def _add_node(self, name: str, label: str, kind: int,
+                  input_names: List[str], output_names: List[str],
+                  label_size: Tuple[float, float] | None) -> int:
+        if name in self._node_ids:
+            raise ValueError(f"Node {name} was already added.")
+        node_id = len(self._node_names)
+        self._node_ids[name] = node_id
+        self._node_names.append(name)
+        self._node_labels.append(label)
+        self._node_kinds.append(kind)
+        self._node_label_sizes.append(label_size)
+        self._node_first_ports.append(len(self._port_names))
+        self._node_inputs_nb.append(len(input_names))
+        self._node_outputs_nb.append(len(output_names))
+        for port_name in list(input_names) + list(output_names):
+            self._port_ids[(node_id, port_name)] = len(self._port_names)
+            self._port_nodes.append(node_id)
+            self._port_names.append(port_name)
+        return node_id
+
+
+    def add_edge(self, tail: Tuple[str, str | None],
+                 head: Tuple[str, str | None], label: str = None) -> int:
+        """ Adds an edge between two nodes already added, and returns its id.
+
+            Args:
+                tail, head: (node name, port name) of the ends of the edge.
+                    The port name is None for an ellipse node.
+                label: label of the edge, if any.
+
+            Raises:
+                ValueError: A node or a port could not be found.
+        """
+        (tail_node, tail_port) = self._get_end_ids(tail)
+        (head_node, head_port) = self._get_end_ids(head)
+        self._edge_tail_nodes.append(tail_node)
+        self._edge_tail_ports.append(tail_port)
+        self._edge_head_nodes.append(head_node)
+        self._edge_head_ports.append(head_port)
+        self._edge_labels.append(label)
+        return len(self._edge_labels) - 1
+
+
+    def _get_end_ids(self, end: Tuple[str, str | None]) -> Tuple[int, int]:
+        (node_name, port_name) = end
+        node_id = self._node_ids.get(node_name)
+        if node_id is None:
+            raise ValueError(f"Node {node_name} could not be found.")
+        if port_name is None:
+            return (node_id, NO_PORT)
+        port_id = self._port_ids.get((node_id, port_name))
+        if port_id is None:
+            raise ValueError(f"Port {port_name} of node {node_name} could not"
+                             " be found.")
+        return (node_id, port_id)
+
+
+    #
+    # ACCESS
+    #
+
+    def node_id(self, name: str) -> int | None:
+        return self._node_ids.get(name)
+
+
+    def node_name(self, node_id: int) -> str:
+        return self._node_names[node_id]
+
+
+    def node_label(self, node_id: int) -> str:
+        return self._node_labels[node_id]
+
+
+    def node_kind(self, node_id: int) -> int:
+        return self._node_kinds[node_id]
+
+
+    def node_label_size(self, node_id: int) -> Tuple[float, float] | None:
+        return self._node_label_sizes[node_id]
+
+
+    def node_ports(self, node_id: int) -> Tuple[List[str], List[str]]:
+        """ Returns the names of the ports of a node, as a tuple (inputs,
+            outputs).
+        """
+        first_port = self._node_first_ports[node_id]
+        inputs_end = first_port + self._node_inputs_nb[node_id]
+        outputs_end = inputs_end + self._node_outputs_nb[node_id]
+        return (self._port_names[first_port:inputs_end],
+                self._port_names[inputs_end:outputs_end])
+
+
+    def port_name(self, port_id: int) -> str | None:
+        if port_id == NO_PORT:
+            return None
+        return self._port_names[port_id]
+
+
+    def edge(self, edge_id: int) \
+             -> Tuple[Tuple[str, str | None], Tuple[str, str | None],
+                      str | None]:
+        """ Returns an edge as a tuple (tail, head, label), where the tail and
+            head are (node name, port name or None).
+        """
+        return ((self._node_names[self._edge_tail_nodes[edge_id]],
+                 self.port_name(self._edge_tail_ports[edge_id])),
+                (self._node_names[self._edge_head_nodes[edge_id]],
+                 self.port_name(self._edge_head_ports[edge_id])),
+                self._edge_labels[edge_id])
+
+
+    #
+    # CONSUMERS
+    #
+
+    def layout_data(self) -> Tuple[List[LayoutNode], List[LayoutEdge]]:
+        """ Returns the nodes and edges to lay out with LayeredLayout (or to
+            draw a lean layout, see `render_lean_layout`).
+        """
+        nodes = []
+        for node_id in range(self.nodes_nb()):
+            if self._node_kinds[node_id] == ELLIPSE_NODE:
+                nodes.append(LayoutNode(self._node_names[node_id],
+                                        self._node_labels[node_id]))
+                continue
+            (inputs, outputs) = self.node_ports(node_id)
+            nodes.append(LayoutNode(self._node_names[node_id],
+                                    self._node_labels[node_id], inputs,
+                                    outputs, self._node_label_sizes[node_id]))
+        edges = [LayoutEdge(*self.edge(edge_id))
+                 for edge_id in range(self.edges_nb())]
+        return (nodes, edges)
+
+
+    def update_hash(self, digest) -> None:
+        """ Updates a hash object (e.g `hashlib.sha256()`) with the content of
+            the graph: the integer columns are hashed as little-endian 32-bit
+            integers, so that the digest (e.g `Graph.structural_digest`) does
+            not depend on the computer, and the texts are separated by null
+            characters.
+        """
+        def update_texts(texts: List[Any]) -> None:
+            digest.update('\0'.join('\1' if text is None else str(text)
+                                    for text in texts).encode())
+            digest.update(b'\0\0')
+
+        update_texts(f"{key}={value}"
+                     for (key, value) in self._graph_attributes.items())
+        update_texts(self._node_names)
+        update_texts(self._node_labels)
+        update_texts(self._node_label_sizes)
+        update_texts(self._port_names)
+        update_texts(self._edge_labels)
+        for column in (self._node_kinds, self._node_inputs_nb,
+                       self._node_outputs_nb, self._edge_tail_nodes,
+                       self._edge_tail_ports, self._edge_head_nodes,
+                       self._edge_head_ports):
+            digest.update(struct.pack(f"<{len(column)}i", *column))
@@ -0,0 +1,140 @@
+from threading import Event
+from time import perf_counter
+
+from PySide2.QtCore import QThread, Signal
+
+from sot_gui.call_stats import CallStats
+from sot_gui.graph import Graph, GraphChanges
+
+
+class GraphRefreshThread(QThread):
+    """ Thread running the stages of a graph refresh which do not need the qt
+        GUI thread: fetching the graph data from the kernel, computing its
+        layout with dot and parsing dot's output. Only the generation of the qt
+        items and their addition to the scene are left to the GUI thread.
+
+        The displayed graph is never modified by the thread: if the topology
+        changed (or a new layout is needed), the new data is applied to a copy
+        of the graph (see `Graph.copy_model`), which is laid out and emitted at
+        the end of the refresh, for the GUI thread to adopt it. If only the
+        values changed, they are emitted for the GUI thread to apply them.
+
+        The refresh can be cancelled at any time: the current stage is then
+        stopped as soon as possible, and no result is emitted. The displayed
+        graph is then unchanged.
+
+        The thread can also only lay out the graph, without fetching its data
+        (e.g after a cluster was created): the fetching stage is then skipped,
+        and the copy of the graph is laid out with no changes.
+
+        Constructor arguments:
+        - `graph`: the graph to refresh
+        - `layout_needed`: if True, a new layout is computed even if the
+          topology of the graph has not changed
+        - `stats`: if given, the duration of each completed stage is recorded
+          in it, under the stage's label
+        - `fetch_data`: if False, no data is fetched from the kernel, and a new
+          layout is computed
+        - `parent`: the parent QObject
+
+        Signals:
+        - `stage_changed(label, index)`: emitted at the beginning of each stage
+          (see `STAGES`)
+        - `values_fetched(update)`: emitted at the end of the refresh if
+          only the values changed, with the GraphUpdate to apply to the graph
+          (see `Graph.apply_graph_update`)
+        - `refresh_done(changes, model, qt_generator)`: emitted at the end of
+          the refresh if a new layout was computed, with the GraphChanges
+          applied to the copy of the graph, the copy (see `Graph.adopt_model`)
+          and the ComponentsQtGenerator to use to generate its qt items
+        - `refresh_failed(error)`: emitted if the kernel could not be reached
+        - `layout_failed(error)`: emitted if dot failed to compute the layout,
+          or timed out
+    """
+
+    STAGES = ['Fetching graph data', 'Computing layout', 'Parsing layout']
+
+    stage_changed = Signal(str, int)
+    values_fetched = Signal(object)
+    refresh_done = Signal(object, object, object)
+    refresh_failed = Signal(object)
+    layout_failed = Signal(object)
+
+
+    def __init__(self, graph: Graph, layout_needed: bool = False,
+                 stats: CallStats = None, parent = None,
+                 fetch_data: bool = True):
+        super().__init__(parent)
+        self._graph = graph
+        self._layout_needed = layout_needed
+        self._fetch_data = fetch_data
+        self._stats = stats
+        self._cancel_event = Event()
+        # Label and start time of the current stage:
+        self._stage: str = None
+        self._stage_start_time: float = None
+
+
+    def cancel(self) -> None:
+        """ Requests the cancellation of the refresh. """
+        self._cancel_event.set()
+
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+
+    def run(self) -> None:
+        """ See QThread.run """
+        try:
+            if self._fetch_data:
+                self._set_stage(0)
+                update = self._graph.fetch_graph_update()
+                if self.is_cancelled():
+                    return
+                # If the topology has not changed, the current layout and qt
+                # items are kept:
+                if not update.topology_changed() and not self._layout_needed:
+                    self._record_stage()
+                    self.values_fetched.emit(update)
+                    return
+            # The GUI thread does not modify the graph during a refresh (see
+            # SoTGraphScene), so it can be copied here:
+            model = self._graph.copy_model()
+            if self._fetch_data:
+                changes = model.apply_graph_update(update)
+                self._record_stage()
+            else:
+                changes = GraphChanges()
+
+            self._set_stage(1)
+            layouts = model.compute_layout(self._cancel_event)
+            if layouts is None or self.is_cancelled():
+                return
+            self._record_stage()
+
+            self._set_stage(2)
+            qt_generator = model.create_qt_generator(layouts)
+            if self.is_cancelled():
+                return
+            self._record_stage()
+
+            self.refresh_done.emit(changes, model, qt_generator)
+
+        except ConnectionError as error:
+            self.refresh_failed.emit(error)
+        except (RuntimeError, TimeoutError) as error:
+            self.layout_failed.emit(error)
+
+
+    def _set_stage(self, index: int) -> None:
+        self._stage = self.STAGES[index]
+        self._stage_start_time = perf_counter()
+        self.stage_changed.emit(self._stage, index)
+
+
+    def _record_stage(self) -> None:
+        """ Records the duration of the current stage, which is completed. """
+        if self._stats is not None:
+            self._stats.record(self._stage,
+                               perf_counter() - self._stage_start_time)
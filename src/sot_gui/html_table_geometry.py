@@ -0,0 +1,253 @@
+from __future__ import annotations
+from typing import Dict, List, Tuple
+from copy import copy
+
+
+# Types of the cells of a node's html table:
+INPUT = 'input'
+LABEL = 'label'
+OUTPUT = 'output'
+
+
+def html_table_rows(input_names: List[str], output_names: List[str]) \
+                    -> List[List[Tuple[str, str | None, int]]]:
+    """ Returns the structure of the html table of a node, as generated by
+        `DotDataGenerator.add_html_node`: for each row, its cells from left to
+        right, as tuples (type of the cell, port name or None for the label,
+        number of rows spanned).
+
+        The label spans all the rows. If there are more inputs than outputs,
+        each input spans one row and each output spans `inputs_nb // outputs_nb`
+        rows, except the last one which spans the remaining rows (and
+        conversely if there are more outputs).
+
+        Raises:
+            RuntimeError: There are no outputs.
+    """
+    if output_names == []:
+        raise RuntimeError('An html node cannot have no output.')
+
+    inputs_nb = len(input_names)
+    outputs_nb = len(output_names)
+    rows_nb = max(inputs_nb, outputs_nb)
+
+    def spans(names: List[str]) -> Dict[int, Tuple[str, int]]:
+        """ Returns the port starting on each row, and the number of rows it
+            spans.
+        """
+        if names == []:
+            return {}
+        rowspan = rows_nb // len(names)
+        return {index * rowspan: (name, rowspan if index < len(names) - 1
+                                  else rows_nb - index * rowspan)
+                for (index, name) in enumerate(names)}
+
+    input_spans = spans(input_names)
+    output_spans = spans(output_names)
+
+    rows = []
+    for row in range(rows_nb):
+        cells = []
+        if row in input_spans:
+            (name, rowspan) = input_spans[row]
+            cells.append((INPUT, name, rowspan))
+        if row == 0:
+            cells.append((LABEL, None, rows_nb))
+        if row in output_spans:
+            (name, rowspan) = output_spans[row]
+            cells.append((OUTPUT, name, rowspan))
+        rows.append(cells)
+    return rows
+
+
+class TableMetrics:
+    """ Dimensions of the texts and cells of the html tables, used to compute
+        their geometry without running dot.
+
+        The default values are close to dot's for a 14pt Times font, with the
+        cell padding and border of DotDataGenerator's tables.
+
+        Constructor arguments:
+        - `char_width`: average width of a character
+        - `row_height`: height of a row, i.e of a cell containing one line of
+          text
+        - `cell_padding`: space between a cell's text and its sides, border
+          included
+    """
+
+    def __init__(self, char_width: float = 7., row_height: float = 27.,
+                 cell_padding: float = 5.):
+        self._char_width = char_width
+        self._row_height = row_height
+        self._cell_padding = cell_padding
+
+
+    def char_width(self) -> float:
+        return self._char_width
+
+
+    def row_height(self) -> float:
+        return self._row_height
+
+
+    def cell_padding(self) -> float:
+        return self._cell_padding
+
+
+    def text_width(self, text: str) -> float:
+        return len(text) * self._char_width
+
+
+    def cell_width(self, texts: List[str]) -> float:
+        """ Returns the width of a column of cells containing these texts. """
+        if texts == []:
+            return 0.
+        return (max(self.text_width(text) for text in texts)
+                + 2 * self._cell_padding)
+
+
+class TableCell:
+    """ A cell of a node's html table.
+
+        Constructor arguments:
+        - `type`: INPUT, LABEL or OUTPUT
+        - `text`: text of the cell (the port's name, or the node's label)
+        - `rect`: (x, y, width, height) of the cell, from the top-left corner
+          of the table
+        - `text_center`: (x, y) of the center of the text, from the top-left
+          corner of the table
+    """
+
+    def __init__(self, type: str, text: str,
+                 rect: Tuple[float, float, float, float],
+                 text_center: Tuple[float, float]):
+        self._type = type
+        self._text = text
+        self._rect = rect
+        self._text_center = text_center
+
+
+    def type(self) -> str:
+        return self._type
+
+
+    def text(self) -> str:
+        return self._text
+
+
+    def rect(self) -> Tuple[float, float, float, float]:
+        return self._rect
+
+
+    def text_center(self) -> Tuple[float, float]:
+        return self._text_center
+
+
+class TableGeometry:
+    """ Geometry of a node's html table, computed from its label, ports and
+        text metrics: the rectangle of each cell and the anchor point of each
+        port, where the edges are plugged. The cells follow the structure of
+        DotDataGenerator's tables (see `html_table_rows`), so that they match
+        dot's layout of the same table.
+
+        The geometry can be resized (see `resized`) to fit the box of the node
+        computed by another engine (e.g dot), without laying the graph out
+        again.
+
+        Constructor arguments:
+        - `label`: label of the node
+        - `input_names`, `output_names`: names of the node's ports
+        - `metrics`: dimensions of the texts and cells
+        - `label_size`: minimum (width, height) of the label's cell, if any (e.g
+          to contain the interior of an expanded cluster). The label is then at
+          the top of its cell.
+    """
+
+    def __init__(self, label: str, input_names: List[str],
+                 output_names: List[str], metrics: TableMetrics = None,
+                 label_size: Tuple[float, float] = None):
+        if metrics is None:
+            metrics = TableMetrics()
+        self._label = label
+        self._rows = html_table_rows(input_names, output_names)
+        self._label_on_top = label_size is not None
+        self._text_height = metrics.row_height()
+
+        (label_width, label_height) = label_size or (0., 0.)
+        # Widths of the columns (inputs, label, outputs):
+        self._columns = (metrics.cell_width(input_names),
+                         max(metrics.cell_width([label]), label_width),
+                         metrics.cell_width(output_names))
+        # All rows have the same height, the label's cell spanning all of
+        # them:
+        rows_nb = len(self._rows)
+        self._row_height = max(metrics.row_height(), label_height / rows_nb)
+
+
+    def width(self) -> float:
+        return sum(self._columns)
+
+
+    def height(self) -> float:
+        return self._row_height * len(self._rows)
+
+
+    def columns(self) -> Tuple[float, float, float]:
+        """ Returns the widths of the columns: inputs, label and outputs. """
+        return self._columns
+
+
+    def resized(self, width: float, height: float) -> TableGeometry:
+        """ Returns the geometry of the same table with the given size: the
+            label's column takes the difference of width, and the rows share
+            the difference of height.
+        """
+        geometry = copy(self)
+        (inputs_width, label_width, outputs_width) = self._columns
+        geometry._columns = (inputs_width,
+                             max(label_width + width - self.width(), 0.),
+                             outputs_width)
+        geometry._row_height = height / len(self._rows)
+        return geometry
+
+
+    def cells(self) -> List[TableCell]:
+        """ Returns the cells of the table, in the order of the html code (row
+            by row, from left to right), which is the order of the cells in
+            dot's json output.
+        """
+        (inputs_width, label_width, outputs_width) = self._columns
+        left_per_type = {INPUT: 0., LABEL: inputs_width,
+                         OUTPUT: inputs_width + label_width}
+        width_per_type = {INPUT: inputs_width, LABEL: label_width,
+                          OUTPUT: outputs_width}
+
+        cells = []
+        for (row, row_cells) in enumerate(self._rows):
+            for (cell_type, name, rowspan) in row_cells:
+                rect = (left_per_type[cell_type], row * self._row_height,
+                        width_per_type[cell_type], rowspan * self._row_height)
+                text_height = rect[3]
+                if cell_type == LABEL and self._label_on_top:
+                    text_height = self._text_height
+                cells.append(TableCell(
+                    cell_type, self._label if name is None else name, rect,
+                    (rect[0] + rect[2] / 2, rect[1] + text_height / 2)))
+        return cells
+
+
+    def port_anchors(self, port_type: str) -> Dict[str, Tuple[float, float]]:
+        """ Returns the anchor point of each port of a type (INPUT or OUTPUT),
+            from the top-left corner of the table: the middle of the west side
+            of an input's cell, or of the east side of an output's cell (as
+            DotDataGenerator binds the edges with `:w` and `:e`).
+        """
+        anchors = {}
+        for cell in self.cells():
+            if cell.type() != port_type:
+                continue
+            (x_coord, y_coord, width, height) = cell.rect()
+            if port_type == OUTPUT:
+                x_coord += width
+            anchors[cell.text()] = (x_coord, y_coord + height / 2)
+        return anchors
@@ -1,6 +1,8 @@
-from typing import Any, Dict, List, Tuple, Union
+from __future__ import annotations
+from typing import Any, Dict, List, Set, Tuple, Union
 
-from json import loads
+from json import loads, dumps
+from hashlib import sha256
 
 from PySide2.QtWidgets import (QGraphicsItem, QGraphicsPolygonItem,
     QGraphicsEllipseItem, QGraphicsTextItem, QGraphicsPathItem)
@@ -8,12 +10,17 @@ from PySide2.QtGui import QPolygonF, QPainterPath, QBrush, QColor
 from PySide2.QtCore import QRectF, QPointF
 
 from sot_gui.utils import (get_dict_with_element, get_dicts_with_element,
-    get_dict_with_element_in_list, get_dicts_with_element_in_list)
+    get_dict_with_element_in_list, get_dicts_with_element_in_list,
+    dot_port_name)
 
 
 # Documentation on dot's json output:
 # https://graphviz.org/docs/outputs/json/
 
+# dot's json output, as a string or already parsed (e.g a layout computed by
+# LayeredLayout, which is not serialized):
+JsonOutput = Union[str, Dict[str, Any]]
+
 
 class JsonParsingUtils:
     """ This is a helper class for parsing the dot's json output. """
@@ -29,6 +36,8 @@ class JsonParsingUtils:
     NAME = 'name'
     HEAD_ID = 'head'
     TAIL_ID = 'tail'
+    HEAD_PORT = 'headport'
+    TAIL_PORT = 'tailport'
 
     # Keys for display data of nodes and edges' parts:
     BODY_DRAW = '_draw_'
@@ -91,11 +100,19 @@ j = JsonParsingUtils
 
 
 class JsonToQtGenerator:
-    """ When given dot's json output as a string, this class can generate qt
-        items for nodes, ports and edges.
+    """ When given dot's json output, this class can generate qt items for
+        nodes, ports and edges.
+
+        Constructor arguments:
+        - `json_string`: dot's json output, as a string or already parsed
+        - `offset`: (x, y) offset applied to the position of every generated
+          item, in qt coordinates (e.g to place the graph next to another one
+          in the scene)
     """
 
-    def __init__(self, json_string: str):
+    def __init__(self, json_string: JsonOutput,
+                 offset: Tuple[float, float] = (0., 0.)):
+        self._offset = offset
         self._qt_generator_per_type = {
             # j.T_STYLE[0]: ,
             # j.T_COLOR[0] ,
@@ -112,7 +129,7 @@ class JsonToQtGenerator:
             # j.T_POLYLINE[0]: ,
         }
 
-        self._graph_data: Dict[str, Any] = loads(json_string)
+        self._graph_data: Dict[str, Any] = _parsed(json_string)
 
         # Getting the graph's dimensions:
         bounding_box = [ float(str) for str in self._graph_data[j.DIMENSIONS].split(',') ]
@@ -126,6 +143,37 @@ class JsonToQtGenerator:
         self._html_nodes_data: Dict[str, List[Tuple[List[Dict]]]] = {}
         self._init_html_nodes_data()
 
+        # Indexes of the json data, built once so that each item is found in
+        # constant time instead of scanning the whole output (see
+        # `_init_indexes`):
+        self._object_per_name: Dict[str, Dict[str, Any]] = {}
+        self._object_per_id: Dict[int, Dict[str, Any]] = {}
+        self._edge_per_nodes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._edge_per_ports: Dict[Tuple[str, str, str | None, str | None],
+                                   Dict[str, Any]] = {}
+        self._cell_per_port: Dict[Tuple[str, str], Tuple[List[Dict]]] = {}
+        self._init_indexes()
+
+
+    def offset(self) -> Tuple[float, float]:
+        return self._offset
+    def set_offset(self, offset: Tuple[float, float]) -> None:
+        """ Sets the offset applied to the items generated from now on. """
+        self._offset = offset
+
+
+    def width(self) -> float:
+        return self._graph_bounding_box['width']
+
+
+    def height(self) -> float:
+        return self._graph_bounding_box['height']
+
+
+    def node_names(self) -> List[str]:
+        """ Returns the names of the nodes (and clusters) of the graph. """
+        return [node[j.NAME] for node in self._graph_data.get(j.OBJECTS, [])]
+
 
     #
     # Nodes and edges generation
@@ -148,8 +196,7 @@ class JsonToQtGenerator:
                 no_input: True if the node has no input port displayed.
         """
         # Getting the dictionary containing data on the node:
-        node_data = j.get_data_by_key_value(self._graph_data[j.OBJECTS], j.NAME,
-                                            node_name)
+        node_data = self._object_per_name.get(node_name)
         if node_data is None:
             raise ValueError(f"Node {node_name} could not be found in dot's"
                              " json output.")
@@ -195,32 +242,61 @@ class JsonToQtGenerator:
             RuntimeError: The port's data could not be found in the json output.
         """
 
-        node_cells_data = self._html_nodes_data[node_name]
-
-        for (cell_outline, cell_label) in node_cells_data:
+        # The port we want is the cell which has `port_name` as text in its
+        # label data:
+        cell_data = self._cell_per_port.get((node_name, port_name))
+        if cell_data is None:
+            raise RuntimeError('JsonToQtGenerator.get_qt_item_for_port: '
+                               'port data could not be found in json output.')
 
-            # The port we want is the one which has `port_name` as text in
-            # its label data (cell_label)
-            if j.get_data_by_key_value(cell_label, j.TEXT, port_name) is None:
-                continue
+        (cell_outline, cell_label) = cell_data
+        return self._get_html_cell(cell_outline, cell_label)
 
-            qt_item_port = self._get_html_cell(cell_outline, cell_label)
-            return qt_item_port
 
-        raise RuntimeError('JsonToQtGenerator.get_qt_item_for_port: '
-                            'port data could not be found in json output.')
+    def get_node_label_cell_rect(self, node_name: str, no_input: bool = False) \
+                                 -> Tuple[float, float, float, float]:
+        """ Returns the rectangle (x, y, width, height) of the label's cell of
+            an html node, in qt coordinates (e.g to place the content of an
+            expanded cluster in it).
 
-
-    def get_qt_item_for_edge(self, head_name: str, tail_name: str) -> QGraphicsItem:
+            Args:
+                node_name: name of the node, as given in the dot code used to
+                    generate the json output.
+                no_input: True if the node has no input port displayed.
+        """
+        node_cells_data = self._html_nodes_data.get(node_name)
+        if node_cells_data is None:
+            raise ValueError(f"Html node {node_name} could not be found in"
+                             " dot's json output.")
+        (outline_data, _) = node_cells_data[0 if no_input else 1]
+        polygon_data = j.get_data_by_key_value(outline_data, j.TYPE,
+                                               j.T_POLYGON)
+        qt_points = [self._dot_coords_to_qt_coords((point[0], point[1]))
+                     for point in polygon_data[j.POINTS]]
+        x_coords = [point[0] for point in qt_points]
+        y_coords = [point[1] for point in qt_points]
+        return (min(x_coords), min(y_coords), max(x_coords) - min(x_coords),
+                max(y_coords) - min(y_coords))
+
+
+    def get_qt_item_for_edge(self, head_name: str, tail_name: str,
+                             head_port: str = None, tail_port: str = None) \
+                             -> QGraphicsItem:
         """ Generates and returns a qt item for the edge linked to the nodes named
             `head_name` and `tail_name` in the dot code used to generate the json output.
             The qt item will be the edge's body (i.e the spline) as the parent
             QGraphicsItem, which will contain the labels as a child items.
             All those items' positions will be set before return.
             If the edge's style was set to invisible, this method will return None.
+
+            If the names of the edge's ports are given, the edge plugged to
+            these ports is returned (there can be several edges between two
+            nodes). Otherwise, or if the json output has no ports, the first
+            edge between the nodes is returned.
         """
         # Getting the edge's display info:
-        edge_data = self._get_edge_per_nodes_names(head_name, tail_name)
+        edge_data = self._get_edge_per_nodes_names(head_name, tail_name,
+                                                   head_port, tail_port)
         if edge_data is None:
             raise ValueError(f"Could not find edge with tail {tail_name} and head\
                 {head_name}.")
@@ -489,10 +565,11 @@ class JsonToQtGenerator:
 
     def _dot_coords_to_qt_coords(self, coords: Tuple[float, float]) -> Tuple[float, float]:
         """ Converts dot coordinates (origin on the bottom-left corner) to Qt
-            coordinates (origin on the top-left corner).
+            coordinates (origin on the top-left corner), and applies the offset.
         """
         (x_coord, y_coord) = coords
-        return (x_coord, self._graph_bounding_box['height'] - y_coord)
+        return (x_coord + self._offset[0],
+                self._graph_bounding_box['height'] - y_coord + self._offset[1])
 
 
     def _get_node_id_per_name(self, name: str) -> int:
@@ -505,33 +582,67 @@ class JsonToQtGenerator:
 
             Returns: The id given to the node / cluster by dot.
         """
-        node = j.get_data_by_key_value(self._graph_data[j.OBJECTS], j.NAME, name)
+        node = self._object_per_name.get(name)
+        if node is None:
+            raise ValueError(f"Node {name} could not be found in dot's json"
+                             " output.")
         return node.get(j.ID)
 
 
-    def _get_edge_per_nodes_names(self, head_name: str, tail_name: str) \
-                                 -> Dict[str, Any]:
-        """ Returns data on the edge with the given head and tail.
+    def _get_edge_per_nodes_names(self, head_name: str, tail_name: str,
+                                  head_port: str = None,
+                                  tail_port: str = None) -> Dict[str, Any]:
+        """ Returns data on the edge with the given head and tail, or None if
+            there is none.
 
             Args:
                 head_name: name of the head node, i.e the node which has the
                     wanted edge as an input.
                 tail_name: name of the tail node, i.e the node which has the
                     wanted edge as an output.
+                head_port, tail_port: names of the ports plugged to the edge,
+                    if any.
 
             Returns: part of the dot json output corresponding to the edge.
         """
-        # Retrieving the nodes' IDs:
-        head_id = self._get_node_id_per_name(head_name)
-        tail_id = self._get_node_id_per_name(tail_name)
+        if head_port is not None or tail_port is not None:
+            edge = self._edge_per_ports.get((tail_name, head_name, tail_port,
+                                             head_port))
+            if edge is not None:
+                return edge
+        return self._edge_per_nodes.get((tail_name, head_name))
+
 
-        # Getting the edges whose heads are `head_name`:
-        all_edges = self._graph_data[j.EDGES]
-        edges_with_correct_head = j.get_data_list_by_key_value(all_edges, j.HEAD_ID, head_id)
+    def _init_indexes(self) -> None:
+        """ Indexes the json data: the nodes and clusters per name and per id,
+            the edges per (tail, head) names and per (tail, head, tail port,
+            head port) names, and the html cells per (node name, text).
 
-        # Among these edges, finding the one whose tail is `tail_name`:
-        edge = j.get_data_by_key_value(edges_with_correct_head, j.TAIL_ID, tail_id)
-        return edge
+            When several items have the same key, the first one in the json
+            output is kept, as the linear searches used to do.
+        """
+        for node in self._graph_data.get(j.OBJECTS, []):
+            self._object_per_name.setdefault(node[j.NAME], node)
+            self._object_per_id.setdefault(node[j.ID], node)
+
+        for edge in self._graph_data.get(j.EDGES, []):
+            tail = self._object_per_id.get(edge[j.TAIL_ID])
+            head = self._object_per_id.get(edge[j.HEAD_ID])
+            if tail is None or head is None:
+                continue
+            nodes_key = (tail[j.NAME], head[j.NAME])
+            self._edge_per_nodes.setdefault(nodes_key, edge)
+            ports_key = (dot_port_name(edge.get(j.TAIL_PORT)),
+                         dot_port_name(edge.get(j.HEAD_PORT)))
+            self._edge_per_ports.setdefault(nodes_key + ports_key, edge)
+
+        for (node_name, node_cells_data) in self._html_nodes_data.items():
+            for cell_data in node_cells_data:
+                (_, cell_label) = cell_data
+                for data in cell_label:
+                    if j.TEXT in data:
+                        self._cell_per_port.setdefault(
+                            (node_name, data[j.TEXT]), cell_data)
 
 
     def _init_html_nodes_data(self) -> None:
@@ -599,4 +710,270 @@ class JsonToQtGenerator:
                     cell_outline = []
                     cell_label = []
 
-        return table_data_list
\ No newline at end of file
+        return table_data_list
+
+class ComponentsQtGenerator:
+    """ When given the layouts (dot's json outputs) of the connected components
+        of a graph, computed separately, this class can generate qt items for
+        their nodes, ports and edges, as JsonToQtGenerator does for a single
+        layout.
+
+        The components are packed one below the other, in the given order:
+        each layout is parsed by its own JsonToQtGenerator, with an offset.
+
+        If the generator of the previous layout of the graph is given, the
+        components are placed so that the graph stays stable: a component whose
+        layout did not change keeps its position (and its qt items can be kept,
+        see `is_unchanged`), a modified component takes the place of the
+        previous component with which it shares the most nodes if it fits in
+        it, and the other components are placed below.
+
+        The interior of each expanded cluster is laid out separately, and is
+        placed in the label's cell of the cluster's node, below its label (see
+        `cluster_label_size`).
+
+        Constructor arguments:
+        - `json_strings`: dot's json output for each component (see
+          JsonOutput)
+        - `previous`: generator of the previous layout of the graph, if the
+          layout must be stable
+        - `clusters`: for each expanded cluster, per name, a tuple (dot's json
+          output for its interior, True if the cluster has no input port)
+    """
+
+    # Vertical space between two components:
+    SPACING = 20.
+    # Space kept for the label of an expanded cluster, above its interior, and
+    # around its interior:
+    CLUSTER_LABEL_HEIGHT = 30.
+    CLUSTER_PADDING = 10.
+
+
+    def __init__(self, json_strings: List[JsonOutput],
+                 previous: ComponentsQtGenerator = None,
+                 clusters: Dict[str, Tuple[JsonOutput, bool]] = None):
+        self._json_strings = list(json_strings)
+        # Digest of each component's layout, computed when needed (see
+        # `digests`):
+        self._digests: List[str] = None
+        self._generators: List[JsonToQtGenerator] = [
+            JsonToQtGenerator(json_string) for json_string in json_strings]
+        # Index of the component containing each node:
+        self._component_per_node: Dict[str, int] = {}
+        for (index, generator) in enumerate(self._generators):
+            for node_name in generator.node_names():
+                self._component_per_node[node_name] = index
+        # Indexes of the components whose layout is the same as in `previous`:
+        self._unchanged_components: Set[int] = set()
+
+        if previous is None:
+            self._stack_components()
+        else:
+            self._place_components(previous)
+
+        # Generators of the interiors of the expanded clusters, and cluster
+        # containing each node of these interiors:
+        self._cluster_json_strings: Dict[str, JsonOutput] = {}
+        self._cluster_generators: Dict[str, JsonToQtGenerator] = {}
+        self._cluster_per_node: Dict[str, str] = {}
+        # Expanded clusters whose interior and position did not change:
+        self._unchanged_clusters: Set[str] = set()
+        if clusters is not None:
+            self._place_clusters(clusters, previous)
+
+
+    @classmethod
+    def cluster_label_size(cls, interior_json_string: JsonOutput) \
+                           -> Tuple[float, float]:
+        """ Returns the size of the label's cell of an expanded cluster, given
+            dot's json output for its interior: it contains the label and the
+            interior.
+        """
+        graph_data = _parsed(interior_json_string)
+        bounding_box = [float(coord) for coord
+                        in graph_data[j.DIMENSIONS].split(',')]
+        return (bounding_box[2] + 2 * cls.CLUSTER_PADDING,
+                bounding_box[3] + cls.CLUSTER_LABEL_HEIGHT
+                + cls.CLUSTER_PADDING)
+
+
+    def generators(self) -> List[JsonToQtGenerator]:
+        return self._generators.copy()
+
+
+    def json_strings(self) -> List[JsonOutput]:
+        return self._json_strings.copy()
+
+
+    def digests(self) -> List[str]:
+        """ Returns the digest of the layout of each component (see
+            `_layout_digest`), by which the components of two layouts are
+            compared.
+        """
+        if self._digests is None:
+            self._digests = [_layout_digest(json_string)
+                             for json_string in self._json_strings]
+        return self._digests.copy()
+
+
+    def cluster_json_strings(self) -> Dict[str, JsonOutput]:
+        return self._cluster_json_strings.copy()
+
+
+    def is_unchanged(self, node_name: str) -> bool:
+        """ Returns True if the component containing the node (or the interior
+            of the expanded cluster containing it) has the same layout and
+            position as in the previous generator: the qt items generated by
+            the previous generator for its elements can be kept.
+        """
+        cluster_name = self._cluster_per_node.get(node_name)
+        if cluster_name is not None:
+            return cluster_name in self._unchanged_clusters
+        return self._component_per_node.get(node_name) \
+            in self._unchanged_components
+
+
+    def _stack_components(self) -> None:
+        """ Places the components one below the other. """
+        y_offset = 0.
+        for generator in self._generators:
+            generator.set_offset((0., y_offset))
+            y_offset += generator.height() + self.SPACING
+
+
+    def _place_components(self, previous: ComponentsQtGenerator) -> None:
+        """ Places the components so that the unchanged ones keep their
+            position (see the class documentation).
+        """
+        previous_generators = previous.generators()
+        previous_names = [set(generator.node_names())
+                          for generator in previous_generators]
+        claimed: Set[int] = set() # Previous components whose place is taken
+        placed: Set[int] = set()
+
+        # The components whose layout did not change keep their position. The
+        # layouts are compared by digest:
+        prev_indexes_per_digest: Dict[str, List[int]] = {}
+        for (prev_index, digest) in enumerate(previous.digests()):
+            prev_indexes_per_digest.setdefault(digest, []).append(prev_index)
+        for (index, digest) in enumerate(self.digests()):
+            prev_indexes = prev_indexes_per_digest.get(digest)
+            if not prev_indexes:
+                continue
+            prev_index = prev_indexes.pop(0)
+            self._generators[index].set_offset(
+                previous_generators[prev_index].offset())
+            claimed.add(prev_index)
+            placed.add(index)
+            self._unchanged_components.add(index)
+
+        # A modified component takes the place of the previous component with
+        # which it shares the most nodes, if it fits in it:
+        for (index, generator) in enumerate(self._generators):
+            if index in placed:
+                continue
+            names = set(generator.node_names())
+            candidates = [(len(names & prev_names), prev_index)
+                          for (prev_index, prev_names)
+                          in enumerate(previous_names)
+                          if prev_index not in claimed and names & prev_names]
+            if candidates == []:
+                continue
+            (_, prev_index) = max(candidates,
+                                  key=lambda candidate: (candidate[0],
+                                                         -candidate[1]))
+            if generator.height() <= previous_generators[prev_index].height():
+                generator.set_offset(previous_generators[prev_index].offset())
+                claimed.add(prev_index)
+                placed.add(index)
+
+        # The other components are placed below:
+        y_offset = max((previous_generators[prev_index].offset()[1]
+                        + previous_generators[prev_index].height()
+                        + self.SPACING for prev_index in claimed), default=0.)
+        for (index, generator) in enumerate(self._generators):
+            if index in placed:
+                continue
+            generator.set_offset((0., y_offset))
+            y_offset += generator.height() + self.SPACING
+
+
+    def _place_clusters(self, clusters: Dict[str, Tuple[JsonOutput, bool]],
+                        previous: ComponentsQtGenerator | None) -> None:
+        """ Places the interior of each expanded cluster in the label's cell of
+            the cluster's node.
+        """
+        previous_json_strings = {}
+        if previous is not None:
+            previous_json_strings = previous.cluster_json_strings()
+
+        for (cluster_name, (json_string, no_input)) in clusters.items():
+            generator = JsonToQtGenerator(json_string)
+            (x_coord, y_coord, width, height) = \
+                self._get_generator(cluster_name).get_node_label_cell_rect(
+                    cluster_name, no_input)
+            # The interior is centered in the cell, below the label:
+            free_height = height - self.CLUSTER_LABEL_HEIGHT
+            generator.set_offset(
+                (x_coord + (width - generator.width()) / 2,
+                 y_coord + self.CLUSTER_LABEL_HEIGHT
+                 + (free_height - generator.height()) / 2))
+
+            self._cluster_json_strings[cluster_name] = json_string
+            self._cluster_generators[cluster_name] = generator
+            for node_name in generator.node_names():
+                self._cluster_per_node[node_name] = cluster_name
+            if (self.is_unchanged(cluster_name)
+                    and previous_json_strings.get(cluster_name) == json_string):
+                self._unchanged_clusters.add(cluster_name)
+
+
+    def get_qt_item_for_node(self, node_name: str, no_input: bool = False) \
+                             -> QGraphicsItem:
+        """ See JsonToQtGenerator.get_qt_item_for_node """
+        return self._get_generator(node_name).get_qt_item_for_node(node_name,
+                                                                   no_input)
+
+
+    def get_qt_item_for_port(self, node_name: str, port_name: str) \
+                             -> QGraphicsItem:
+        """ See JsonToQtGenerator.get_qt_item_for_port """
+        return self._get_generator(node_name).get_qt_item_for_port(node_name,
+                                                                   port_name)
+
+
+    def get_qt_item_for_edge(self, head_name: str, tail_name: str,
+                             head_port: str = None, tail_port: str = None) \
+                             -> QGraphicsItem:
+        """ See JsonToQtGenerator.get_qt_item_for_edge """
+        # The head and tail of an edge are in the same component (or in the
+        # interior of the same cluster):
+        return self._get_generator(head_name).get_qt_item_for_edge(
+            head_name, tail_name, head_port, tail_port)
+
+
+    def _get_generator(self, node_name: str) -> JsonToQtGenerator:
+        cluster_name = self._cluster_per_node.get(node_name)
+        if cluster_name is not None:
+            return self._cluster_generators[cluster_name]
+        index = self._component_per_node.get(node_name)
+        if index is None:
+            raise ValueError(f"Node {node_name} could not be found in dot's"
+                             " json outputs.")
+        return self._generators[index]
+
+
+def _layout_digest(json_output: JsonOutput) -> str:
+    """ Returns a digest (sha256, in hexadecimal) of dot's json output, parsed
+        or not: two layouts with the same digest are the same.
+    """
+    if not isinstance(json_output, str):
+        json_output = dumps(json_output)
+    return sha256(json_output.encode('utf-8')).hexdigest()
+
+
+def _parsed(json_output: JsonOutput) -> Dict[str, Any]:
+    """ Returns dot's json output parsed, parsing it if it is a string. """
+    if isinstance(json_output, str):
+        return loads(json_output)
+    return json_output
@@ -0,0 +1,258 @@
+""" Helper functions installed on the remote kernel.
+
+The source code of this module is sent to the kernel by
+DynamicGraphCommunication when it connects to it, and executed in a `_sotgui`
+namespace. Queries can then be short calls such as
+`_sotgui.sig_time('add1', 'sin0')`, instead of full expressions that the kernel
+would have to parse and compile each time.
+
+This module is executed on the kernel side: it must only depend on the standard
+library and on the dynamic graph, which is imported lazily.
+"""
+
+# Version of the helpers: it must be incremented each time this module is
+# modified, so that kernels with outdated helpers get the new version.
+VERSION = 7
+
+# Replaces a value in the results of batched queries when getting it raised an
+# error, as a tuple (ERROR_MARKER, error message):
+ERROR_MARKER = '__sotgui_error__'
+
+# Numeric vectors and matrices are not sent as their repr, but in a compact
+# typed encoding: (ARRAY_MARKER, dtype, shape, base64 of the little-endian raw
+# data). Those with more than LARGE_VALUE_SIZE elements are only sent as a
+# summary: (SUMMARY_MARKER, shape, min, max, norm). Their full data can be
+# fetched on request (see `sig_full_values`).
+ARRAY_MARKER = '__sotgui_array__'
+SUMMARY_MARKER = '__sotgui_summary__'
+LARGE_VALUE_SIZE = 64
+
+
+def _entities():
+    """ Returns the dictionary of the dynamic graph's entities, per name. """
+    from dynamic_graph.entity import Entity
+    return Entity.entities
+
+
+def _linked_signal_name(sig):
+    """ Returns the description of the signal plugged to an input signal, or
+        None if the signal is an output or is not plugged.
+    """
+    if '::input(' not in sig.name or not sig.isPlugged():
+        return None
+    return sig.getPlugged().name
+
+
+def _signal(entity_name, signal_name):
+    """ Returns an entity's signal. """
+    return _entities()[entity_name].signal(signal_name)
+
+
+def _flatten(value):
+    """ Returns a tuple (shape, flat list of floats) for a vector (sequence of
+        numbers) or a matrix (sequence of rows of the same size), or None if
+        the value is neither.
+    """
+    def is_number(element):
+        return (isinstance(element, (int, float))
+                and not isinstance(element, bool))
+
+    if all(is_number(element) for element in value):
+        return ((len(value),), [float(element) for element in value])
+
+    rows = [row.tolist() if hasattr(row, 'tolist') else row for row in value]
+    if not all(isinstance(row, (tuple, list)) for row in rows):
+        return None
+    if len({len(row) for row in rows}) != 1:
+        return None
+    flat = [element for row in rows for element in row]
+    if not all(is_number(element) for element in flat):
+        return None
+    return ((len(rows), len(rows[0])), [float(element) for element in flat])
+
+
+def _encode_value(value, max_size=LARGE_VALUE_SIZE):
+    """ Returns a value in the form in which it is sent to the GUI: numeric
+        vectors and matrices are encoded (or summarized if they have more than
+        `max_size` elements), other values are returned as is.
+    """
+    if hasattr(value, 'tolist'): # e.g numpy arrays
+        value = value.tolist()
+    if not isinstance(value, (tuple, list)) or len(value) == 0:
+        return value
+    flattened = _flatten(value)
+    if flattened is None:
+        return value
+    (shape, flat) = flattened
+
+    if max_size is not None and len(flat) > max_size:
+        from math import sqrt
+        return (SUMMARY_MARKER, shape, min(flat), max(flat),
+                sqrt(sum(element * element for element in flat)))
+
+    from base64 import b64encode
+    from struct import pack
+    data = b64encode(pack(f'<{len(flat)}d', *flat)).decode('ascii')
+    return (ARRAY_MARKER, 'float64', shape, data)
+
+
+def entity_names():
+    return list(_entities().keys())
+
+
+def entity_exists(entity_name):
+    return entity_name in _entities()
+
+
+def entity_type(entity_name):
+    return _entities()[entity_name].className
+
+
+def entity_signals(entity_name):
+    return [sig.name for sig in _entities()[entity_name].signals()]
+
+
+def sig_plugged(entity_name, signal_name):
+    return _signal(entity_name, signal_name).isPlugged()
+
+
+def sig_linked(entity_name, signal_name):
+    return _signal(entity_name, signal_name).getPlugged().name
+
+
+def sig_value(entity_name, signal_name):
+    return _encode_value(_signal(entity_name, signal_name).value)
+
+
+def sig_time(entity_name, signal_name):
+    return _signal(entity_name, signal_name).time
+
+
+def _get_for_signals(pairs, getter):
+    """ Returns the results of `getter` for each signal of a list of pairs
+        (entity name, signal name). A signal for which `getter` raises an error
+        gets an error marker instead of its result.
+    """
+    results = []
+    for (entity_name, signal_name) in pairs:
+        try:
+            results.append(getter(_signal(entity_name, signal_name)))
+        except Exception as error:
+            results.append((ERROR_MARKER, f"{type(error).__name__}: {error}"))
+    return results
+
+
+def sig_values(pairs):
+    return _get_for_signals(pairs, lambda sig: _encode_value(sig.value))
+
+
+def sig_full_values(pairs):
+    """ Same as `sig_values`, but large values are not summarized. """
+    return _get_for_signals(pairs,
+                            lambda sig: _encode_value(sig.value, None))
+
+
+def sig_times(pairs):
+    return _get_for_signals(pairs, lambda sig: sig.time)
+
+
+def sig_data(pairs):
+    """ Returns the value and time of each signal, as tuples (value, time), so
+        that both are fetched with a single command.
+    """
+    return _get_for_signals(pairs,
+                            lambda sig: (_encode_value(sig.value), sig.time))
+
+
+def sig_full_data(pairs):
+    """ Same as `sig_data`, but large values are not summarized. """
+    return _get_for_signals(pairs,
+                            lambda sig: (_encode_value(sig.value, None),
+                                         sig.time))
+
+
+def graph_snapshot(with_values=True):
+    """ Returns the data of every entity, as a dictionary whose keys are the
+        entities' names, and whose values are tuples (class name, signals).
+        Each signal is a tuple (description, linked signal description, value,
+        time). If `with_values` is False, the values and times are not read
+        (they are all None).
+    """
+    snapshot = {}
+    for (name, entity) in _entities().items():
+        signals = []
+        for sig in entity.signals():
+            is_input = '::input(' in sig.name
+            linked_signal, value, time = None, None, None
+            # Reading the value of an unplugged input raises an error, so it is
+            # only read for outputs and plugged inputs:
+            try:
+                linked_signal = _linked_signal_name(sig)
+                if with_values and (linked_signal is not None
+                                    or not is_input):
+                    value = _encode_value(sig.value)
+                    time = sig.time
+            except Exception:
+                pass
+            signals.append((sig.name, linked_signal, value, time))
+        snapshot[name] = (entity.className, signals)
+    return snapshot
+
+
+def graph_values():
+    """ Returns the value and time of every signal, as a dictionary whose keys
+        are the entities' names, and whose values are dictionaries of tuples
+        (value, time) per signal name (e.g `'sin0'`). Unplugged inputs are
+        omitted.
+    """
+    values = {}
+    for (name, entity) in _entities().items():
+        entity_values = {}
+        for sig in entity.signals():
+            try:
+                if ('::input(' in sig.name and
+                        _linked_signal_name(sig) is None):
+                    continue
+                entity_values[sig.name.split('::')[-1]] = \
+                    (_encode_value(sig.value), sig.time)
+            except Exception:
+                pass
+        values[name] = entity_values
+    return values
+
+
+def topology_fingerprint():
+    """ Returns a hash of the graph's topology: entities' names and classes,
+        signals and plugs. It does not depend on the signals' values, nor on
+        the order of the entities and signals.
+    """
+    from hashlib import sha1
+    digest = sha1()
+    entities = _entities()
+    for name in sorted(entities):
+        entity = entities[name]
+        digest.update(f"{name}:{entity.className}\n".encode())
+        for sig in sorted(entity.signals(), key=lambda sig: sig.name):
+            try:
+                linked_signal = _linked_signal_name(sig)
+            except Exception:
+                linked_signal = None
+            digest.update(f"\t{sig.name}->{linked_signal}\n".encode())
+    return digest.hexdigest()
+
+
+def graph_update(known_fingerprint, with_values=True):
+    """ Returns the data needed to refresh a graph whose topology had the
+        fingerprint `known_fingerprint`, as a tuple (fingerprint, snapshot,
+        values): if the topology did not change, the snapshot is None and the
+        values are those of `graph_values` (or None if `with_values` is
+        False). Otherwise, the snapshot is the one of `graph_snapshot` and the
+        values are None.
+
+        The fingerprint and the data are read by the same command, so that
+        the graph cannot change between them.
+    """
+    fingerprint = topology_fingerprint()
+    if fingerprint == known_fingerprint:
+        return (fingerprint, None, graph_values() if with_values else None)
+    return (fingerprint, graph_snapshot(with_values), None)
@@ -0,0 +1,1058 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Set, Tuple
+from threading import Lock
+
+try:
+    import numpy as np
+except ImportError: # The layout is then computed in pure Python
+    np = None
+
+from sot_gui.layout_budget import LayoutMode
+from sot_gui.graph_ir import LayoutNode, LayoutEdge
+from sot_gui.html_table_geometry import (TableGeometry, TableMetrics, INPUT,
+    OUTPUT)
+
+
+# Layout mode reported when the layout is computed by LayeredLayout instead of
+# dot (see Graph.layout_mode):
+LAYERED_LAYOUT_MODE = LayoutMode('layered', {}, 0.)
+
+
+class LayeredLayout:
+    """ Layered (Sugiyama-style) layout engine, laying a graph out from left to
+        right without running dot. Its output has the same format as dot's
+        parsed json output (`dot -Tjson`), so that it can be given to a
+        JsonToQtGenerator without being serialized.
+
+        The layout is computed in four steps:
+        - rank assignment: the cycles are broken by reversing the edges going
+          back in a depth-first search, and each node is ranked after its
+          predecessors (the nodes without predecessors are placed just before
+          their successors). The edges spanning several ranks go through dummy
+          nodes.
+        - crossing reduction: the nodes of each rank are ordered by the
+          barycenter of the ports they are linked to in the adjacent rank,
+          sweeping the ranks forwards and backwards.
+        - coordinate assignment: each node is moved towards the ports it is
+          linked to, so that the edges are as straight as possible, while
+          keeping the order of the nodes and their separation.
+        - drawing: the nodes' html tables and the edges' splines are generated
+          in dot's json format.
+
+        The layouts are incremental: a node which was already laid out keeps its
+        rank, unless its edges changed so that it must move, and it is anchored
+        to its previous vertical position. The anchored nodes keep their order
+        in their rank, and the coordinate assignment only moves the other nodes
+        (new nodes and edges' dummy nodes), between them. An anchored node is
+        only pushed down if the nodes above it need the room. Adding or
+        removing a few entities thus only moves the nodes around them. The
+        nodes which are no longer in the graph can be forgotten with `retain`.
+
+        If NumPy is installed, the barycenters and coordinates are computed with
+        vectorized operations, which are much faster on large graphs.
+
+        The engine can be used from several threads.
+    """
+
+    # Number of sweeps of the crossing reduction:
+    SWEEPS = 8
+    # Number of forward and backward passes of the coordinate assignment:
+    COORDINATE_PASSES = 4
+
+    # Text and tables dimensions, similar to dot's for a 14pt Times font:
+    FONT_SIZE = 14.
+    FONT_FACE = 'Times-Roman'
+    CHAR_WIDTH = 7.
+    CELL_PADDING = 5. # Cell padding and border
+    ROW_HEIGHT = 27.
+    ELLIPSE_HEIGHT = 36.
+    ELLIPSE_MIN_WIDTH = 54.
+
+    # Spacing:
+    NODE_SEPARATION = 18.
+    RANK_SEPARATION = 40.
+    LABEL_MARGIN = 10.
+    MARGIN = 4.
+    DUMMY_HEIGHT = 4.
+
+    # Edges' arrow heads:
+    ARROW_LENGTH = 10.
+    ARROW_WIDTH = 7.
+
+
+    def __init__(self):
+        self._table_metrics = TableMetrics(self.CHAR_WIDTH, self.ROW_HEIGHT,
+                                           self.CELL_PADDING)
+        # Ranks and vertical positions of the nodes in the previous layouts,
+        # per node name:
+        self._ranks: Dict[str, int] = {}
+        self._centers: Dict[str, float] = {}
+        # Vertical positions of the dummy nodes of the edges in the previous
+        # layouts, per rank, per (tail, head) of the edge:
+        self._dummy_centers: Dict[Tuple, Dict[int, float]] = {}
+        self._lock = Lock()
+
+
+    def reset(self) -> None:
+        """ Forgets the previous layouts: the next ones are computed from
+            scratch.
+        """
+        with self._lock:
+            self._ranks.clear()
+            self._centers.clear()
+            self._dummy_centers.clear()
+
+
+    def retain(self, node_names: Set[str]) -> None:
+        """ Forgets the ranks and positions of the nodes which are not in
+            `node_names` (e.g the nodes which were removed from the graph), so
+            that they do not accumulate.
+        """
+        with self._lock:
+            self._ranks = {name: rank for (name, rank) in self._ranks.items()
+                           if name in node_names}
+            self._centers = {name: center for (name, center)
+                             in self._centers.items() if name in node_names}
+            self._dummy_centers = {
+                key: centers for (key, centers)
+                in self._dummy_centers.items()
+                if key[0][0] in node_names and key[1][0] in node_names}
+
+
+    def layout(self, nodes: List[LayoutNode], edges: List[LayoutEdge]) \
+               -> Dict[str, Any]:
+        """ Computes the layout of a graph, and returns it in the format of
+            dot's json output, as parsed by `json.loads`.
+
+            Raises:
+                ValueError: An edge is linked to an unknown node or port.
+        """
+        with self._lock:
+            previous_ranks = dict(self._ranks)
+            previous_centers = dict(self._centers)
+            previous_dummy_centers = dict(self._dummy_centers)
+
+        layout = _LayeredLayoutComputation(self, nodes, edges, previous_ranks,
+                                           previous_centers,
+                                           previous_dummy_centers)
+        output = layout.run()
+
+        with self._lock:
+            self._ranks.update(layout.ranks())
+            self._centers.update(layout.centers())
+            # The edges of the graph's nodes which are not in the graph anymore
+            # are forgotten:
+            names = {node.name() for node in nodes}
+            self._dummy_centers = {
+                key: centers for (key, centers)
+                in self._dummy_centers.items()
+                if key[0][0] not in names and key[1][0] not in names}
+            self._dummy_centers.update(layout.dummy_centers())
+        return output
+
+
+    def text_width(self, text: str) -> float:
+        return self._table_metrics.text_width(text)
+
+
+    def node_geometry(self, node: LayoutNode) \
+                      -> Tuple[float, float, TableGeometry | None,
+                               Dict[str, float], Dict[str, float]]:
+        """ Returns the geometry of a node: its width, its height, the geometry
+            of its html table (None for an ellipse), and the vertical offset of
+            each input and output port from its center.
+        """
+        if not node.is_table():
+            width = max(self.text_width(node.label()) + 24.,
+                        self.ELLIPSE_MIN_WIDTH)
+            return (width, self.ELLIPSE_HEIGHT, None, {}, {})
+
+        table = TableGeometry(node.label(), node.inputs() or [],
+                              node.outputs(), self._table_metrics,
+                              node.label_size())
+        height = table.height()
+
+        def port_offsets(port_type: str) -> Dict[str, float]:
+            return {name: y_coord - height / 2 for (name, (_, y_coord))
+                    in table.port_anchors(port_type).items()}
+
+        return (table.width(), height, table, port_offsets(INPUT),
+                port_offsets(OUTPUT))
+
+
+class _LayeredLayoutComputation:
+    """ State of a layout computed by LayeredLayout. The nodes are identified
+        by their index: the nodes of the graph first, and then the dummy nodes.
+    """
+
+    def __init__(self, engine: LayeredLayout, nodes: List[LayoutNode],
+                 edges: List[LayoutEdge], previous_ranks: Dict[str, int],
+                 previous_centers: Dict[str, float],
+                 previous_dummy_centers: Dict[Tuple, Dict[int, float]]):
+        self._engine = engine
+        self._nodes = nodes
+        self._edges = edges
+        self._previous_ranks = previous_ranks
+        self._previous_centers = previous_centers
+        self._previous_dummy_centers = previous_dummy_centers
+        self._index_per_name = {node.name(): index
+                                for (index, node) in enumerate(nodes)}
+        # Previous vertical position of the nodes which were already laid out
+        # (including the dummy nodes of the edges, see `_add_paths`), to which
+        # they are anchored:
+        self._anchors: Dict[int, float] = {
+            index: previous_centers[node.name()]
+            for (index, node) in enumerate(nodes)
+            if node.name() in previous_centers}
+
+        # Dimensions of each node, and vertical offset of each port from the
+        # center of its node:
+        self._widths: List[float] = []
+        self._heights: List[float] = []
+        self._input_offsets: List[Dict[str, float]] = []
+        self._output_offsets: List[Dict[str, float]] = []
+        # Geometry of the html tables (None for the ellipses):
+        self._tables: List[TableGeometry | None] = []
+
+        # Indexes of the edges reversed to break the cycles:
+        self._reversed_edges: Set[int] = set()
+        # Rank of each node, and nodes of each rank:
+        self._rank: List[int] = []
+        self._members: List[List[int]] = []
+        # Index of each node in the list of the members of its rank:
+        self._slot: List[int] = []
+        # For each edge, the nodes it goes through from its tail to its head:
+        self._paths: List[List[int]] = []
+        # (tail, head) of the edge of each dummy node:
+        self._dummy_edges: Dict[int, Tuple] = {}
+        # For each pair of adjacent ranks (r, r + 1), the segments between
+        # their nodes (see `_add_segment`):
+        self._segments: List[Dict[str, list]] = []
+
+        # Slots of the anchored nodes of each rank, sorted by anchor:
+        self._anchored_slots: List[List[int]] = []
+        # Current order of the slots of each rank, position of each node in its
+        # rank, and vertical position of the center of each node:
+        self._orders: list = []
+        self._positions = None
+        self._centers = None
+
+
+    def ranks(self) -> Dict[str, int]:
+        return {node.name(): self._rank[index]
+                for (index, node) in enumerate(self._nodes)}
+
+
+    def centers(self) -> Dict[str, float]:
+        return {node.name(): float(self._centers[index])
+                for (index, node) in enumerate(self._nodes)}
+
+
+    def dummy_centers(self) -> Dict[Tuple, Dict[int, float]]:
+        centers: Dict[Tuple, Dict[int, float]] = {}
+        for (node, edge_key) in self._dummy_edges.items():
+            centers.setdefault(edge_key, {})[self._rank[node]] = \
+                float(self._centers[node])
+        return centers
+
+
+    def run(self) -> Dict[str, Any]:
+        for node in self._nodes:
+            self._add_node_geometry(node)
+        edge_endpoints = [self._get_edge_endpoints(edge)
+                          for edge in self._edges]
+        self._assign_ranks(edge_endpoints)
+        self._add_paths(edge_endpoints)
+        self._reduce_crossings()
+        self._assign_coordinates()
+        return self._generate_output(edge_endpoints)
+
+
+    #
+    # Geometry of the nodes
+    #
+
+    def _text_width(self, text: str) -> float:
+        return self._engine.text_width(text)
+
+
+    def _add_node_geometry(self, node: LayoutNode) -> None:
+        (width, height, table, input_offsets, output_offsets) = \
+            self._engine.node_geometry(node)
+        self._widths.append(width)
+        self._heights.append(height)
+        self._input_offsets.append(input_offsets)
+        self._output_offsets.append(output_offsets)
+        self._tables.append(table)
+
+
+    def _get_edge_endpoints(self, edge: LayoutEdge) \
+                            -> Tuple[int, float, int, float]:
+        """ Returns the tail node, the offset of the tail port, the head node
+            and the offset of the head port of an edge.
+        """
+        (tail_name, tail_port) = edge.tail()
+        (head_name, head_port) = edge.head()
+        tail = self._index_per_name.get(tail_name)
+        head = self._index_per_name.get(head_name)
+        if tail is None or head is None:
+            raise ValueError(f"Edge {tail_name} -> {head_name} is linked to an"
+                             " unknown node.")
+
+        def port_offset(offsets: Dict[str, float], port: str | None) -> float:
+            if port is None or not offsets:
+                return 0.
+            if port not in offsets:
+                raise ValueError(f"Unknown port {port} of an edge.")
+            return offsets[port]
+
+        return (tail, port_offset(self._output_offsets[tail], tail_port),
+                head, port_offset(self._input_offsets[head], head_port))
+
+
+    #
+    # Rank assignment
+    #
+
+    def _assign_ranks(self, edge_endpoints: List[Tuple]) -> None:
+        nodes_nb = len(self._nodes)
+        successors: List[List[int]] = [[] for _ in range(nodes_nb)]
+        for (tail, _, head, _) in edge_endpoints:
+            if tail != head:
+                successors[tail].append(head)
+
+        # Breaking the cycles: the edges going back to a node being explored
+        # in a depth-first search are reversed.
+        state = [0] * nodes_nb # 0: not visited, 1: being explored, 2: explored
+        back_edges = set()
+        for root in range(nodes_nb):
+            if state[root] != 0:
+                continue
+            state[root] = 1
+            stack = [(root, iter(successors[root]))]
+            while stack:
+                (node, successors_iterator) = stack[-1]
+                successor = next(successors_iterator, None)
+                if successor is None:
+                    state[node] = 2
+                    stack.pop()
+                elif state[successor] == 1:
+                    back_edges.add((node, successor))
+                elif state[successor] == 0:
+                    state[successor] = 1
+                    stack.append((successor, iter(successors[successor])))
+
+        predecessors: List[List[int]] = [[] for _ in range(nodes_nb)]
+        dag_successors: List[List[int]] = [[] for _ in range(nodes_nb)]
+        for (index, (tail, _, head, _)) in enumerate(edge_endpoints):
+            if tail == head:
+                continue
+            if (tail, head) in back_edges:
+                self._reversed_edges.add(index)
+                (tail, head) = (head, tail)
+            predecessors[head].append(tail)
+            dag_successors[tail].append(head)
+
+        # Topological order (Kahn's algorithm):
+        remaining = [len(preds) for preds in predecessors]
+        ready = [node for node in range(nodes_nb) if remaining[node] == 0]
+        topological_order = []
+        while ready:
+            node = ready.pop()
+            topological_order.append(node)
+            for successor in dag_successors[node]:
+                remaining[successor] -= 1
+                if remaining[successor] == 0:
+                    ready.append(successor)
+
+        # Each node is ranked after its predecessors, and keeps its previous
+        # rank if it is still valid:
+        rank = [0] * nodes_nb
+        for node in topological_order:
+            previous_rank = self._previous_ranks.get(self._nodes[node].name(), 0)
+            rank[node] = max([previous_rank] + [rank[predecessor] + 1
+                                                for predecessor
+                                                in predecessors[node]])
+
+        # The new nodes without predecessors (e.g input values) are placed
+        # just before their successors:
+        for node in reversed(topological_order):
+            if (predecessors[node] == [] and dag_successors[node] != []
+                    and self._nodes[node].name() not in self._previous_ranks):
+                rank[node] = max(rank[node], min(rank[successor] for successor
+                                                 in dag_successors[node]) - 1)
+
+        # Removing the empty ranks:
+        rank_per_value = {value: index for (index, value)
+                          in enumerate(sorted(set(rank)))}
+        self._rank = [rank_per_value[value] for value in rank]
+        self._members = [[] for _ in range(len(rank_per_value))]
+        self._slot = []
+        for node in range(nodes_nb):
+            self._slot.append(len(self._members[self._rank[node]]))
+            self._members[self._rank[node]].append(node)
+        self._segments = [self._new_segments()
+                          for _ in range(max(len(self._members) - 1, 0))]
+
+
+    def _new_segments(self) -> Dict[str, list]:
+        return {'left': [], 'right': [], 'left_slot': [], 'right_slot': [],
+                'left_offset': [], 'right_offset': []}
+
+
+    def _add_dummy_node(self, rank: int) -> int:
+        node = len(self._rank)
+        self._rank.append(rank)
+        self._slot.append(len(self._members[rank]))
+        self._members[rank].append(node)
+        self._widths.append(0.)
+        self._heights.append(self._engine.DUMMY_HEIGHT)
+        return node
+
+
+    def _add_segment(self, left: int, left_offset: float, right: int,
+                     right_offset: float) -> None:
+        """ Adds a segment between two nodes of adjacent ranks, with the
+            vertical offsets of its ends from the centers of the nodes.
+        """
+        segments = self._segments[self._rank[left]]
+        segments['left'].append(left)
+        segments['right'].append(right)
+        segments['left_slot'].append(self._slot[left])
+        segments['right_slot'].append(self._slot[right])
+        segments['left_offset'].append(left_offset)
+        segments['right_offset'].append(right_offset)
+
+
+    def _add_paths(self, edge_endpoints: List[Tuple]) -> None:
+        """ Adds the dummy nodes of the edges spanning several ranks, and the
+            segments of every edge.
+        """
+        for (index, (tail, tail_offset, head, head_offset)) \
+                in enumerate(edge_endpoints):
+            if tail == head:
+                self._paths.append([tail, head])
+                continue
+
+            # The path goes from left to right:
+            if index in self._reversed_edges:
+                (left, left_offset, right, right_offset) = \
+                    (head, head_offset, tail, tail_offset)
+            else:
+                (left, left_offset, right, right_offset) = \
+                    (tail, tail_offset, head, head_offset)
+
+            # The dummy nodes are anchored to the previous position of the
+            # edge in their rank:
+            edge = self._edges[index]
+            edge_key = (edge.tail(), edge.head())
+            previous_centers = self._previous_dummy_centers.get(edge_key, {})
+            path = [left]
+            for rank in range(self._rank[left] + 1, self._rank[right]):
+                dummy_node = self._add_dummy_node(rank)
+                self._dummy_edges[dummy_node] = edge_key
+                if rank in previous_centers:
+                    self._anchors[dummy_node] = previous_centers[rank]
+                path.append(dummy_node)
+            path.append(right)
+
+            for (position, (node, next_node)) \
+                    in enumerate(zip(path[:-1], path[1:])):
+                node_offset = left_offset if position == 0 else 0.
+                next_offset = right_offset if next_node == right else 0.
+                self._add_segment(node, node_offset, next_node, next_offset)
+
+            if index in self._reversed_edges:
+                path.reverse()
+            self._paths.append(path)
+
+        self._segments = [{key: _array(values, float if key.endswith('offset')
+                                                                    else int)
+                           for (key, values) in segments.items()}
+                          for segments in self._segments]
+        self._members = [_array(members, int) for members in self._members]
+        self._heights = _array(self._heights, float)
+
+
+    #
+    # Crossing reduction
+    #
+
+    def _reduce_crossings(self) -> None:
+        nodes_nb = len(self._rank)
+
+        # The ranks are first ordered as in the previous layout, the new nodes
+        # being added at the end:
+        self._positions = _array([0.] * nodes_nb, float)
+        self._orders = [None] * len(self._members)
+        for members in self._members:
+            anchored_slots = [slot for (slot, node) in enumerate(members)
+                              if node in self._anchors]
+            anchored_slots.sort(key=lambda slot: self._anchors[members[slot]])
+            self._anchored_slots.append(anchored_slots)
+        for (rank, members) in enumerate(self._members):
+            previous_centers = [self._anchors.get(int(node), float('inf'))
+                                for node in members]
+            self._set_order(rank, _argsort(_array(previous_centers, float)))
+
+        # Relative position of the ends of the segments in their node:
+        fractions = [
+            {'left': self._port_fractions(segments['left'],
+                                          segments['left_offset']),
+             'right': self._port_fractions(segments['right'],
+                                           segments['right_offset'])}
+            for segments in self._segments]
+
+        ranks_nb = len(self._members)
+        for sweep in range(self._engine.SWEEPS):
+            if sweep % 2 == 0: # Forward sweep
+                for rank in range(1, ranks_nb):
+                    segments = self._segments[rank - 1]
+                    self._order_by_barycenter(
+                        rank, segments['left'], fractions[rank - 1]['left'],
+                        segments['right_slot'])
+            else: # Backward sweep
+                for rank in range(ranks_nb - 2, -1, -1):
+                    segments = self._segments[rank]
+                    self._order_by_barycenter(
+                        rank, segments['right'], fractions[rank]['right'],
+                        segments['left_slot'])
+
+
+    def _port_fractions(self, nodes, offsets):
+        """ Returns the relative vertical positions (between 0 and 1) of the
+            ends of some segments in their nodes.
+        """
+        heights = _gather(self._heights, nodes)
+        return _divide(_add(offsets, _scale(heights, 0.5)), heights)
+
+
+    def _set_order(self, rank: int, order) -> None:
+        """ Sets the order of the slots of a rank, and the positions of its
+            nodes.
+        """
+        members = self._members[rank]
+        self._orders[rank] = order
+        _scatter(self._positions, _gather(members, order),
+                 _array(range(len(members)), float))
+
+
+    def _order_by_barycenter(self, rank: int, neighbors, fractions,
+                             slots) -> None:
+        """ Orders the nodes of a rank by the barycenter of the positions of
+            their neighbors in the adjacent rank.
+
+            Args:
+                rank: the rank to order.
+                neighbors: the neighbor of each segment.
+                fractions: the relative position of each segment's end in its
+                    neighbor.
+                slots: the slot of the node of the rank for each segment.
+        """
+        members = self._members[rank]
+        current_positions = _gather(self._positions, members)
+        barycenters = _group_means(
+            _add(_gather(self._positions, neighbors), fractions), slots,
+            len(members), _add(current_positions, 0.5))
+        order = _argsort(barycenters)
+
+        # The anchored nodes keep their order, in the places the barycenters
+        # give to them:
+        anchored_slots = self._anchored_slots[rank]
+        if anchored_slots:
+            is_anchored = set(anchored_slots)
+            next_anchored_slots = iter(anchored_slots)
+            order = _array([next(next_anchored_slots) if slot in is_anchored
+                            else slot for slot in order], int)
+        self._set_order(rank, order)
+
+
+    #
+    # Coordinate assignment
+    #
+
+    def _assign_coordinates(self) -> None:
+        engine = self._engine
+        self._centers = _array([0.] * len(self._rank), float)
+
+        # Initially, the nodes of each rank are stacked:
+        for (rank, members) in enumerate(self._members):
+            self._pack_rank(rank, _gather(self._centers, members))
+
+        ranks_nb = len(self._members)
+        for _ in range(engine.COORDINATE_PASSES):
+            for rank in range(1, ranks_nb):
+                segments = self._segments[rank - 1]
+                self._align_rank(rank, segments['left'],
+                                 _subtract(segments['left_offset'],
+                                           segments['right_offset']),
+                                 segments['right_slot'])
+            for rank in range(ranks_nb - 2, -1, -1):
+                segments = self._segments[rank]
+                self._align_rank(rank, segments['right'],
+                                 _subtract(segments['right_offset'],
+                                           segments['left_offset']),
+                                 segments['left_slot'])
+
+
+    def _align_rank(self, rank: int, neighbors, offsets, slots) -> None:
+        """ Moves the nodes of a rank towards the ports they are linked to in
+            the adjacent rank.
+        """
+        members = self._members[rank]
+        # The nodes of a rank whose nodes are all anchored do not move:
+        if len(self._anchored_slots[rank]) == len(members):
+            return
+        desired_centers = _group_means(
+            _add(_gather(self._centers, neighbors), offsets), slots,
+            len(members), _gather(self._centers, members))
+        self._pack_rank(rank, desired_centers)
+
+
+    def _pack_rank(self, rank: int, desired_centers) -> None:
+        """ Sets the centers of the nodes of a rank as close as possible to the
+            desired ones (given per slot), while keeping their order and their
+            separation. The anchored nodes are placed on their anchor (see
+            `_pack_anchored`).
+        """
+        members = self._members[rank]
+        order = self._orders[rank]
+        ordered_members = _gather(members, order)
+        desired_centers = _gather(desired_centers, order)
+        heights = _gather(self._heights, ordered_members)
+        separation = self._engine.NODE_SEPARATION
+        if self._anchored_slots[rank]:
+            anchors = [self._anchors.get(int(node)) for node in ordered_members]
+            centers = _array(_pack_anchored(desired_centers, heights, anchors,
+                                            separation), float)
+        else:
+            centers = _pack(desired_centers, heights, separation)
+        _scatter(self._centers, ordered_members, centers)
+
+
+    #
+    # Output generation
+    #
+
+    def _generate_output(self, edge_endpoints: List[Tuple]) -> Dict[str, Any]:
+        engine = self._engine
+        ranks_nb = len(self._members)
+        centers = [float(center) for center in self._centers]
+        heights = [float(height) for height in self._heights]
+
+        # Vertical positions: the top of the graph is at the margin
+        if centers != []:
+            shift = engine.MARGIN - min(center - height / 2 for (center, height)
+                                        in zip(centers, heights))
+            centers = [center + shift for center in centers]
+        graph_height = max((center + height / 2 for (center, height)
+                            in zip(centers, heights)), default=0.) \
+                       + engine.MARGIN
+
+        # Horizontal positions: each rank is as wide as its widest node, and
+        # the space between two ranks fits the labels of the edges in it.
+        rank_widths = [max((self._widths[node] for node in members),
+                           default=0.)
+                       for members in self._members]
+        gap_widths = [engine.RANK_SEPARATION] * max(ranks_nb - 1, 0)
+        for (edge, path) in zip(self._edges, self._paths):
+            if edge.label() is None or path[0] == path[1]:
+                continue
+            gap = min(self._rank[path[0]], self._rank[path[1]])
+            gap_widths[gap] = max(gap_widths[gap],
+                                  self._text_width(edge.label())
+                                  + 2 * engine.LABEL_MARGIN)
+        rank_centers = []
+        x_coord = engine.MARGIN
+        for rank in range(ranks_nb):
+            rank_centers.append(x_coord + rank_widths[rank] / 2)
+            x_coord += rank_widths[rank]
+            if rank < ranks_nb - 1:
+                x_coord += gap_widths[rank]
+        graph_width = x_coord + engine.MARGIN
+        x_centers = [rank_centers[rank] for rank in self._rank]
+
+        drawing = LayoutDrawing(engine, graph_height)
+        objects = [drawing.node(index, node, self._tables[index],
+                                self._widths[index], heights[index],
+                                x_centers[index], centers[index])
+                   for (index, node) in enumerate(self._nodes)]
+
+        edges = []
+        for (index, (edge, path, endpoints)) \
+                in enumerate(zip(self._edges, self._paths, edge_endpoints)):
+            (points, end) = self._edge_points(path, endpoints, x_centers,
+                                              centers)
+            edges.append(drawing.edge(index, endpoints[0], endpoints[2], edge,
+                                      points, end))
+
+        return drawing.graph(graph_width, objects, edges)
+
+
+    def _edge_points(self, path: List[int], endpoints: Tuple,
+                     x_centers: List[float], centers: List[float]) \
+                     -> Tuple[List[Tuple[float, float]], Tuple[float, float]]:
+        """ Returns the points of the spline of an edge, going through its
+            dummy nodes, and the point of its arrow head.
+        """
+        engine = self._engine
+        (tail, tail_offset, head, head_offset) = endpoints
+
+        start = (x_centers[tail] + self._widths[tail] / 2,
+                 centers[tail] + tail_offset)
+        end = (x_centers[head] - self._widths[head] / 2,
+               centers[head] + head_offset)
+        spline_end = (end[0] - engine.ARROW_LENGTH, end[1])
+
+        if tail == head: # The edge loops above the node
+            loop_height = float(self._heights[tail]) / 2 + engine.ROW_HEIGHT
+            return ([start,
+                     (start[0] + engine.RANK_SEPARATION,
+                      start[1] - loop_height),
+                     (spline_end[0] - engine.RANK_SEPARATION,
+                      spline_end[1] - loop_height),
+                     spline_end], end)
+
+        path_points = ([start]
+                       + [(x_centers[node], centers[node])
+                          for node in path[1:-1]]
+                       + [spline_end])
+        # Each part of the spline is a bezier curve whose ends are horizontal:
+        points = [start]
+        for (first, second) in zip(path_points[:-1], path_points[1:]):
+            middle_x = (first[0] + second[0]) / 2
+            points += [(middle_x, first[1]), (middle_x, second[1]), second]
+        return (points, end)
+
+
+class LayoutDrawing:
+    """ Generates the drawing operations of a laid out graph in the format of
+        dot's json output (`dot -Tjson`), with the dimensions of LayeredLayout:
+        the html tables are drawn from the nodes' ports and labels.
+
+        The coordinates given to its methods have their origin on the top-left
+        corner of the graph, as in qt.
+
+        Constructor arguments:
+        - `engine`: LayeredLayout whose text and tables dimensions are used
+        - `graph_height`: height of the graph, to convert the coordinates to
+          dot's coordinates (origin on the bottom-left corner)
+    """
+
+    def __init__(self, engine: LayeredLayout, graph_height: float):
+        self._engine = engine
+        self._graph_height = graph_height
+
+
+    def point(self, x_coord: float, y_coord: float) -> List[float]:
+        """ Converts a point to dot's coordinates. """
+        return [round(x_coord, 2), round(self._graph_height - y_coord, 2)]
+
+
+    def graph(self, width: float, objects: List[Dict[str, Any]],
+              edges: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """ Returns the data of the whole graph, given the data of its nodes and
+            edges.
+        """
+        output = {'name': 'G', 'directed': True, 'strict': False,
+                  'bb': f"0,0,{width:.2f},{self._graph_height:.2f}",
+                  '_subgraph_cnt': 0, 'objects': objects}
+        if edges != []:
+            output['edges'] = edges
+        return output
+
+
+    def node(self, index: int, node: LayoutNode, table: TableGeometry | None,
+             width: float, height: float, x_center: float, y_center: float) \
+             -> Dict[str, Any]:
+        """ Returns the data of a node: its html table (whose geometry is
+            given, see `LayeredLayout.node_geometry`), or its ellipse and its
+            label.
+        """
+        node_data = {'_gvid': index, 'name': node.name()}
+        if table is not None:
+            node_data['shape'] = 'none'
+            node_data['_ldraw_'] = self.table(table, width, height, x_center,
+                                              y_center)
+        else:
+            node_data['shape'] = 'ellipse'
+            node_data['_draw_'] = [
+                _color_op(),
+                {'op': 'e',
+                 'rect': self.point(x_center, y_center)
+                         + [round(width / 2, 2), round(height / 2, 2)]}]
+            node_data['_ldraw_'] = self.text(node.label(), x_center, y_center)
+        return node_data
+
+
+    def text(self, text: str, x_center: float, y_center: float,
+             centered: bool = True) -> List[Dict[str, Any]]:
+        """ Returns the drawing operations of a text centered on a point. If
+            `centered` is False, the point of the text is its left end, as for
+            the texts of html tables.
+        """
+        engine = self._engine
+        width = engine.text_width(text)
+        x_coord = x_center if centered else x_center - width / 2
+        # The point of a text is on its baseline:
+        baseline = y_center + 0.3 * engine.FONT_SIZE
+        return [{'op': 'F', 'size': engine.FONT_SIZE, 'face': engine.FONT_FACE},
+                _color_op(),
+                {'op': 'T', 'pt': self.point(x_coord, baseline),
+                 'align': 'c' if centered else 'l', 'width': width,
+                 'text': text}]
+
+
+    def table(self, table: TableGeometry, width: float, height: float,
+              x_center: float, y_center: float) -> List[Dict[str, Any]]:
+        """ Returns the drawing operations of a node's html table, resized to
+            the node's box: for each cell, its outline and its text, in the
+            order of dot's output for the tables generated by DotDataGenerator.
+        """
+        left = x_center - width / 2
+        top = y_center - height / 2
+
+        drawing = []
+        for cell in table.resized(width, height).cells():
+            (cell_left, cell_top, cell_width, cell_height) = cell.rect()
+            (cell_left, cell_top) = (left + cell_left, top + cell_top)
+            corners = [self.point(cell_left, cell_top + cell_height),
+                       self.point(cell_left + cell_width,
+                                  cell_top + cell_height),
+                       self.point(cell_left + cell_width, cell_top),
+                       self.point(cell_left, cell_top)]
+            (text_x, text_y) = cell.text_center()
+            drawing += ([_color_op(), {'op': 'p', 'points': corners}]
+                        + self.text(cell.text(), left + text_x, top + text_y,
+                                    centered=False))
+        return drawing
+
+
+    def edge(self, index: int, tail: int, head: int, edge: LayoutEdge,
+             points: List[Tuple[float, float]], end: Tuple[float, float],
+             label_center: Tuple[float, float] = None) -> Dict[str, Any]:
+        """ Returns the data of an edge: its spline, its arrow head and its
+            label.
+
+            Args:
+                index, tail, head: indexes of the edge, of its tail node and of
+                    its head node.
+                edge: the edge.
+                points: points of the spline (bezier curves), ending at the
+                    base of the arrow head.
+                end: point of the arrow head.
+                label_center: center of the label. If None, the label is above
+                    the middle of the spline's first curve.
+        """
+        engine = self._engine
+        spline_end = points[-1]
+
+        # The arrow head is a triangle pointing from the end of the spline:
+        (x_direction, y_direction) = (end[0] - spline_end[0],
+                                      end[1] - spline_end[1])
+        length = (x_direction ** 2 + y_direction ** 2) ** 0.5 or 1.
+        (x_normal, y_normal) = (-y_direction / length * engine.ARROW_WIDTH / 2,
+                                x_direction / length * engine.ARROW_WIDTH / 2)
+        arrow_head = [self.point(spline_end[0] + x_normal,
+                                 spline_end[1] + y_normal),
+                      self.point(end[0], end[1]),
+                      self.point(spline_end[0] - x_normal,
+                                 spline_end[1] - y_normal)]
+        # The ports are given as in dot's output (see
+        # `DotDataGenerator.add_edge`):
+        (_, tail_port) = edge.tail()
+        (_, head_port) = edge.head()
+        edge_data = {
+            '_gvid': index, 'tail': tail, 'head': head,
+            'tailport': 'e' if tail_port is None else f"{tail_port}:e",
+            'headport': 'w' if head_port is None else f"{head_port}:w",
+            '_draw_': [_color_op(),
+                       {'op': 'b', 'points': [self.point(x_coord, y_coord)
+                                              for (x_coord, y_coord)
+                                              in points]}],
+            '_hdraw_': [{'op': 'S', 'style': 'solid'}, _color_op(),
+                        {'op': 'P', 'points': arrow_head}],
+        }
+
+        if edge.label() is not None:
+            if label_center is None:
+                (first, second) = (points[0], points[min(3, len(points) - 1)])
+                label_center = ((first[0] + second[0]) / 2,
+                                (first[1] + second[1]) / 2
+                                - engine.FONT_SIZE / 2 - 2.)
+            edge_data['_ldraw_'] = self.text(edge.label(), label_center[0],
+                                             label_center[1])
+        return edge_data
+
+
+def _color_op() -> Dict[str, str]:
+    return {'op': 'c', 'grad': 'none', 'color': 'black'}
+
+
+#
+# Array operations, with NumPy if it is installed
+#
+
+def _array(values, dtype):
+    if np is not None:
+        return np.array(list(values), dtype=dtype)
+    return [dtype(value) for value in values]
+
+
+def _gather(values, indexes):
+    """ Returns the values at some indexes. """
+    if np is not None:
+        return values[indexes]
+    return [values[index] for index in indexes]
+
+
+def _scatter(values, indexes, new_values) -> None:
+    """ Sets the values at some indexes. """
+    if np is not None:
+        values[indexes] = new_values
+        return
+    for (index, new_value) in zip(indexes, new_values):
+        values[index] = new_value
+
+
+def _add(values, other):
+    """ Adds two arrays, or a number to an array. """
+    if np is not None:
+        return values + other
+    if isinstance(other, (int, float)):
+        return [value + other for value in values]
+    return [value + other_value for (value, other_value) in zip(values, other)]
+
+
+def _subtract(values, other):
+    if np is not None:
+        return values - other
+    return [value - other_value for (value, other_value) in zip(values, other)]
+
+
+def _scale(values, factor: float):
+    if np is not None:
+        return values * factor
+    return [value * factor for value in values]
+
+
+def _divide(values, other):
+    if np is not None:
+        return values / other
+    return [value / other_value for (value, other_value) in zip(values, other)]
+
+
+def _argsort(values):
+    """ Returns the indexes which sort an array, keeping the order of the equal
+        values.
+    """
+    if np is not None:
+        return np.argsort(values, kind='stable')
+    return sorted(range(len(values)), key=values.__getitem__)
+
+
+def _group_means(values, groups, groups_nb: int, defaults):
+    """ Returns the mean of the values of each group, or its default value if
+        the group is empty.
+
+        Args:
+            values: the values.
+            groups: the group of each value, between 0 and `groups_nb - 1`.
+            groups_nb: the number of groups.
+            defaults: the default value of each group.
+    """
+    if np is not None:
+        sums = np.bincount(groups, weights=values, minlength=groups_nb)
+        counts = np.bincount(groups, minlength=groups_nb)
+        return np.where(counts > 0, sums / np.maximum(counts, 1), defaults)
+    sums = [0.] * groups_nb
+    counts = [0] * groups_nb
+    for (value, group) in zip(values, groups):
+        sums[group] += value
+        counts[group] += 1
+    return [sums[group] / counts[group] if counts[group] > 0
+            else defaults[group] for group in range(groups_nb)]
+
+
+def _pack(desired_centers, heights, separation: float):
+    """ Returns the centers of a column of boxes, as close as possible to the
+        desired ones, such that the boxes keep their order and are separated by
+        at least `separation`.
+
+        The centers pushed downwards and upwards to separate the boxes are
+        averaged: both satisfy the separation, and so does their mean.
+    """
+    if np is not None:
+        if len(heights) == 0:
+            return desired_centers
+        # Minimal distance between the first center and each center:
+        gaps = (heights[:-1] + heights[1:]) / 2 + separation
+        distances = np.concatenate(([0.], np.cumsum(gaps)))
+        relative_centers = desired_centers - distances
+        pushed_down = np.maximum.accumulate(relative_centers)
+        pushed_up = np.minimum.accumulate(relative_centers[::-1])[::-1]
+        return (pushed_down + pushed_up) / 2 + distances
+
+    distances = []
+    distance = 0.
+    for (index, height) in enumerate(heights):
+        if index > 0:
+            distance += (heights[index - 1] + height) / 2 + separation
+        distances.append(distance)
+    relative_centers = [center - distance for (center, distance)
+                        in zip(desired_centers, distances)]
+    pushed_down = []
+    for center in relative_centers:
+        pushed_down.append(max(center, pushed_down[-1]) if pushed_down
+                           else center)
+    pushed_up = []
+    for center in reversed(relative_centers):
+        pushed_up.append(min(center, pushed_up[-1]) if pushed_up else center)
+    pushed_up.reverse()
+    return [(down + up) / 2 + distance for (down, up, distance)
+            in zip(pushed_down, pushed_up, distances)]
+
+
+def _pack_anchored(desired_centers, heights, anchors: List[float | None],
+                   separation: float) -> List[float]:
+    """ Returns the centers of a column of boxes, like `_pack`, some of which
+        are anchored: their center is their anchor, unless the boxes above
+        them need the room, in which case they are pushed down. The other boxes
+        (whose anchor is None) are packed between the anchored ones, as close
+        as possible to their desired centers.
+    """
+    desired_centers = [float(center) for center in desired_centers]
+    heights = [float(height) for height in heights]
+    boxes_nb = len(heights)
+    centers = [0.] * boxes_nb
+    # Highest position of the top of the next box:
+    floor = float('-inf')
+    start = 0 # First box which is not placed yet
+    for index in range(boxes_nb + 1):
+        if index < boxes_nb and anchors[index] is None:
+            continue
+
+        # The boxes between two anchored boxes are packed, then pushed between
+        # them (the room needed above wins if there is not enough):
+        if index > start:
+            boxes = range(start, index)
+            run_centers = [float(center) for center in _pack(
+                _array(desired_centers[start:index], float),
+                _array(heights[start:index], float), separation)]
+            if index < boxes_nb:
+                ceiling = anchors[index] - heights[index] / 2 - separation
+                for box in reversed(boxes):
+                    center = min(run_centers[box - start],
+                                 ceiling - heights[box] / 2)
+                    run_centers[box - start] = center
+                    ceiling = center - heights[box] / 2 - separation
+            for box in boxes:
+                centers[box] = max(run_centers[box - start],
+                                   floor + heights[box] / 2)
+                floor = centers[box] + heights[box] / 2 + separation
+
+        if index < boxes_nb:
+            centers[index] = max(anchors[index], floor + heights[index] / 2)
+            floor = centers[index] + heights[index] / 2 + separation
+        start = index + 1
+    return centers
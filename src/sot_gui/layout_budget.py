@@ -0,0 +1,208 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+from threading import Lock
+from time import monotonic
+
+
+class LayoutMode:
+    """ A way of computing a layout with dot, from the most accurate to the
+        fastest: a set of graph attributes added to the dot code.
+
+        Constructor arguments:
+        - `name`: name of the mode, as displayed to the user
+        - `attributes`: graph attributes of the mode, in the same form as for
+          `DotDataGenerator.set_graph_attributes`
+        - `cost`: initial estimate of the duration of a layout, in seconds per
+          element (node or edge), before any layout was measured
+    """
+
+    def __init__(self, name: str, attributes: Dict[str, Any], cost: float):
+        self._name = name
+        self._attributes = dict(attributes)
+        self._cost = cost
+
+
+    def name(self) -> str:
+        return self._name
+
+
+    def attributes(self) -> Dict[str, Any]:
+        return dict(self._attributes)
+
+
+    def cost(self) -> float:
+        return self._cost
+
+
+# The layout modes, from the most accurate to the fastest. Their attributes
+# bound the iterations of dot's most expensive passes:
+# - `nslimit` and `nslimit1`: network simplex iterations (x coordinates and
+#   ranking), as a factor of the number of nodes
+# - `mclimit`: factor of the crossing minimization iterations
+# - `searchsize`: negative cut values searched at each network simplex iteration
+# - `splines`: `line` does not route the edges around the nodes
+# The last one uses the sfdp engine, which scales to very large graphs but does
+# not layer the nodes from left to right.
+LAYOUT_MODES = [
+    LayoutMode('full', {}, 2e-3),
+    LayoutMode('reduced', {'nslimit': 4, 'nslimit1': 4, 'mclimit': 0.5,
+                           'searchsize': 20}, 1e-3),
+    LayoutMode('fast', {'nslimit': 1, 'nslimit1': 1, 'mclimit': 0.1,
+                        'searchsize': 5, 'splines': 'line'}, 3e-4),
+    LayoutMode('draft', {'layout': 'sfdp', 'overlap': 'false',
+                         'splines': 'line'}, 1e-4),
+]
+
+
+class LayoutBudget:
+    """ Chooses the layout mode of a graph (see LayoutMode) so that its layout
+        is computed within a time budget.
+
+        The duration of a layout is estimated from the size of the graph (its
+        number of nodes and edges) and from the duration of the previous
+        layouts in each mode: dot's cost grows faster than the size of the
+        graph, so it is estimated as `cost * size ** COST_EXPONENT`, where the
+        `cost` of each mode is updated after each layout.
+
+        The most accurate mode whose estimated duration fits in the budget is
+        chosen. If it actually exceeds the budget, the layout is stopped and
+        computed again in the next, faster, modes (see `modes_for_size`). The
+        costs are initial estimates until a layout is measured in each mode: a
+        mode which is skipped is tried again every RETRY_PERIOD choices, so
+        that an overestimated cost can be corrected.
+
+        The budget is shared by all the layouts of a refresh: a deadline is
+        computed once (see `deadline`), and each attempt only gets the time
+        left before it (see `timeout`).
+
+        The budget can be used from several threads (e.g to lay out several
+        components concurrently).
+
+        Constructor arguments:
+        - `budget`: duration allowed for a layout, in seconds. If None (the
+          default), the most accurate mode is always used.
+        - `modes`: the layout modes, from the most accurate to the fastest
+    """
+
+    COST_EXPONENT = 1.5
+    # Weight of the latest measure in the cost of a mode:
+    SMOOTHING = 0.5
+    # Share of the budget given to the fastest mode if less time is left
+    # before the deadline, so that a layout can still be computed:
+    FALLBACK_SHARE = 0.5
+    # Number of times a mode is skipped before it is tried again:
+    RETRY_PERIOD = 10
+
+    def __init__(self, budget: float | None = None,
+                 modes: List[LayoutMode] = LAYOUT_MODES):
+        if budget is not None and budget <= 0:
+            raise ValueError('The layout budget must be positive.')
+        if not modes:
+            raise ValueError('A LayoutBudget needs at least one layout mode.')
+        self._budget = budget
+        self._modes = list(modes)
+        # Current cost of each mode, in seconds per element:
+        self._costs: Dict[str, float] = {mode.name(): mode.cost()
+                                         for mode in self._modes}
+        # Number of times each mode was skipped since it was last tried:
+        self._skips: Dict[str, int] = {mode.name(): 0 for mode in self._modes}
+        self._lock = Lock()
+
+
+    def budget(self) -> float | None:
+        return self._budget
+    def set_budget(self, budget: float | None) -> None:
+        if budget is not None and budget <= 0:
+            raise ValueError('The layout budget must be positive.')
+        self._budget = budget
+
+
+    def modes(self) -> List[LayoutMode]:
+        return self._modes.copy()
+
+
+    def estimate(self, mode: LayoutMode, size: int) -> float:
+        """ Returns the estimated duration of the layout of a graph, in
+            seconds.
+
+            Args:
+                mode: the layout mode.
+                size: number of nodes and edges of the graph.
+        """
+        with self._lock:
+            cost = self._costs[mode.name()]
+        return cost * size ** self.COST_EXPONENT
+
+
+    def modes_for_size(self, size: int) -> List[LayoutMode]:
+        """ Returns the modes in which a graph of the given size can be laid
+            out, in the order in which they should be tried: the most accurate
+            mode whose estimated duration fits in the budget (or the fastest
+            mode if none fits), followed by the faster ones. Every
+            RETRY_PERIOD times a mode is skipped, it is tried first instead.
+        """
+        if self._budget is None:
+            return self._modes[:1]
+        index = next((index for (index, mode) in enumerate(self._modes)
+                      if self.estimate(mode, size) <= self._budget),
+                     len(self._modes) - 1)
+        if index == 0:
+            return self._modes
+        skipped_mode = self._modes[index - 1]
+        with self._lock:
+            self._skips[skipped_mode.name()] += 1
+            if self._skips[skipped_mode.name()] < self.RETRY_PERIOD:
+                return self._modes[index:]
+            self._skips[skipped_mode.name()] = 0
+        return self._modes[index - 1:]
+
+
+    def deadline(self) -> float | None:
+        """ Returns the deadline of layouts starting now, as a time of
+            `time.monotonic`, or None if there is no budget.
+        """
+        if self._budget is None:
+            return None
+        return monotonic() + self._budget
+
+
+    def timeout(self, deadline: float | None, last_mode: bool) \
+                -> float | None:
+        """ Returns the duration allowed for a layout attempt, in seconds: the
+            time left before the deadline (see `deadline`), which can be
+            negative if it has passed. The last mode to try gets at least
+            FALLBACK_SHARE of the budget.
+
+            Returns None if there is no deadline or no budget.
+        """
+        if deadline is None or self._budget is None:
+            return None
+        remaining = deadline - monotonic()
+        if last_mode:
+            return max(remaining, self.FALLBACK_SHARE * self._budget)
+        return remaining
+
+
+    def record(self, mode: LayoutMode, size: int, duration: float) -> None:
+        """ Updates the cost of a mode with the measured duration of a layout.
+        """
+        if size <= 0:
+            return
+        measured_cost = duration / size ** self.COST_EXPONENT
+        with self._lock:
+            cost = self._costs[mode.name()]
+            self._costs[mode.name()] = (self.SMOOTHING * measured_cost
+                                        + (1 - self.SMOOTHING) * cost)
+
+
+    def record_timeout(self, mode: LayoutMode, size: int, timeout: float) \
+                       -> None:
+        """ Updates the cost of a mode after a layout was stopped because it
+            exceeded `timeout`: its cost is at least the one measured.
+        """
+        if size <= 0:
+            return
+        measured_cost = timeout / size ** self.COST_EXPONENT
+        with self._lock:
+            self._costs[mode.name()] = max(self._costs[mode.name()],
+                                           measured_cost)
@@ -0,0 +1,287 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple, Union
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from subprocess import run, PIPE, TimeoutExpired
+from threading import Lock
+import os
+
+from sot_gui.dot_data_generator import DotDataGenerator
+
+
+# Dot code given to the cache: encoded in utf-8, or as a generator which is
+# hashed without building the whole string:
+DotCode = Union[bytes, DotDataGenerator]
+
+# Layout given to the cache: dot's output, or a layout already parsed (e.g a
+# rendered lean layout, see `render_lean_layout`), which is only kept in memory:
+Layout = Union[str, Dict[str, Any]]
+
+
+# Version of Graphviz, which is part of the cache keys (a layout computed by
+# another version could be different). It is only fetched once:
+_graphviz_version: str = None
+
+
+def graphviz_version() -> str:
+    """ Returns the version of Graphviz (as given by `dot -V`), or an empty
+        string if it could not be determined.
+    """
+    global _graphviz_version
+    if _graphviz_version is None:
+        try:
+            # `dot -V` writes its version on stderr:
+            result = run(['dot', '-V'], stdout=PIPE, stderr=PIPE, timeout=5)
+            _graphviz_version = result.stderr.decode('utf-8').strip()
+        except (OSError, TimeoutExpired):
+            _graphviz_version = ''
+    return _graphviz_version
+
+
+def default_cache_dir() -> Path:
+    """ Returns the default directory of the on-disk layout cache:
+        `$XDG_CACHE_HOME/sot_gui/layouts` (`~/.cache/sot_gui/layouts` by
+        default).
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        cache_home = Path.home() / '.cache'
+    return Path(cache_home) / 'sot_gui' / 'layouts'
+
+
+def _layout_size(layout: Any) -> int:
+    """ Returns an estimate of the memory size of a layout, in bytes: the
+        length of dot's output, or the total length of the strings and numbers
+        of a parsed layout.
+    """
+    if isinstance(layout, str):
+        return len(layout)
+    if isinstance(layout, dict):
+        return sum(_layout_size(key) + _layout_size(value)
+                   for (key, value) in layout.items())
+    if isinstance(layout, (list, tuple)):
+        return sum(_layout_size(value) for value in layout)
+    return 8
+
+
+class LayoutCache:
+    """ Cache of the layouts computed by dot, to avoid running dot again on
+        dot code which was already laid out (e.g when the GUI is reopened on the
+        same graph, or when a cluster is removed).
+
+        The layouts are stored per hash of the encoded dot code, of dot's output
+        format and of the Graphviz version: in memory, where the least recently
+        used ones are evicted when their total size exceeds `max_memory_size`
+        (so that a graph with many small components keeps all its layouts), and
+        in a directory on disk, where the least recently used ones are deleted
+        when their total size exceeds `max_disk_size`. The files of the disk
+        cache are listed once, then their total size is updated with each
+        write.
+
+        The cache can be used from several threads (e.g a refresh thread and
+        the GUI thread). The files are read and written outside of its lock, so
+        that a thread reading a layout from memory does not wait for the disk.
+
+        Constructor arguments:
+        - `cache_dir`: directory of the on-disk cache. If None, the default
+          directory is used (see `default_cache_dir`).
+        - `max_memory_size`: maximum total size of the layouts cached in
+          memory, in bytes (estimated, see `_layout_size`). The last used
+          layout is kept even if it is bigger.
+        - `max_disk_size`: maximum total size of the on-disk cache, in bytes.
+          If 0, the layouts are only cached in memory.
+    """
+
+    def __init__(self, cache_dir: Path = None,
+                 max_memory_size: int = 64_000_000,
+                 max_disk_size: int = 50_000_000):
+        if max_disk_size == 0:
+            self._cache_dir = None
+        elif cache_dir is None:
+            self._cache_dir = default_cache_dir()
+        else:
+            self._cache_dir = Path(cache_dir)
+        self._max_memory_size = max_memory_size
+        self._max_disk_size = max_disk_size
+        # Tuples (layout, size) per key, from the least to the most recently
+        # used, and their total size:
+        self._layouts: OrderedDict[str, Tuple[Layout, int]] = OrderedDict()
+        self._memory_size = 0
+        # Sizes of the files of the on-disk cache per key, from the least to
+        # the most recently used, and their total size. The directory is only
+        # listed when it is first used (see `_load_disk_index`):
+        self._disk_sizes: OrderedDict[str, int] = None
+        self._disk_size = 0
+        self._lock = Lock()
+
+
+    def key(self, dot_code: DotCode, output_format: str = 'json') -> str:
+        """ Returns the cache key of some dot code, laid out in the given output
+            format (e.g 'json' for `dot -Tjson`). The key of a DotDataGenerator
+            is the same as the key of its encoded dot code.
+        """
+        digest = sha256(graphviz_version().encode('utf-8'))
+        digest.update(b'\0')
+        # The key of the default format does not include it, so that the
+        # layouts cached before the formats were added are still used:
+        if output_format != 'json':
+            digest.update(output_format.encode('utf-8'))
+            digest.update(b'\0')
+        if isinstance(dot_code, DotDataGenerator):
+            dot_code.update_hash(digest)
+        else:
+            digest.update(dot_code)
+        return digest.hexdigest()
+
+
+    def get(self, dot_code: DotCode, output_format: str = 'json') \
+            -> Layout | None:
+        """ Returns the cached layout (dot's output in `output_format`) of some
+            dot code, or None if it is not cached.
+        """
+        key = self.key(dot_code, output_format)
+        with self._lock:
+            entry = self._layouts.get(key)
+            if entry is not None:
+                self._layouts.move_to_end(key)
+                return entry[0]
+
+        layout = self._read_from_disk(key)
+        if layout is not None:
+            with self._lock:
+                self._add_to_memory(key, layout)
+        return layout
+
+
+    def put(self, dot_code: DotCode, layout: Layout,
+            output_format: str = 'json') -> None:
+        """ Caches the layout (dot's output in `output_format`) of some dot
+            code. A parsed layout is only cached in memory.
+        """
+        key = self.key(dot_code, output_format)
+        with self._lock:
+            self._add_to_memory(key, layout)
+        if isinstance(layout, str):
+            self._write_to_disk(key, layout)
+
+
+    def clear(self) -> None:
+        """ Clears the cache, in memory and on disk. """
+        with self._lock:
+            self._layouts.clear()
+            self._memory_size = 0
+            if self._disk_sizes is not None:
+                self._disk_sizes.clear()
+            self._disk_size = 0
+        for file_path in self._disk_files():
+            file_path.unlink(missing_ok=True)
+
+
+    def _add_to_memory(self, key: str, layout: Layout) -> None:
+        """ Adds a layout to the memory cache, and evicts the least recently
+            used layouts if the cache is too big. Must be called with the lock
+            held.
+        """
+        entry = self._layouts.pop(key, None)
+        if entry is not None:
+            self._memory_size -= entry[1]
+        size = _layout_size(layout)
+        self._layouts[key] = (layout, size)
+        self._memory_size += size
+        while (self._memory_size > self._max_memory_size
+               and len(self._layouts) > 1):
+            (_, (_, evicted_size)) = self._layouts.popitem(last=False)
+            self._memory_size -= evicted_size
+
+
+    def _disk_files(self) -> List[Path]:
+        if self._cache_dir is None or not self._cache_dir.is_dir():
+            return []
+        return list(self._cache_dir.glob('*.json'))
+
+
+    def _load_disk_index(self) -> None:
+        """ Lists the files of the on-disk cache, from the least to the most
+            recently used, if it was not done yet. The directory is listed
+            outside of the lock.
+        """
+        with self._lock:
+            if self._disk_sizes is not None:
+                return
+        files = []
+        for file_path in self._disk_files():
+            try:
+                stat = file_path.stat()
+                files.append((stat.st_mtime, stat.st_size, file_path.stem))
+            except OSError:
+                continue
+        files.sort()
+        with self._lock:
+            if self._disk_sizes is not None:
+                return
+            self._disk_sizes = OrderedDict((key, size)
+                                           for (_, size, key) in files)
+            self._disk_size = sum(self._disk_sizes.values())
+
+
+    def _read_from_disk(self, key: str) -> str | None:
+        if self._cache_dir is None:
+            return None
+        self._load_disk_index()
+        file_path = self._cache_dir / f"{key}.json"
+        try:
+            layout = file_path.read_text(encoding='utf-8')
+            # The modification time is used to find the least recently used
+            # layouts when the directory is listed:
+            os.utime(file_path)
+            size = file_path.stat().st_size
+        except OSError:
+            return None
+        # The file may have been written by another instance of the GUI:
+        self._add_to_disk_index(key, size)
+        return layout
+
+
+    def _write_to_disk(self, key: str, layout: str) -> None:
+        """ Writes a layout in the on-disk cache, and deletes the least recently
+            used layouts if the cache is too big. Errors (e.g a read-only
+            directory) are ignored: the layout is then only cached in memory.
+        """
+        if self._cache_dir is None:
+            return
+        self._load_disk_index()
+        data = layout.encode('utf-8')
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            file_path = self._cache_dir / f"{key}.json"
+            # Writing to a temporary file first, so that another instance of
+            # the GUI never reads an incomplete layout:
+            tmp_file_path = self._cache_dir / f"{key}.{os.getpid()}.tmp"
+            tmp_file_path.write_bytes(data)
+            os.replace(tmp_file_path, file_path)
+        except OSError:
+            return
+        self._add_to_disk_index(key, len(data))
+
+
+    def _add_to_disk_index(self, key: str, size: int) -> None:
+        """ Records a file of the on-disk cache as the most recently used one,
+            and deletes the least recently used files if the cache is too big.
+            The files are deleted outside of the lock.
+        """
+        evicted_keys = []
+        with self._lock:
+            self._disk_size += size - self._disk_sizes.pop(key, 0)
+            self._disk_sizes[key] = size
+            while self._disk_size > self._max_disk_size and self._disk_sizes:
+                (evicted_key, evicted_size) = \
+                    self._disk_sizes.popitem(last=False)
+                self._disk_size -= evicted_size
+                evicted_keys.append(evicted_key)
+        for evicted_key in evicted_keys:
+            try:
+                (self._cache_dir / f"{evicted_key}.json").unlink(
+                    missing_ok=True)
+            except OSError:
+                continue
@@ -0,0 +1,132 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+import json
+
+from sot_gui.layered_layout import LayeredLayout, LayoutDrawing
+from sot_gui.graph_ir import LayoutNode, LayoutEdge
+from sot_gui.utils import dot_port_name
+
+
+# Output format of dot for the lean layouts: the graph's attributes only
+# (positions, sizes and splines), without the xdot drawing operations:
+LEAN_OUTPUT_FORMAT = 'json0'
+
+# Format of the lean layouts rendered by `render_lean_layout` in the layout
+# cache, where they are only kept in memory (see `LayoutCache.put`):
+RENDERED_LEAN_FORMAT = 'json0-rendered'
+
+# Points per inch, the unit of the nodes' dimensions in dot's output:
+_POINTS_PER_INCH = 72.
+
+
+def render_lean_layout(lean_json_string: str, nodes: List[LayoutNode],
+                       edges: List[LayoutEdge],
+                       engine: LayeredLayout = None) -> Dict[str, Any]:
+    """ Converts a lean layout computed by dot (`dot -Tjson0`: the position and
+        size of each node, and the spline of each edge) to the format of dot's
+        parsed json output (`dot -Tjson`), which can be given to a
+        JsonToQtGenerator.
+
+        dot's full json output contains the xdot drawing operations of each
+        cell of the html tables, which makes it several times bigger than the
+        layout itself, and slower to produce and to parse. Here, the tables and
+        labels are drawn from the graph's nodes and edges, in the nodes' boxes
+        computed by dot (see LayoutDrawing).
+
+        Args:
+            lean_json_string: dot's json0 output.
+            nodes: the nodes given to dot, with their ports and labels.
+            edges: the edges given to dot, with their labels.
+            engine: LayeredLayout whose text and tables dimensions are used to
+                draw the nodes. If None, the default dimensions are used.
+
+        Raises:
+            ValueError: A node or an edge is missing from dot's output.
+    """
+    if engine is None:
+        engine = LayeredLayout()
+    graph_data = json.loads(lean_json_string)
+    (x_min, y_min, x_max, y_max) = _parse_floats(graph_data['bb'])
+
+    def top_left(x_coord: float, y_coord: float) -> Tuple[float, float]:
+        """ Converts a point of dot's output to coordinates whose origin is on
+            the top-left corner of the graph.
+        """
+        return (x_coord - x_min, y_max - y_coord)
+
+    drawing = LayoutDrawing(engine, y_max - y_min)
+
+    # Nodes:
+    name_per_id: Dict[int, str] = {}
+    box_per_name: Dict[str, Tuple[float, float, float, float]] = {}
+    for node_data in graph_data.get('objects', []):
+        name_per_id[node_data['_gvid']] = node_data['name']
+        if 'pos' not in node_data: # A subgraph
+            continue
+        box_per_name[node_data['name']] = (
+            top_left(*_parse_floats(node_data['pos']))
+            + (float(node_data['width']) * _POINTS_PER_INCH,
+               float(node_data['height']) * _POINTS_PER_INCH))
+
+    objects = []
+    index_per_name: Dict[str, int] = {}
+    for (index, node) in enumerate(nodes):
+        box = box_per_name.get(node.name())
+        if box is None:
+            raise ValueError(f"Node {node.name()} could not be found in dot's"
+                             " output.")
+        (x_center, y_center, width, height) = box
+        (_, _, table, _, _) = engine.node_geometry(node)
+        objects.append(drawing.node(index, node, table, width, height,
+                                    x_center, y_center))
+        index_per_name[node.name()] = index
+
+    # Edges, per tail and head (an output can be plugged to several inputs of
+    # the same node, so there can be several edges per key):
+    splines_per_key: Dict[Tuple, List[Tuple]] = {}
+    for edge_data in graph_data.get('edges', []):
+        key = (name_per_id[edge_data['tail']],
+               dot_port_name(edge_data.get('tailport')),
+               name_per_id[edge_data['head']],
+               dot_port_name(edge_data.get('headport')))
+        (points, end) = _parse_spline(edge_data['pos'], top_left)
+        label_center = None
+        if 'lp' in edge_data:
+            label_center = top_left(*_parse_floats(edge_data['lp']))
+        splines_per_key.setdefault(key, []).append((points, end, label_center))
+
+    edges_data = []
+    for (index, edge) in enumerate(edges):
+        splines = splines_per_key.get(edge.tail() + edge.head())
+        if not splines:
+            raise ValueError(f"Edge {edge.tail()} -> {edge.head()} could not"
+                             " be found in dot's output.")
+        (points, end, label_center) = splines.pop(0)
+        edges_data.append(drawing.edge(index, index_per_name[edge.tail()[0]],
+                                       index_per_name[edge.head()[0]], edge,
+                                       points, end, label_center))
+
+    return drawing.graph(x_max - x_min, objects, edges_data)
+
+
+def _parse_floats(text: str) -> List[float]:
+    return [float(value) for value in text.split(',')]
+
+
+def _parse_spline(pos: str, top_left) \
+                  -> Tuple[List[Tuple[float, float]], Tuple[float, float]]:
+    """ Parses the `pos` attribute of an edge (`e,x,y x,y x,y ...`), and
+        returns the points of its spline and the point of its arrow head.
+    """
+    # Concentrated edges can have several splines: only the first one is kept
+    spline = pos.split(';')[0]
+    points = []
+    end = None
+    for token in spline.split():
+        if token.startswith('e,'):
+            end = top_left(*_parse_floats(token[2:]))
+        elif not token.startswith('s,'):
+            points.append(top_left(*_parse_floats(token)))
+    if end is None: # The edge has no arrow head
+        end = points[-1]
+    return (points, end)
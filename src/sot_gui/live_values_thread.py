@@ -0,0 +1,71 @@
+from typing import List, Tuple
+from threading import Event
+
+from PySide2.QtCore import QThread, Signal
+
+from sot_gui.dynamic_graph_communication import DynamicGraphCommunication
+
+
+class LiveValuesThread(QThread):
+    """ Thread polling the values and execution times of a set of signals
+        (e.g the displayed ones) at a given rate, for the live display of the
+        values. Each poll fetches all the signals with batched kernel commands.
+
+        It only fetches the values: applying them to the graph and updating the
+        display is left to the GUI thread, so that the graph is never modified
+        outside of it.
+
+        Constructor arguments:
+        - `dg_communication`: will be used to fetch the values
+        - `rate`: number of polls per second
+        - `parent`: the parent QObject
+
+        Signals:
+        - `values_fetched(values)`: emitted after each poll, with the values as
+          returned by `DynamicGraphCommunication.get_signals_data`
+        - `polling_failed(error)`: emitted if the kernel could not be reached.
+          The polling is then stopped.
+    """
+
+    values_fetched = Signal(object)
+    polling_failed = Signal(object)
+
+
+    def __init__(self, dg_communication: DynamicGraphCommunication,
+                 rate: float, parent = None):
+        super().__init__(parent)
+        self._dg_communication = dg_communication
+        self._period = 1 / rate
+        self._stop_event = Event()
+        self._signals: List[Tuple[str, str]] = []
+
+
+    def set_rate(self, rate: float) -> None:
+        """ Sets the number of polls per second. """
+        self._period = 1 / rate
+
+
+    def set_signals(self, pairs: List[Tuple[str, str]]) -> None:
+        """ Sets the signals to poll, as a list of tuples (entity name, signal
+            name).
+        """
+        self._signals = pairs.copy()
+
+
+    def stop(self) -> None:
+        """ Requests the thread to stop after the current poll. """
+        self._stop_event.set()
+
+
+    def run(self) -> None:
+        """ See QThread.run """
+        while not self._stop_event.is_set():
+            signals = self._signals
+            if signals != []:
+                try:
+                    values = self._dg_communication.get_signals_data(signals)
+                except ConnectionError as error:
+                    self.polling_failed.emit(error)
+                    return
+                self.values_fetched.emit(values)
+            self._stop_event.wait(self._period)
@@ -2,18 +2,24 @@ from __future__ import annotations
 from typing import Union, List, Dict, Tuple
 from enum import Enum
 import threading
-from time import sleep
+import json
+from time import sleep, perf_counter
 
 from PySide2.QtWidgets import (QMainWindow, QGraphicsScene, QGraphicsView,
     QToolBar, QAction, QMessageBox, QLabel, QGraphicsItem, QInputDialog,
     QDockWidget, QListWidget, QListWidgetItem, QTableWidget, QTableWidgetItem,
-    QVBoxLayout, QScrollArea, QWidget, QGraphicsPolygonItem, QStatusBar)
+    QVBoxLayout, QScrollArea, QWidget, QGraphicsPolygonItem, QStatusBar,
+    QProgressBar, QSpinBox, QHBoxLayout, QPushButton, QFileDialog)
 from PySide2.QtGui import QColor
-from PySide2.QtCore import Qt
+from PySide2.QtCore import Qt, Signal, QTimer, QRectF
 
-from sot_gui.graph import (Graph, GraphElement, Node, Port, Edge, EntityNode,
-    InputNode, Cluster, ClusterPort)
+from sot_gui.call_stats import CallStats
+from sot_gui.graph import (Graph, GraphElement, GraphChanges, GraphUpdate,
+    Node, Port, Edge, EntityNode, InputNode, Cluster, ClusterPort)
 from sot_gui.dynamic_graph_communication import DynamicGraphCommunication
+from sot_gui.graph_refresh_thread import GraphRefreshThread
+from sot_gui.json_to_qt_generator import ComponentsQtGenerator
+from sot_gui.live_values_thread import LiveValuesThread
 
 
 class MainWindow(QMainWindow):
@@ -32,11 +38,37 @@ class MainWindow(QMainWindow):
         self._add_status_bar()
         self._add_cluster_side_panel()
         self._add_info_side_panel()
+        self._add_connection_stats_panel()
+
+        # The graph is refreshed in a background thread, which reports its
+        # progress to the scene:
+        self._graph_scene.refresh_progress.connect(self._on_refresh_progress)
+        self._graph_scene.refresh_finished.connect(self._on_refresh_finished)
+        self._graph_scene.refresh_failed.connect(self._on_refresh_failed)
+        self._graph_scene.layout_failed.connect(self._on_layout_failed)
+        self._graph_scene.graph_data_changed.connect(
+            self._on_graph_data_changed)
+        self._graph_scene.elements_replaced.connect(
+            self._info_side_panel.replace_element)
+        self._graph_scene.layout_mode_changed.connect(
+            self.statusBar().set_layout_mode)
 
         # Displaying the graph:
         self._refresh_graph()
 
 
+    def closeEvent(self, event):
+        """ See QMainWindow.closeEvent. The background threads and the dot
+            processes are stopped before the window closes.
+        """
+        if self._live_values_thread is not None:
+            self._live_values_thread.stop()
+            self._live_values_thread.wait()
+            self._live_values_thread = None
+        self._graph_scene.close()
+        super().closeEvent(event)
+
+
     #
     # ADDITIONAL WIDGETS
     #
@@ -51,6 +83,13 @@ class MainWindow(QMainWindow):
         button_refresh.triggered.connect(self._refresh_graph)
         toolbar.addAction(button_refresh)
 
+        # This button is only enabled while the graph is being refreshed
+        button_cancel_refresh = QAction("Cancel refresh", self)
+        button_cancel_refresh.triggered.connect(self._cancel_refresh)
+        button_cancel_refresh.setEnabled(False)
+        toolbar.addAction(button_cancel_refresh)
+        self._button_cancel_refresh = button_cancel_refresh
+
         button_reconnect = QAction("Reconnect", self)
         button_reconnect.triggered.connect(self._reconnect)
         toolbar.addAction(button_reconnect)
@@ -58,11 +97,107 @@ class MainWindow(QMainWindow):
         button_clusterize = QAction("Create cluster", self)
         button_clusterize.triggered.connect(self._create_cluster)
         toolbar.addAction(button_clusterize)
+        self._button_clusterize = button_clusterize
 
         button_manage_clusters = QAction("Manage clusters", self)
         button_manage_clusters.triggered.connect(self._manage_clusters)
         toolbar.addAction(button_manage_clusters)
 
+        button_connection_stats = QAction("Connection stats", self)
+        button_connection_stats.triggered.connect(self._show_connection_stats)
+        toolbar.addAction(button_connection_stats)
+
+        toolbar.addSeparator()
+
+        # In live mode, the displayed values are updated continuously
+        button_live = QAction("Live", self)
+        button_live.setCheckable(True)
+        button_live.toggled.connect(self._set_live_mode)
+        toolbar.addAction(button_live)
+        self._button_live = button_live
+
+        live_rate = QSpinBox(self)
+        live_rate.setRange(1, 20)
+        live_rate.setValue(10)
+        live_rate.setSuffix(" Hz")
+        live_rate.setToolTip("Update rate of the values in live mode")
+        live_rate.valueChanged.connect(self._set_live_rate)
+        toolbar.addWidget(live_rate)
+        self._live_rate = live_rate
+        self._live_values_thread: LiveValuesThread = None
+
+        # With lazy values, the refreshes only fetch the graph's topology, and
+        # the values are loaded for the visible or selected elements
+        button_lazy_values = QAction("Lazy values", self)
+        button_lazy_values.setCheckable(True)
+        button_lazy_values.setToolTip("Only load the values of the visible or "
+                                      "selected elements")
+        button_lazy_values.toggled.connect(self._set_lazy_values)
+        toolbar.addAction(button_lazy_values)
+
+        # With a stable layout, the components of the graph which did not
+        # change keep their position when the layout is computed again
+        button_stable_layout = QAction("Stable layout", self)
+        button_stable_layout.setCheckable(True)
+        button_stable_layout.setToolTip("Keep the unchanged parts of the graph "
+                                        "in place when it is laid out again")
+        button_stable_layout.toggled.connect(
+            self._graph_scene.set_stable_layout)
+        toolbar.addAction(button_stable_layout)
+
+        # On large graphs, faster but less accurate layouts are computed so
+        # that the layout fits in this budget
+        layout_budget = QSpinBox(self)
+        layout_budget.setRange(0, 600)
+        # No budget (the default) is displayed as 0:
+        layout_budget.setValue(int(self._graph_scene.layout_budget() or 0))
+        layout_budget.setSuffix(" s")
+        layout_budget.setSpecialValueText("No layout budget")
+        layout_budget.setToolTip("Duration allowed for the layout of the graph:"
+                                 " larger graphs are laid out faster and less"
+                                 " accurately")
+        layout_budget.valueChanged.connect(self._set_layout_budget)
+        toolbar.addWidget(layout_budget)
+
+        # The built-in layered layout does not run dot, and scales to larger
+        # graphs
+        button_layered_layout = QAction("Layered layout", self)
+        button_layered_layout.setCheckable(True)
+        button_layered_layout.setToolTip("Lay the graph out without Graphviz")
+        button_layered_layout.toggled.connect(self._set_layered_layout)
+        toolbar.addAction(button_layered_layout)
+
+        # With lean layouts, dot only computes the positions, and the nodes are
+        # drawn by SoT GUI
+        button_lean_layout = QAction("Lean layout", self)
+        button_lean_layout.setCheckable(True)
+        button_lean_layout.setToolTip("Only get the positions of the nodes and "
+                                      "edges from Graphviz (faster on large "
+                                      "graphs)")
+        button_lean_layout.toggled.connect(self._set_lean_layout)
+        toolbar.addAction(button_lean_layout)
+
+        # With value overlays, the values are not part of the layout, which does
+        # not change with them
+        button_value_overlays = QAction("Value overlays", self)
+        button_value_overlays.setCheckable(True)
+        button_value_overlays.setToolTip("Display the values above the layout,"
+                                         " which then does not depend on "
+                                         "them")
+        button_value_overlays.toggled.connect(self._set_value_overlays)
+        toolbar.addAction(button_value_overlays)
+
+        # With a canonical layout, the layout only depends on the structure of
+        # the graph
+        button_canonical_dot = QAction("Canonical layout", self)
+        button_canonical_dot.setCheckable(True)
+        button_canonical_dot.setToolTip("Sort the entities and signals by name "
+                                        "and display the values above the "
+                                        "layout, so that identical graphs "
+                                        "share their layout")
+        button_canonical_dot.toggled.connect(self._set_canonical_dot)
+        toolbar.addAction(button_canonical_dot)
+
 
     def _add_cluster_toolbar(self):
         self.addToolBarBreak()
@@ -106,6 +241,18 @@ class MainWindow(QMainWindow):
         self._info_side_panel.hide()
 
 
+    def _add_connection_stats_panel(self) -> None:
+        self._connection_stats_panel = ConnectionStatsPanel(self,
+            {'Kernel commands': self._graph_scene.kernel_call_stats(),
+             'Refresh stages': self._graph_scene.refresh_stats()})
+        # The payload size is only measured while it is displayed:
+        self._connection_stats_panel.visibilityChanged.connect(
+            self._graph_scene.set_payload_size_recorded)
+        self.addDockWidget(Qt.BottomDockWidgetArea,
+                           self._connection_stats_panel)
+        self._connection_stats_panel.hide()
+
+
     def _message_box_no_connection(self, refresh: bool = False) -> None:
         """ Displays a message box which asks the user if the want to reconnect
             to the kernel.
@@ -150,10 +297,58 @@ class MainWindow(QMainWindow):
         if self.statusBar().reconnection_needed():
             self._message_box_no_connection(refresh=True)
         else:
-            try:
-                self._graph_scene.refresh()
-            except ConnectionError:
-                self._message_box_no_connection(refresh=True)
+            self._graph_scene.refresh()
+
+
+    def _cancel_refresh(self) -> None:
+        """ Cancels the ongoing refresh of the graph. The current display is
+            kept.
+        """
+        self._graph_scene.cancel_refresh()
+
+
+    def _on_refresh_progress(self, stage: str, index: int,
+                             stages_nb: int) -> None:
+        """ Displays the progress of the ongoing refresh, and prevents the user
+            from modifying the graph until the refresh is over.
+        """
+        self.statusBar().show_refresh_progress(stage, index, stages_nb)
+        self._set_refresh_in_progress(True)
+
+
+    def _on_refresh_finished(self, changes: GraphChanges | None) -> None:
+        self.statusBar().hide_refresh_progress()
+        self._set_refresh_in_progress(False)
+        if changes is not None:
+            self._view.load_visible_values()
+        # The displayed signals may have changed:
+        self._update_live_signals()
+
+
+    def _on_refresh_failed(self) -> None:
+        self._on_refresh_finished(None)
+        self._message_box_no_connection(refresh=True)
+
+
+    def _on_layout_failed(self, message: str) -> None:
+        self._on_refresh_finished(None)
+        QMessageBox.warning(self, "Layout failed",
+                            f"The layout of the graph could not be computed:\n"
+                            f"{message}")
+
+
+    def _on_graph_data_changed(self, changes: GraphChanges) -> None:
+        for cluster in changes.removed_clusters:
+            self._cluster_side_panel.remove_cluster(cluster)
+
+
+    def _set_refresh_in_progress(self, in_progress: bool) -> None:
+        """ Enables or disables the widgets depending on a refresh being in
+            progress or not.
+        """
+        self._button_cancel_refresh.setEnabled(in_progress)
+        self._button_clusterize.setEnabled(not in_progress)
+        self._cluster_side_panel.setEnabled(not in_progress)
 
 
     def _reconnect(self) -> None:
@@ -164,7 +359,16 @@ class MainWindow(QMainWindow):
             user and let them launch one before re-attempting a connection.
         """
         self._cancel_ongoing_actions()
-        if self._graph_scene.reconnect():
+        # The threads using the client are stopped while it is replaced:
+        live_mode = self._live_values_thread is not None
+        if live_mode:
+            self._live_values_thread.stop()
+            self._live_values_thread.wait()
+            self._live_values_thread = None
+        connected = self._graph_scene.reconnect()
+        if live_mode:
+            self._set_live_mode(True)
+        if connected:
             self.statusBar().set_reconnection_needed(False)
         else:
             self._message_box_no_connection()
@@ -175,6 +379,103 @@ class MainWindow(QMainWindow):
         self._view.enter_cluster_creation_mode()
 
 
+    def _set_live_mode(self, enabled: bool) -> None:
+        """ Starts or stops the live update of the displayed values. The graph
+            layout is not modified in live mode.
+        """
+        if self._live_values_thread is not None:
+            self._live_values_thread.stop()
+            self._live_values_thread = None
+
+        if enabled:
+            thread = self._graph_scene.create_live_values_thread(
+                self._live_rate.value())
+            thread.values_fetched.connect(self._update_live_values)
+            thread.polling_failed.connect(self._on_live_polling_failed)
+            thread.finished.connect(thread.deleteLater)
+            self._live_values_thread = thread
+            self._update_live_signals()
+            thread.start()
+
+
+    def _update_live_signals(self) -> None:
+        """ Sets the signals polled in live mode: the ones displayed in the
+            graph, and the ones of the element displayed in the info panel.
+        """
+        if self._live_values_thread is None:
+            return
+        info_panel_element = self._info_side_panel.element()
+        extra_elements = ([info_panel_element]
+                          if info_panel_element is not None else [])
+        self._live_values_thread.set_signals(
+            self._graph_scene.get_displayed_signals(extra_elements))
+
+
+    def _set_lazy_values(self, enabled: bool) -> None:
+        """ Enables or disables the lazy loading of the values. The graph is
+            refreshed so that the values are fetched (or not) accordingly.
+        """
+        self._graph_scene.set_lazy_values(enabled)
+        self._refresh_graph()
+
+
+    def _set_layered_layout(self, enabled: bool) -> None:
+        """ Switches between the built-in layered layout and dot, and lays the
+            graph out again.
+        """
+        self._graph_scene.set_layout_engine('layered' if enabled else 'dot')
+        self._refresh_graph()
+
+
+    def _set_lean_layout(self, enabled: bool) -> None:
+        """ Enables or disables the lean layouts, and lays the graph out again.
+        """
+        self._graph_scene.set_lean_layout(enabled)
+        self._refresh_graph()
+
+
+    def _set_value_overlays(self, enabled: bool) -> None:
+        """ Enables or disables the value overlays, and lays the graph out
+            again.
+        """
+        self._graph_scene.set_value_overlays(enabled)
+        self._refresh_graph()
+
+
+    def _set_canonical_dot(self, enabled: bool) -> None:
+        """ Enables or disables the canonical dot code, and lays the graph out
+            again.
+        """
+        self._graph_scene.set_canonical_dot(enabled)
+        self._refresh_graph()
+
+
+    def _set_layout_budget(self, budget: int) -> None:
+        """ Sets the layout budget, in seconds. 0 disables it. """
+        self._graph_scene.set_layout_budget(budget if budget > 0 else None)
+
+
+    def _set_live_rate(self, rate: int) -> None:
+        if self._live_values_thread is not None:
+            self._live_values_thread.set_rate(rate)
+
+
+    def _update_live_values(self, values: Dict) -> None:
+        """ Updates the displayed values (graph and info panel) with the values
+            fetched by the live values thread.
+        """
+        changes = self._graph_scene.update_values(values)
+        if changes is not None and changes.changed_values:
+            self._info_side_panel.update_element_info()
+        # The displayed signals may have changed since the last poll (e.g if
+        # the element of the info panel changed):
+        self._update_live_signals()
+
+
+    def _on_live_polling_failed(self) -> None:
+        self._button_live.setChecked(False)
+
+
     def _cancel_ongoing_actions(self) -> None:
         if (self._view.interactionMode ==
             SoTGraphView.InteractionMode.CLUSTER_CREATION):
@@ -185,6 +486,10 @@ class MainWindow(QMainWindow):
         self._cluster_side_panel.show()
 
 
+    def _show_connection_stats(self) -> None:
+        self._connection_stats_panel.show()
+
+
 #
 # OTHER WIDGETS
 #
@@ -203,6 +508,17 @@ class ConnectionStatusBar(QStatusBar):
         # allow the user to send commands until they triggered a reconnection:
         self._reconnection_needed = not self.kernel_is_alive()
 
+        # Progress of the graph refresh, only shown during a refresh:
+        self._refresh_progress_bar = QProgressBar(self)
+        self._refresh_progress_bar.setMaximumWidth(250)
+        self._refresh_progress_bar.setTextVisible(True)
+        self._refresh_progress_bar.hide()
+        self.addPermanentWidget(self._refresh_progress_bar)
+
+        # Layout mode used for the displayed graph (see LayoutBudget):
+        self._layout_mode_indicator = QLabel("")
+        self.addPermanentWidget(self._layout_mode_indicator)
+
         self._co_status_indicator = QLabel("")
         self.addPermanentWidget(self._co_status_indicator)
 
@@ -240,6 +556,28 @@ class ConnectionStatusBar(QStatusBar):
             self._co_status_indicator.setStyleSheet('QLabel {color: ' + color + '}')
 
 
+    def show_refresh_progress(self, stage: str, index: int,
+                              stages_nb: int) -> None:
+        """ Shows the progress bar of the graph refresh.
+
+            Args:
+                stage: label of the current stage of the refresh.
+                index: index of the current stage.
+                stages_nb: number of stages of the refresh.
+        """
+        self._refresh_progress_bar.setRange(0, stages_nb)
+        self._refresh_progress_bar.setValue(index)
+        self._refresh_progress_bar.setFormat(f"{stage}...")
+        self._refresh_progress_bar.show()
+    def hide_refresh_progress(self) -> None:
+        self._refresh_progress_bar.hide()
+
+
+    def set_layout_mode(self, mode_name: str) -> None:
+        """ Shows the layout mode used for the displayed graph. """
+        self._layout_mode_indicator.setText(f"Layout: {mode_name}")
+
+
     def kernel_is_alive(self) -> bool:
         return self._co_check_method()
 
@@ -267,9 +605,12 @@ class ClustersPanel(QDockWidget):
         option_delete.triggered.connect(self._remove_clusters)
         option_infos = QAction("Display informations", self)
         option_infos.triggered.connect(self._display_cluster_info)
+        option_expand = QAction("Expand / shrink", self)
+        option_expand.triggered.connect(self._toggle_clusters_expansion)
 
         self._list_widget.addAction(option_delete)
         self._list_widget.addAction(option_infos)
+        self._list_widget.addAction(option_expand)
         self._list_widget.setContextMenuPolicy(Qt.ActionsContextMenu)
         self._list_widget.setSortingEnabled(True)
 
@@ -279,6 +620,15 @@ class ClustersPanel(QDockWidget):
         self._list_widget.addItem(item)
 
 
+    def remove_cluster(self, cluster: Cluster) -> None:
+        """ Removes a cluster from the list, without removing it from the
+            graph.
+        """
+        for item in self._list_widget.findItems(cluster.label(),
+                                                Qt.MatchExactly):
+            self._list_widget.takeItem(self._list_widget.row(item))
+
+
     def _get_selected_item(self) -> str:
         selected_items = self._list_widget.selectedItems()
         return selected_items[0]
@@ -303,11 +653,113 @@ class ClustersPanel(QDockWidget):
         self.parent()._view.display_cluster_info(selected_item.text())
 
 
+    def _toggle_clusters_expansion(self) -> None:
+        for item in self._get_selected_items():
+            self.parent()._view.scene().toggle_cluster_expansion(item.text())
+
+
+class ConnectionStatsPanel(QDockWidget):
+    """ Panel displaying call statistics (see CallStats), e.g the latency and
+        payload size of the kernel commands, and the duration of the refresh
+        stages. They are updated every second while the panel is visible, and
+        can be saved as JSON.
+
+        Constructor arguments:
+        - `parent`: the parent widget
+        - `stats_per_section`: the statistics to display, per section title
+    """
+
+    COLUMNS = ['Operation', 'Calls', 'Total (ms)', 'Mean (ms)', 'p95 (ms)',
+               'Payload (bytes)']
+
+
+    def __init__(self, parent, stats_per_section: Dict[str, CallStats]):
+        super().__init__('Connection stats', parent)
+        self._stats_per_section = stats_per_section
+
+        widget = QWidget(self)
+        layout = QVBoxLayout()
+
+        self._table = QTableWidget(0, len(self.COLUMNS), self)
+        self._table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self._table.verticalHeader().setVisible(False)
+        self._table.setHorizontalHeaderLabels(self.COLUMNS)
+        layout.addWidget(self._table)
+
+        buttons_layout = QHBoxLayout()
+        button_reset = QPushButton("Reset", self)
+        button_reset.clicked.connect(self._reset_stats)
+        buttons_layout.addWidget(button_reset)
+        button_save = QPushButton("Save as JSON", self)
+        button_save.clicked.connect(self._save_stats)
+        buttons_layout.addWidget(button_save)
+        layout.addLayout(buttons_layout)
+
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+        self._update_timer = QTimer(self)
+        self._update_timer.setInterval(1000)
+        self._update_timer.timeout.connect(self.update_stats)
+        self.visibilityChanged.connect(self._on_visibility_changed)
+
+
+    def _on_visibility_changed(self, visible: bool) -> None:
+        if visible:
+            self.update_stats()
+            self._update_timer.start()
+        else:
+            self._update_timer.stop()
+
+
+    def update_stats(self) -> None:
+        """ Updates the displayed statistics. """
+        rows = []
+        for (section, stats) in self._stats_per_section.items():
+            for (name, op_stats) in stats.get_stats().items():
+                rows.append([f"{section}: {name}", str(op_stats['calls']),
+                             f"{op_stats['total_time'] * 1000:.1f}",
+                             f"{op_stats['mean_time'] * 1000:.2f}",
+                             f"{op_stats['p95_time'] * 1000:.2f}",
+                             str(op_stats['payload_size'])])
+
+        self._table.setRowCount(len(rows))
+        for (row_idx, row) in enumerate(rows):
+            for (col_idx, text) in enumerate(row):
+                self._table.setItem(row_idx, col_idx, QTableWidgetItem(text))
+
+
+    def stats_json(self) -> str:
+        """ Returns the statistics of every section as a JSON string. """
+        return json.dumps({section: stats.get_stats() for (section, stats)
+                           in self._stats_per_section.items()}, indent=4)
+
+
+    def _reset_stats(self) -> None:
+        for stats in self._stats_per_section.values():
+            stats.reset()
+        self.update_stats()
+
+
+    def _save_stats(self) -> None:
+        (file_path, _) = QFileDialog.getSaveFileName(self,
+            "Save connection stats", "connection_stats.json",
+            "JSON files (*.json)")
+        if file_path == '':
+            return
+        with open(file_path, 'w') as file:
+            file.write(self.stats_json())
+
+
 class InfoPanel(QDockWidget):
     def __init__(self, parent):
         super().__init__('Info panel', parent)
         self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
 
+        # Displayed element, and the widget of each of its info sections:
+        self._element: GraphElement = None
+        self._section_widgets: List[Union[QLabel, QTableWidget]] = []
+
 
     def _get_element_info(self, element: GraphElement) -> Dict:
         """ Returns a dictionary containing the element data to be displayed.
@@ -501,6 +953,8 @@ class InfoPanel(QDockWidget):
         self._scroll_area = QScrollArea()
         self._info_widget = QWidget()
         self._layout = QVBoxLayout()
+        self._element = element
+        self._section_widgets = []
 
         element_info = self._get_element_info(element)
 
@@ -528,10 +982,12 @@ class InfoPanel(QDockWidget):
                         new_item = QTableWidgetItem(table_elem)
                         new_item.setToolTip(table_elem)
                         table_info.setItem(line_idx, col_idx, new_item)
+                self._section_widgets.append(table_info)
 
             else: # Text section
                 label = QLabel(f'<b>{title}</b><br>{data}')
                 self._layout.addWidget(label)
+                self._section_widgets.append(label)
 
         self._info_widget.setLayout(self._layout)
         self._scroll_area.setWidgetResizable(True)
@@ -541,6 +997,42 @@ class InfoPanel(QDockWidget):
         self.show()
 
 
+    def element(self) -> GraphElement | None:
+        """ Returns the element whose information is displayed. """
+        return self._element
+
+
+    def replace_element(self, copies: Dict[GraphElement, GraphElement]) \
+                        -> None:
+        """ Replaces the displayed element by its copy, after the graph's
+            elements were replaced by a refresh (see Graph.adopt_model).
+        """
+        if self._element in copies:
+            self._element = copies[self._element]
+            self.update_element_info()
+
+
+    def update_element_info(self) -> None:
+        """ Updates the displayed information of the current element in place
+            (e.g its values), without creating new widgets.
+        """
+        if self._element is None or not self.isVisible():
+            return
+
+        element_info = self._get_element_info(self._element)
+        for ((title, data), widget) in zip(element_info['data'],
+                                           self._section_widgets):
+            if isinstance(widget, QTableWidget):
+                for line_idx, table_line in enumerate(data[1:]):
+                    for col_idx, table_elem in enumerate(table_line):
+                        item = widget.item(line_idx, col_idx)
+                        if item is not None and item.text() != table_elem:
+                            item.setText(table_elem)
+                            item.setToolTip(table_elem)
+            else:
+                widget.setText(f'<b>{title}</b><br>{data}')
+
+
 class SoTGraphView(QGraphicsView):
     """ QGraphicsView which handles events to interact with the SoTGraphScene
         items.
@@ -556,6 +1048,17 @@ class SoTGraphView(QGraphicsView):
         # To center the zoom on the position of the mouse:
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
 
+        # When the values are loaded lazily, those of the visible elements are
+        # loaded once the view stops moving:
+        self._load_values_timer = QTimer(self)
+        self._load_values_timer.setSingleShot(True)
+        self._load_values_timer.setInterval(100)
+        self._load_values_timer.timeout.connect(self.load_visible_values)
+        self.horizontalScrollBar().valueChanged.connect(
+            self._load_values_timer.start)
+        self.verticalScrollBar().valueChanged.connect(
+            self._load_values_timer.start)
+
 
     class InteractionMode(Enum):
         """ This enum is used to determine how to handle events based on there
@@ -577,6 +1080,12 @@ class SoTGraphView(QGraphicsView):
         self._handleZoom(event.angleDelta().y())
 
 
+    def resizeEvent(self, event):
+        """ See QGraphicsView.resizeEvent """
+        super().resizeEvent(event)
+        self._load_values_timer.start()
+
+
     def mouseReleaseEvent(self, event):
         """ See QGraphicsView.mouseReleaseEvent """
         super().mouseReleaseEvent(event)
@@ -596,6 +1105,9 @@ class SoTGraphView(QGraphicsView):
         clicked_item = self.itemAt(click_pos.x(), click_pos.y())
         if clicked_item is None:
             return
+        # The graph elements cannot be accessed while they are being refreshed
+        if self.scene().is_refreshing():
+            return
         #print(self.scene().get_graph_elem_per_qt_item(clicked_item))
 
         if self.interactionMode == self.InteractionMode.CLUSTER_CREATION:
@@ -606,6 +1118,7 @@ class SoTGraphView(QGraphicsView):
 
 
     def _display_element_info(self, element: GraphElement) -> None:
+        self.scene().update_element_values(element)
         self.scene().clear_selection()
         self.scene().update_selected_elements(element)
         self.parent()._info_side_panel.display_element_info(element)
@@ -634,6 +1147,17 @@ class SoTGraphView(QGraphicsView):
             self.scale(1.25, 1.25)
         else:
             self.scale(0.8, 0.8)
+        self._load_values_timer.start()
+
+
+    def load_visible_values(self) -> None:
+        """ Loads the values displayed in the visible part of the scene, if the
+            values are loaded lazily.
+        """
+        if self.scene() is None:
+            return
+        visible_rect = self.mapToScene(self.viewport().rect()).boundingRect()
+        self.scene().load_values_in_rect(visible_rect)
 
 
     def enter_cluster_creation_mode(self) -> None:
@@ -717,8 +1241,35 @@ class SoTGraphScene(QGraphicsScene):
         communication with the Graph object.
 
         Attributes: See QGraphicsScene
+
+        Signals:
+        - `refresh_progress(stage, index, stages_nb)`: emitted at the beginning
+          of each stage of a refresh
+        - `refresh_finished(changes)`: emitted at the end of a refresh, with
+          the GraphChanges (None if the refresh was cancelled)
+        - `refresh_failed()`: emitted if a refresh failed because the kernel
+          is not running
+        - `layout_failed(message)`: emitted if a refresh or a relayout failed
+          because dot could not compute the layout (e.g it timed out)
+        - `graph_data_changed(changes)`: emitted when new data has been applied
+          to the graph at the end of a refresh, with the GraphChanges
+        - `elements_replaced(copies)`: emitted when the elements of the graph
+          have been replaced by their copies at the end of a refresh, with the
+          copy of each element per element (see Graph.adopt_model)
+        - `layout_mode_changed(mode_name)`: emitted when the display is
+          updated, with the name of the layout mode used (see
+          Graph.layout_mode)
     """
 
+    refresh_progress = Signal(str, int, int)
+    refresh_finished = Signal(object)
+    refresh_failed = Signal()
+    layout_failed = Signal(str)
+    graph_data_changed = Signal(object)
+    elements_replaced = Signal(object)
+    layout_mode_changed = Signal(str)
+
+
     def __init__(self, parent):
         super().__init__(parent)
         self._connected_to_kernel = False
@@ -727,6 +1278,166 @@ class SoTGraphScene(QGraphicsScene):
 
         self._selected_nodes = []
         self._selected_elements = []
+        # Top-level qt items currently in the scene:
+        self._items: List[QGraphicsItem] = []
+
+        # Ongoing refresh, if any:
+        self._refresh_thread: GraphRefreshThread = None
+        # True if a refresh was requested while another one was running:
+        self._new_refresh_requested = False
+        self._refresh_failed = False
+        # Error raised by the layout computation of the ongoing refresh, if any:
+        self._layout_error: Exception = None
+        self._refresh_changes: GraphChanges = None
+        # True if a setting of the layout changed but the display has not been
+        # updated yet (e.g if a refresh was cancelled):
+        self._layout_outdated = False
+        # Durations of the refresh stages:
+        self._refresh_stats = CallStats()
+
+
+    def kernel_call_stats(self) -> CallStats:
+        """ Returns the statistics on the kernel commands (see
+            DynamicGraphCommunication.call_stats).
+        """
+        return self._dg_communication.call_stats()
+
+
+    def set_payload_size_recorded(self, recorded: bool) -> None:
+        """ See DynamicGraphCommunication.set_payload_size_recorded """
+        self._dg_communication.set_payload_size_recorded(recorded)
+
+
+    def refresh_stats(self) -> CallStats:
+        """ Returns the statistics on the durations of the refresh stages (see
+            GraphRefreshThread.STAGES), including the update of the display in
+            the GUI thread.
+        """
+        return self._refresh_stats
+
+
+    def create_live_values_thread(self, rate: float) -> LiveValuesThread:
+        """ Returns a thread polling the values of the graph's signals at the
+            given rate (see LiveValuesThread). The fetched values can be
+            displayed with `update_values`.
+        """
+        return LiveValuesThread(self._dg_communication, rate, self)
+
+
+    def update_values(self, values: Dict) -> GraphChanges | None:
+        """ Updates the signals' values of the graph and their display, without
+            generating a new layout.
+
+            Args:
+                values: the values, as returned by
+                    `DynamicGraphCommunication.get_signals_data`.
+
+            Returns:
+                The changes applied to the graph, or None if the values were
+                not applied because a refresh is running.
+        """
+        if self.is_refreshing():
+            return None
+        changes = self._graph.apply_graph_values(values)
+        self._graph.update_qt_items_values(changes)
+        return changes
+
+
+    def get_displayed_signals(self,
+                              extra_elements: List[GraphElement] = None) \
+                              -> List[Tuple[str, str]]:
+        """ Returns the signals whose values are displayed, and those of the
+            given extra elements, as a list of tuples (entity name, signal
+            name).
+
+            The displayed graph is not modified by a running refresh (see
+            `refresh`), so the signals can be read while it runs.
+        """
+        if extra_elements is None:
+            extra_elements = []
+        return (self._graph.get_displayed_signals() +
+                self._graph.get_elements_signals(extra_elements))
+
+
+    def set_lazy_values(self, lazy_values: bool) -> None:
+        """ See Graph.set_lazy_values """
+        self._graph.set_lazy_values(lazy_values)
+
+
+    def set_stable_layout(self, stable_layout: bool) -> None:
+        """ See Graph.set_stable_layout """
+        self._graph.set_stable_layout(stable_layout)
+
+
+    def layout_budget(self) -> float | None:
+        return self._graph.layout_budget()
+    def set_layout_budget(self, budget: float | None) -> None:
+        """ See Graph.set_layout_budget """
+        self._graph.set_layout_budget(budget)
+
+
+    def set_layout_engine(self, engine: str) -> None:
+        """ See Graph.set_layout_engine. The next refresh computes a new
+            layout.
+        """
+        self._graph.set_layout_engine(engine)
+        self._layout_outdated = True
+
+
+    def set_lean_layout(self, lean_layout: bool) -> None:
+        """ See Graph.set_lean_layout. The next refresh computes a new layout.
+        """
+        self._graph.set_lean_layout(lean_layout)
+        self._layout_outdated = True
+
+
+    def set_value_overlays(self, value_overlays: bool) -> None:
+        """ See Graph.set_value_overlays. The next refresh computes a new
+            layout.
+        """
+        self._graph.set_value_overlays(value_overlays)
+        self._layout_outdated = True
+
+
+    def set_canonical_dot(self, canonical_dot: bool) -> None:
+        """ See Graph.set_canonical_dot. The next refresh computes a new
+            layout.
+        """
+        self._graph.set_canonical_dot(canonical_dot)
+        self._layout_outdated = True
+
+
+    def load_values_in_rect(self, rect: QRectF) -> None:
+        """ Loads the values displayed by the items intersecting a rectangle of
+            the scene, if the values are loaded lazily (see
+            `Graph.load_values`). If a refresh is running or the kernel is not
+            reachable, the values are not loaded.
+        """
+        if not self._graph.lazy_values() or self.is_refreshing():
+            return
+        try:
+            pairs = self._graph.get_displayed_signals(rect)
+            changes = self._graph.load_values(pairs)
+        except ConnectionError:
+            return
+        self._graph.update_qt_items_values(changes)
+
+
+    def update_element_values(self, element: GraphElement) -> None:
+        """ Fetches the current values of a graph element's signals, with
+            batched kernel commands. Large values are fetched in full, to be
+            displayed in the info panel. If a refresh is running or the kernel
+            is not reachable, the values are not updated.
+        """
+        if self.is_refreshing():
+            return
+        try:
+            pairs = self._graph.get_elements_signals([element])
+            changes = self._graph.update_signals_values(pairs,
+                                                        full_values=True)
+        except ConnectionError:
+            return
+        self._graph.update_qt_items_values(changes)
 
 
     def is_kernel_running(self) -> bool:
@@ -739,38 +1450,197 @@ class SoTGraphScene(QGraphicsScene):
         return self._dg_communication.is_kernel_alive()
 
 
-    def update_display(self) -> None:
+    def update_display(self, qt_generator: ComponentsQtGenerator = None) \
+                       -> None:
         """ Updates the graph display. New graph data will not be fetched from
             the kernel.
+
+            Args:
+                qt_generator: generator created from the graph's layout. If
+                    None, a new layout is computed.
         """
-        self._graph.generate_qt_items()
-        self.clear()
-        self._items = self._graph.get_qt_items()
+        self._graph.generate_qt_items(qt_generator)
+        # Only the items which changed are removed and added, as the unchanged
+        # components keep their items when the layout is stable:
+        new_items = self._graph.get_qt_items()
+        new_items_set = set(new_items)
         for item in self._items:
-            self.addItem(item)
+            if item not in new_items_set and item.scene() is self:
+                self.removeItem(item)
+        for item in new_items:
+            if item.scene() is not self:
+                self.addItem(item)
+        self._items = new_items
+
+        layout_mode = self._graph.layout_mode()
+        if layout_mode is not None:
+            self.layout_mode_changed.emit(layout_mode.name())
 
 
     def refresh(self) -> None:
         """ Refreshes the graph. New graph data will be fetched from the kernel
             and displayed.
 
-        Raises:
-            ConnectionError: the kernel is not running.
+            The data fetching and the layout computation are done in a
+            background thread, on a copy of the graph, and only the adoption of
+            the copy and the update of the qt items are done in the GUI thread
+            (see GraphRefreshThread). The graph is not modified in the GUI
+            thread while the refresh is running, so that the copy stays
+            consistent with it. The progress of the refresh
+            is notified through the `refresh_progress` signal, and its end
+            through the `refresh_finished` or `refresh_failed` signals.
+
+            If a refresh is already running, it is superseded: it is cancelled,
+            and a new refresh is launched once it has stopped.
+        """
+        self._start_refresh_thread(fetch_data=True)
+
+
+    def relayout(self) -> None:
+        """ Computes a new layout of the graph and displays it, without
+            fetching new data from the kernel (e.g after a cluster was
+            modified).
+
+            As for a refresh (see `refresh`), the layout is computed in a
+            background thread, and its end is notified through the
+            `refresh_finished` or `layout_failed` signals. If a refresh is
+            already running, it is superseded by a refresh computing a new
+            layout.
+        """
+        self._layout_outdated = True
+        self._start_refresh_thread(fetch_data=False)
+
+
+    def _start_refresh_thread(self, fetch_data: bool) -> None:
+        """ Starts a GraphRefreshThread (see `refresh`), fetching the graph
+            data only if `fetch_data` is True.
+        """
+        if self._refresh_thread is not None:
+            self._refresh_thread.cancel()
+            self._new_refresh_requested = True
+            return
+
+        stages_nb = len(GraphRefreshThread.STAGES)
+        thread = GraphRefreshThread(self._graph, self._layout_outdated,
+                                    self._refresh_stats, self, fetch_data)
+        thread.stage_changed.connect(lambda stage, index:
+            self.refresh_progress.emit(stage, index, stages_nb))
+        thread.values_fetched.connect(self._apply_values_update)
+        thread.refresh_done.connect(self._complete_refresh)
+        thread.refresh_failed.connect(self._on_refresh_failed)
+        thread.layout_failed.connect(self._on_layout_failed)
+        thread.finished.connect(self._on_refresh_thread_finished)
+
+        self._refresh_thread = thread
+        self._refresh_failed = False
+        self._layout_error = None
+        self._refresh_changes = None
+        thread.start()
+
+
+    def cancel_refresh(self) -> None:
+        """ Cancels the ongoing refresh, if any. The current display is kept.
         """
+        self._new_refresh_requested = False
+        if self._refresh_thread is not None:
+            self._refresh_thread.cancel()
 
-        self._graph.refresh_graph_data()
-        self.update_display()
+
+    def is_refreshing(self) -> bool:
+        return self._refresh_thread is not None
+
+
+    def _is_refresh_cancelled(self) -> bool:
+        """ Returns True if the results of the ongoing refresh must be
+            discarded: they may have been emitted just before it was cancelled.
+        """
+        return (self._refresh_thread is None
+                or self._refresh_thread.is_cancelled())
+
+
+    def _apply_values_update(self, update: GraphUpdate) -> None:
+        """ Applies the values fetched by a refresh, if the topology of the
+            graph has not changed: the layout and qt items are kept.
+        """
+        if self._is_refresh_cancelled():
+            return
+        start_time = perf_counter()
+        changes = self._graph.apply_graph_update(update)
+        self.graph_data_changed.emit(changes)
+        self._graph.update_qt_items_values(changes)
+        self._refresh_stats.record('Updating display',
+                                   perf_counter() - start_time)
+        self._refresh_changes = changes
+
+
+    def _complete_refresh(self, changes: GraphChanges, model: Graph,
+                          qt_generator: ComponentsQtGenerator) -> None:
+        """ Replaces the graph's elements by those of the refreshed copy, and
+            updates the display. This is the only stage of a refresh run in the
+            GUI thread.
+        """
+        if self._is_refresh_cancelled():
+            return
+        start_time = perf_counter()
+        self.clear_selection()
+        copies = self._graph.adopt_model(model)
+        self.elements_replaced.emit(copies)
+        self.graph_data_changed.emit(changes)
+        self.update_display(qt_generator)
+        self._layout_outdated = False
+        self._refresh_stats.record('Updating display',
+                                   perf_counter() - start_time)
+        self._refresh_changes = changes
+
+
+    def _on_refresh_failed(self, error: ConnectionError) -> None:
+        self._refresh_failed = True
+
+
+    def _on_layout_failed(self, error: Exception) -> None:
+        self._layout_error = error
+
+
+    def _on_refresh_thread_finished(self) -> None:
+        self._refresh_thread.deleteLater()
+        self._refresh_thread = None
+
+        if self._refresh_failed:
+            self._new_refresh_requested = False
+            self.refresh_failed.emit()
+        elif self._layout_error is not None and not self._new_refresh_requested:
+            self.layout_failed.emit(str(self._layout_error))
+        elif self._new_refresh_requested:
+            self._new_refresh_requested = False
+            self.refresh()
+        else:
+            self.refresh_finished.emit(self._refresh_changes)
 
 
     def reconnect(self) -> bool:
-        """ Attemps to reconnect the client to the latest kernel.
+        """ Attemps to reconnect the client to the latest kernel. The ongoing
+            refresh, if any, is cancelled and waited for, so that it does not
+            use the client while it is replaced.
 
         Returns:
             True if the connection was successful, False if not.
         """
+        self.cancel_refresh()
+        if self._refresh_thread is not None:
+            self._refresh_thread.wait()
         return self._dg_communication.connect_to_kernel()
 
 
+    def close(self) -> None:
+        """ Cancels the ongoing refresh, if any, waits for it, and stops the
+            graph's dot processes (see Graph.close).
+        """
+        self.cancel_refresh()
+        if self._refresh_thread is not None:
+            self._refresh_thread.wait()
+        self._graph.close()
+
+
     def select_item_for_cluster_creation(self, item: QGraphicsItem) -> None:
         selected_node = None
         graph_elem = self.get_graph_elem_per_qt_item(item)
@@ -824,14 +1694,27 @@ class SoTGraphScene(QGraphicsScene):
     def complete_cluster_creation(self, cluster_label: str) -> Cluster:
         new_cluster = self._graph.add_cluster(cluster_label,
                                               self._selected_nodes.copy())
-        self.update_display()
+        self.relayout()
         return new_cluster
 
 
     def remove_cluster(self, cluster_label: str) -> None:
         self._graph.remove_cluster(cluster_label)
         self.clear_selection()
-        self.update_display()
+        self.relayout()
+
+
+    def toggle_cluster_expansion(self, cluster_label: str) -> None:
+        """ Expands the cluster if it is shrunk, or shrinks it if it is
+            expanded (see Graph.set_cluster_expanded).
+        """
+        for cluster in self._graph.clusters():
+            if cluster.label() == cluster_label:
+                self._graph.set_cluster_expanded(cluster_label,
+                                                 not cluster.is_expanded())
+                break
+        self.clear_selection()
+        self.relayout()
 
 
     def check_clusterizability(self) -> bool:
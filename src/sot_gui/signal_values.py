@@ -0,0 +1,160 @@
+from typing import Any, List, Tuple
+from base64 import b64decode
+from struct import unpack
+
+from sot_gui import kernel_helpers
+
+
+# Vectors and matrices with more elements than this are displayed in the graph
+# by their shape only, to keep huge labels out of the layout:
+LABEL_MAX_SIZE = 6
+
+# Label given to the layout instead of the values when they are displayed by
+# overlay items (see `Graph.set_value_overlays`): its size is fixed, so that the
+# layout does not depend on the values. It is never displayed.
+VALUE_PLACEHOLDER = '0' * 8
+
+
+class _NotLoaded:
+    """ Type of NOT_LOADED. """
+
+    def __str__(self) -> str:
+        return '...'
+
+
+    def __repr__(self) -> str:
+        return 'NOT_LOADED'
+
+
+# Value (and execution time) of a signal which has not been fetched yet, when
+# the values are loaded lazily:
+NOT_LOADED = _NotLoaded()
+
+
+class SignalArray:
+    """ Numeric vector or matrix value of a signal, decoded from the compact
+        encoding sent by the kernel (see `kernel_helpers._encode_value`).
+
+        Its string representation is the same as the one of the tuple it
+        represents (e.g `(1.0, 2.0)` or `((1.0, 0.0), (0.0, 1.0))`).
+    """
+
+    def __init__(self, shape: Tuple[int, ...], data: List[float]):
+        self._shape = tuple(shape)
+        self._data = data
+
+
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+
+    def data(self) -> List[float]:
+        """ Returns the elements of the array, flattened row by row. """
+        return self._data
+
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+    def to_tuple(self) -> Tuple:
+        """ Returns the array as a tuple (of tuples, for a matrix). """
+        if len(self._shape) == 1:
+            return tuple(self._data)
+        columns_nb = self._shape[1]
+        return tuple(tuple(self._data[i:i + columns_nb])
+                     for i in range(0, len(self._data), columns_nb))
+
+
+    def __eq__(self, other: Any) -> bool:
+        return (isinstance(other, SignalArray) and other.shape() == self._shape
+                and other.data() == self._data)
+
+
+    def __str__(self) -> str:
+        return str(self.to_tuple())
+
+
+class SignalValueSummary:
+    """ Summary of a large vector or matrix value of a signal, sent by the
+        kernel instead of the full data (see `kernel_helpers._encode_value`).
+        The full value can be fetched with
+        `DynamicGraphCommunication.get_full_signal_values`.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], min_value: float,
+                 max_value: float, norm: float):
+        self._shape = tuple(shape)
+        self._min = min_value
+        self._max = max_value
+        self._norm = norm
+
+
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+
+    def min(self) -> float:
+        return self._min
+
+
+    def max(self) -> float:
+        return self._max
+
+
+    def norm(self) -> float:
+        return self._norm
+
+
+    def __eq__(self, other: Any) -> bool:
+        return (isinstance(other, SignalValueSummary)
+                and other.shape() == self._shape and other.min() == self._min
+                and other.max() == self._max and other.norm() == self._norm)
+
+
+    def __str__(self) -> str:
+        return (f"{shape_label(self._shape)} (min: {self._min:g}, max: "
+                f"{self._max:g}, norm: {self._norm:g})")
+
+
+def decode_value(value: Any) -> Any:
+    """ Returns the value of a signal as sent by the kernel, decoded: a
+        SignalArray or a SignalValueSummary for encoded vectors and matrices,
+        else the value itself.
+    """
+    if not isinstance(value, (tuple, list)) or len(value) == 0:
+        return value
+
+    if value[0] == kernel_helpers.ARRAY_MARKER and len(value) == 4:
+        (_, dtype, shape, data) = value
+        if dtype != 'float64':
+            raise ValueError(f'Unsupported signal value type: {dtype}')
+        raw_data = b64decode(data)
+        return SignalArray(shape, list(unpack(f'<{len(raw_data) // 8}d',
+                                              raw_data)))
+
+    if value[0] == kernel_helpers.SUMMARY_MARKER and len(value) == 5:
+        (_, shape, min_value, max_value, norm) = value
+        return SignalValueSummary(shape, min_value, max_value, norm)
+
+    return value
+
+
+def shape_label(shape: Tuple[int, ...]) -> str:
+    """ Returns a short description of a vector or matrix shape, e.g
+        `vector(6)` or `matrix(6x36)`.
+    """
+    if len(shape) == 1:
+        return f"vector({shape[0]})"
+    return f"matrix({'x'.join(str(dim) for dim in shape)})"
+
+
+def value_label(value: Any) -> str:
+    """ Returns the text displaying a signal value in the graph: large vectors
+        and matrices are only described by their shape.
+    """
+    if isinstance(value, SignalValueSummary):
+        return shape_label(value.shape())
+    if isinstance(value, SignalArray) and value.size() > LABEL_MAX_SIZE:
+        return shape_label(value.shape())
+    return str(value)
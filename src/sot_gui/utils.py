@@ -1,13 +1,45 @@
-from typing import Dict, List, Any
+from __future__ import annotations
+from typing import Dict, List, Any, Tuple
+import re
 
 
 def quoted(string: str) -> str:
-    """ Returns a string wrapped in escaped double quotes.
+    """ Returns a string wrapped in escaped double quotes, as a dot string: its
+        backslashes and double quotes are escaped, so that any text (e.g a
+        string signal's value) gives valid dot code, and two different texts
+        give different dot strings.
 
     Args:
         string: The string to wrap.
     """
-    return f"\"{string}\""
+    escaped = string.replace('\\', '\\\\').replace('"', '\\"')
+    return f"\"{escaped}\""
+
+
+def natural_sort_key(string: str) -> Tuple:
+    """ Returns a key sorting strings in natural order, i.e with their numbers
+        compared by value (e.g `sin2` before `sin10`).
+    """
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part)
+                 for part in re.split(r'(\d+)', string))
+
+
+# Compass points which can end a port in dot (e.g `sout0:e`):
+_COMPASS_POINTS = {'n', 'ne', 'e', 'se', 's', 'sw', 'w', 'nw', 'c', '_'}
+
+
+def dot_port_name(port: str | None) -> str | None:
+    """ Returns the name of a port given in dot's output (e.g `sout0` for the
+        `tailport` or `headport` attribute `sout0:e`), or None if there is no
+        port or only a compass point.
+    """
+    if port is None:
+        return None
+    if ':' in port:
+        return port.rsplit(':', 1)[0]
+    if port in _COMPASS_POINTS:
+        return None
+    return port
 
 
 def get_dict_with_element(dict_list: List[Dict], key: Any, value: Any) -> Dict:
@@ -0,0 +1,101 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class ValueCache:
+    """ Cache of the signals' values and execution times, per (entity name,
+        signal name). It is used when the values are loaded lazily, only for
+        the elements which are visible or selected.
+
+        An entry expires `ttl` seconds after it was fetched. When the cache
+        holds more than `max_entries` entries, the least recently used ones are
+        evicted.
+
+        The cache can be used from several threads (e.g a refresh thread and
+        the GUI thread).
+
+        Constructor arguments:
+        - `ttl`: time to live of an entry, in seconds
+        - `max_entries`: maximum number of entries
+    """
+
+    def __init__(self, ttl: float = 2.0, max_entries: int = 10000):
+        if ttl <= 0 or max_entries <= 0:
+            raise ValueError('The ttl and max_entries of a ValueCache must be'
+                             ' positive.')
+        self._ttl = ttl
+        self._max_entries = max_entries
+        # Tuples (value, execution time, fetch time) per (entity name, signal
+        # name), from the least to the most recently used:
+        self._entries: OrderedDict[Tuple[str, str], Tuple[Any, Any, float]] = \
+            OrderedDict()
+        self._lock = Lock()
+
+
+    def ttl(self) -> float:
+        return self._ttl
+
+
+    def max_entries(self) -> int:
+        return self._max_entries
+
+
+    def get(self, pair: Tuple[str, str]) -> Tuple[Any, Any] | None:
+        """ Returns the cached (value, execution time) of a signal, or None if
+            it is not cached or if it expired.
+
+            Args:
+                pair: tuple (entity name, signal name).
+        """
+        with self._lock:
+            entry = self._entries.get(pair)
+            if entry is None:
+                return None
+            (value, time, fetch_time) = entry
+            if monotonic() - fetch_time > self._ttl:
+                del self._entries[pair]
+                return None
+            self._entries.move_to_end(pair)
+            return (value, time)
+
+
+    def put(self, pair: Tuple[str, str], value: Any, time: Any) -> None:
+        """ Stores the value and execution time of a signal.
+
+            Args:
+                pair: tuple (entity name, signal name).
+        """
+        with self._lock:
+            self._entries[pair] = (value, time, monotonic())
+            self._entries.move_to_end(pair)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+    def update(self, graph_values: Dict[str, Dict[str, Tuple[Any, Any]]]) \
+               -> None:
+        """ Stores several values, given in the form returned by
+            `DynamicGraphCommunication.get_signals_data`.
+        """
+        for (entity_name, entity_values) in graph_values.items():
+            for (signal_name, (value, time)) in entity_values.items():
+                self.put((entity_name, signal_name), value, time)
+
+
+    def missing(self, pairs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """ Returns the signals of a list of tuples (entity name, signal name)
+            which are not cached, or whose entry expired.
+        """
+        return [pair for pair in pairs if self.get(pair) is None]
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,12 @@
+from dynamic_graph import plug
+from dynamic_graph.entity import Entity
+from dynamic_graph.sot.core.operator import Add_of_double
+
+# To run after normal_dg.py: adds an entity plugged to its last entity
+c = Entity.entities['c']
+d = Add_of_double('d')
+
+d.sin(1).value = 5
+plug(c.signal('sout'), d.sin(0))
+
+d.sout.recompute(2)
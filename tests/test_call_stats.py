@@ -0,0 +1,43 @@
+from unittest import TestCase
+import json
+
+from sot_gui.call_stats import CallStats
+
+
+class TestCallStats(TestCase):
+    """ Tests for the CallStats class. """
+
+    def test_stats(self):
+        stats = CallStats()
+        for i in range(1, 21):
+            stats.record('get_graph_values', i / 1000, 100)
+        stats.record('get_topology_fingerprint', 0.002, 50)
+
+        values_stats = stats.get_stats()['get_graph_values']
+        assert values_stats['calls'] == 20
+        assert values_stats['payload_size'] == 2000
+        self.assertAlmostEqual(values_stats['total_time'], 0.21)
+        self.assertAlmostEqual(values_stats['mean_time'], 0.0105)
+        self.assertAlmostEqual(values_stats['p95_time'], 0.019)
+
+        dumped_stats = json.loads(stats.to_json())
+        assert list(dumped_stats.keys()) == ['get_graph_values',
+                                             'get_topology_fingerprint']
+        assert dumped_stats['get_topology_fingerprint']['calls'] == 1
+
+
+    def test_latest_samples(self):
+        """ The 95th percentile is computed on the latest calls only. """
+        stats = CallStats(samples_nb=2)
+        stats.record('op', 10.)
+        stats.record('op', 1.)
+        stats.record('op', 1.)
+        assert stats.get_stats()['op']['p95_time'] == 1.
+        assert stats.get_stats()['op']['calls'] == 3
+
+
+    def test_reset(self):
+        stats = CallStats()
+        stats.record('op', 1.)
+        stats.reset()
+        assert stats.get_stats() == {}
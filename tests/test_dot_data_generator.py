@@ -0,0 +1,89 @@
+from unittest import TestCase
+from io import BytesIO
+
+from sot_gui import dot_data_generator
+from sot_gui.dot_data_generator import DotDataGenerator, html_table_template
+
+
+class TestDotDataGenerator(TestCase):
+    """ Tests for the output of the DotDataGenerator class. """
+
+    def setUp(self):
+        self._gen = DotDataGenerator()
+        self._gen.set_graph_attributes({'rankdir': 'LR'})
+        self._gen.add_node('input', {'label': '"1.0"'})
+        self._gen.set_node_attributes({'shape': 'none'})
+        self._gen.add_html_node('a', (['sin0', 'sin1'], ['sout']), 'A(a)')
+        self._gen.add_edge(('input', None), ('a', 'sin0'),
+                           {'label': '"é"'})
+
+
+    def test_dot_string(self):
+        dot_string = self._gen.get_dot_string()
+        assert dot_string.startswith('digraph G {\n\trankdir=LR\n'
+                                     '\t"input" [label="1.0"]\n'
+                                     '\tnode [shape=none]\n')
+        assert dot_string.endswith('\t"input":e -> "a":"sin0":w [label="é"]\n'
+                                   '}\n')
+        assert ''.join(self._gen.chunks()) == dot_string
+
+
+    def test_quoted_names(self):
+        """ The names of the nodes and ports are quoted, so that any name (e.g
+            with a dash or a space) gives valid dot code.
+        """
+        gen = DotDataGenerator()
+        gen.add_node('my node')
+        gen.add_edge(('a-b', 'sout'), ('"c"', None))
+        assert gen.get_dot_string() == ('digraph G {\n\t"my node"\n'
+                                        '\t"a-b":"sout":e -> "\\"c\\"":w\n}\n')
+
+
+    def test_write(self):
+        """ The code written to a stream is the encoded dot code, whatever the
+            size of the blocks.
+        """
+        stream = BytesIO()
+        self._gen.write(stream)
+        assert stream.getvalue() == self._gen.get_encoded_dot_string()
+
+        default_block_size = dot_data_generator.WRITE_BLOCK_SIZE
+        dot_data_generator.WRITE_BLOCK_SIZE = 10
+        try:
+            stream = BytesIO()
+            self._gen.write(stream)
+        finally:
+            dot_data_generator.WRITE_BLOCK_SIZE = default_block_size
+        assert stream.getvalue() == self._gen.get_encoded_dot_string()
+
+
+    def test_copy(self):
+        """ A copy can be completed without modifying the original. """
+        dot_string = self._gen.get_dot_string()
+        copy = self._gen.copy()
+        copy.set_graph_attributes({'nslimit': 1})
+        assert self._gen.get_dot_string() == dot_string
+        assert copy.get_dot_string() == dot_string[:-2] + '\tnslimit=1\n}\n'
+
+
+    def test_html_table_templates(self):
+        """ The tables of the nodes with the same ports are generated from the
+            same template, with their own label.
+        """
+        html_table_template.cache_clear()
+        gen = DotDataGenerator()
+        gen.add_html_node('b', (['sin0', 'sin1'], ['sout']), 'A(b)')
+        gen.add_html_node('c', (['sin0', 'sin1'], ['sout']), 'A(c)')
+        assert html_table_template.cache_info().hits == 1
+        (_, table_b, table_c, _) = list(gen.chunks())
+        assert table_c == table_b.replace('\t"b" [', '\t"c" [').replace(
+            'A(b)', 'A(c)')
+
+
+    def test_html_escaping(self):
+        """ The texts of the html tables are escaped. """
+        gen = DotDataGenerator()
+        gen.add_html_node('d', (['in&out'], ['sout']), 'Vector<double>(d)')
+        dot_string = gen.get_dot_string()
+        assert 'PORT="in&amp;out">in&amp;out</TD>' in dot_string
+        assert '>Vector&lt;double&gt;(d)</TD>' in dot_string
@@ -0,0 +1,127 @@
+from unittest import TestCase
+from threading import Event
+from time import sleep
+import sys
+
+from sot_gui.dot_worker import DotWorkerPool
+from sot_gui.dot_data_generator import DotDataGenerator
+
+
+# Commands replacing dot, to test the pool without Graphviz:
+ECHO_COMMAND = [sys.executable, '-c',
+                'import sys; sys.stdout.write(sys.stdin.read())']
+DELAYED_ECHO_COMMAND = [sys.executable, '-c',
+                        'import sys, time; code = sys.stdin.read();'
+                        ' time.sleep(0.5); sys.stdout.write(code)']
+SLOW_COMMAND = [sys.executable, '-c',
+                'import sys, time; sys.stdin.read(); time.sleep(10)']
+NOT_READING_COMMAND = [sys.executable, '-c', 'import time; time.sleep(10)']
+FAILING_COMMAND = [sys.executable, '-c',
+                   'import sys; sys.stdin.read(); sys.stderr.write("error");'
+                   ' sys.exit(1)']
+
+
+def wait_for_fill(pool: DotWorkerPool) -> None:
+    """ Waits until the pool has started its missing processes. """
+    while pool._fill_thread is not None:
+        sleep(0.01)
+
+
+class TestDotWorkerPool(TestCase):
+    """ Tests for the DotWorkerPool class. """
+
+    def test_layout(self):
+        pool = DotWorkerPool(command=ECHO_COMMAND)
+        assert pool.layout(b'digraph { a }') == 'digraph { a }'
+        # A process is started in the background for the next layout:
+        wait_for_fill(pool)
+        assert len(pool._idle_processes) == 1
+        assert pool.layout(b'digraph { b }') == 'digraph { b }'
+        pool.close()
+        assert pool._idle_processes == []
+
+
+    def test_dot_data_generator(self):
+        """ The code of a DotDataGenerator is written to dot's input. """
+        generator = DotDataGenerator()
+        for index in range(1000):
+            generator.add_node(f'node{index}')
+        pool = DotWorkerPool(command=ECHO_COMMAND)
+        assert pool.layout(generator) == generator.get_dot_string()
+        pool.close()
+
+
+    def test_slow_layout(self):
+        """ A layout longer than the polling period of the pool is waited for.
+        """
+        pool = DotWorkerPool(command=DELAYED_ECHO_COMMAND)
+        assert pool.layout(b'digraph { a }') == 'digraph { a }'
+        pool.close()
+
+
+    def test_start(self):
+        """ The processes of the pool can be started before the first layout,
+            without waiting for them.
+        """
+        pool = DotWorkerPool(size=3, command=ECHO_COMMAND)
+        pool.start()
+        wait_for_fill(pool)
+        assert len(pool._idle_processes) == 3
+        assert pool.layout(b'digraph { a }') == 'digraph { a }'
+        pool.close()
+        wait_for_fill(pool)
+        assert pool._idle_processes == []
+
+
+    def test_dead_process_restart(self):
+        """ A waiting process which died is replaced. """
+        pool = DotWorkerPool(command=ECHO_COMMAND)
+        pool.layout(b'digraph { a }')
+        wait_for_fill(pool)
+        pool._idle_processes[0].kill()
+        pool._idle_processes[0].wait()
+        assert pool.layout(b'digraph { b }') == 'digraph { b }'
+        pool.close()
+
+
+    def test_timeout(self):
+        pool = DotWorkerPool(timeout=0.3, command=SLOW_COMMAND)
+        with self.assertRaises(TimeoutError):
+            pool.layout(b'digraph { a }')
+        pool.close()
+
+
+    def test_layout_timeout(self):
+        """ The timeout of a layout can be shorter than the pool's. """
+        pool = DotWorkerPool(command=SLOW_COMMAND)
+        with self.assertRaises(TimeoutError):
+            pool.layout(b'digraph { a }', timeout=0.3)
+        pool.close()
+
+
+    def test_blocked_input_timeout(self):
+        """ The timeout applies while the code is written, even if dot does
+            not read it (the write is then blocked on a full pipe).
+        """
+        generator = DotDataGenerator()
+        for index in range(100000):
+            generator.add_node(f'node{index}')
+        pool = DotWorkerPool(timeout=0.3, command=NOT_READING_COMMAND)
+        with self.assertRaises(TimeoutError):
+            pool.layout(generator)
+        pool.close()
+
+
+    def test_cancel(self):
+        pool = DotWorkerPool(command=SLOW_COMMAND)
+        cancel_event = Event()
+        cancel_event.set()
+        assert pool.layout(b'digraph { a }', cancel_event) is None
+        pool.close()
+
+
+    def test_failure(self):
+        pool = DotWorkerPool(command=FAILING_COMMAND)
+        with self.assertRaisesRegex(RuntimeError, 'error'):
+            pool.layout(b'digraph { a }')
+        pool.close()
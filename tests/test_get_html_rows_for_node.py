@@ -245,3 +245,21 @@ class TestHTMLRows(TestCase):
             '\t\t</TR>\n'
         actual_out = self._gen._get_html_rows_for_node(label, inputs, outputs)
         assert actual_out == expected_out
+
+
+    def test_label_size(self):
+        """ The label's cell of a node can be given a minimum size, e.g to
+            contain the interior of an expanded cluster.
+        """
+        label = 'cluster'
+        inputs = ['sin0']
+        outputs = ['sout0']
+        expected_out = '\t\t<TR>\n' +\
+            '\t\t\t<TD ROWSPAN="1" PORT="sin0">sin0</TD>\n' +\
+            '\t\t\t<TD ROWSPAN="1" WIDTH="121" HEIGHT="80" VALIGN="TOP">' +\
+            'cluster</TD>\n' +\
+            '\t\t\t<TD ROWSPAN="1" PORT="sout0">sout0</TD>\n' +\
+            '\t\t</TR>\n'
+        actual_out = self._gen._get_html_rows_for_node(label, inputs, outputs,
+                                                       (120.5, 80.))
+        assert actual_out == expected_out
@@ -0,0 +1,90 @@
+from unittest import TestCase
+from hashlib import sha256
+
+from sot_gui.graph_ir import GraphIR, ELLIPSE_NODE, TABLE_NODE, NO_PORT
+from sot_gui.dot_data_generator import DotDataGenerator
+
+
+class TestGraphIR(TestCase):
+    """ Tests for the GraphIR class and its serializers. """
+
+    def setUp(self):
+        # input -> a:sin0, a:sout -> b:sin
+        self._graph_ir = GraphIR({'rankdir': '"LR"'})
+        self._graph_ir.add_table_node('a', 'A(a)', ['sin0', 'sin1'], ['sout'])
+        self._graph_ir.add_ellipse_node('input', '1.0')
+        self._graph_ir.add_table_node('b', 'B(b)', ['sin'], ['sout'])
+        self._graph_ir.add_edge(('input', None), ('a', 'sin0'))
+        self._graph_ir.add_edge(('a', 'sout'), ('b', 'sin'), '2.0')
+
+
+    def test_tables(self):
+        graph_ir = self._graph_ir
+        assert (graph_ir.nodes_nb(), graph_ir.ports_nb(),
+                graph_ir.edges_nb()) == (3, 5, 2)
+        node_id = graph_ir.node_id('input')
+        assert graph_ir.node_kind(node_id) == ELLIPSE_NODE
+        assert graph_ir.node_ports(node_id) == ([], [])
+        assert graph_ir.node_kind(graph_ir.node_id('b')) == TABLE_NODE
+        assert graph_ir.node_ports(0) == (['sin0', 'sin1'], ['sout'])
+        assert graph_ir.edge(0) == (('input', None), ('a', 'sin0'), None)
+        assert graph_ir._edge_tail_ports[0] == NO_PORT
+
+
+    def test_missing_elements(self):
+        with self.assertRaises(ValueError):
+            self._graph_ir.add_edge(('a', 'sout'), ('c', 'sin'))
+        with self.assertRaises(ValueError):
+            self._graph_ir.add_edge(('a', 'sout'), ('b', 'sin3'))
+        with self.assertRaises(ValueError):
+            self._graph_ir.add_ellipse_node('a', '1.0')
+
+
+    def test_dot_serializer(self):
+        """ The dot code is the same as the one built node by node. """
+        expected = DotDataGenerator()
+        expected.set_graph_attributes({'rankdir': '"LR"'})
+        expected.set_node_attributes({'shape': 'ellipse'})
+        expected.add_node('input', {'label': '"1.0"'})
+        expected.set_node_attributes({'shape': 'none'})
+        expected.add_html_node('a', (['sin0', 'sin1'], ['sout']), 'A(a)')
+        expected.add_html_node('b', (['sin'], ['sout']), 'B(b)')
+        expected.add_edge(('input', None), ('a', 'sin0'))
+        expected.add_edge(('a', 'sout'), ('b', 'sin'), {'label': '"2.0"'})
+        assert DotDataGenerator.from_graph_ir(self._graph_ir)\
+            .get_dot_string() == expected.get_dot_string()
+
+
+    def test_layout_data(self):
+        (nodes, edges) = self._graph_ir.layout_data()
+        assert [node.name() for node in nodes] == ['a', 'input', 'b']
+        assert not nodes[1].is_table()
+        assert nodes[2].inputs() == ['sin']
+        assert (edges[1].tail(), edges[1].head(), edges[1].label()) == \
+            (('a', 'sout'), ('b', 'sin'), '2.0')
+
+
+    def test_update_hash(self):
+        def digest(graph_ir: GraphIR) -> str:
+            hash_object = sha256()
+            graph_ir.update_hash(hash_object)
+            return hash_object.hexdigest()
+
+        graph_ir = GraphIR({'rankdir': '"LR"'})
+        graph_ir.add_table_node('a', 'A(a)', ['sin0', 'sin1'], ['sout'])
+        graph_ir.add_ellipse_node('input', '1.0')
+        graph_ir.add_table_node('b', 'B(b)', ['sin'], ['sout'])
+        graph_ir.add_edge(('input', None), ('a', 'sin0'))
+        assert digest(graph_ir) != digest(self._graph_ir)
+        graph_ir.add_edge(('a', 'sout'), ('b', 'sin'), '2.0')
+        assert digest(graph_ir) == digest(self._graph_ir)
+
+
+    def test_portable_hash(self):
+        """ The hash does not depend on the byte order nor on the size of the
+            integers of the computer.
+        """
+        hash_object = sha256()
+        self._graph_ir.update_hash(hash_object)
+        assert hash_object.hexdigest() == ('50eba9d5bc6fee7bbe7d9b075b0b6f4c'
+                                           '049bff30a7ce3f15f7c3273797548339')
@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from sot_gui.html_table_geometry import (html_table_rows, TableGeometry,
+    TableMetrics, INPUT, LABEL, OUTPUT)
+
+
+class TestHtmlTableGeometry(TestCase):
+    """ Tests for the geometry of the html tables computed without dot. """
+
+    def setUp(self):
+        # Texts of 10 points per character, cells of 20 points per row and 5
+        # points of padding:
+        self._metrics = TableMetrics(char_width=10., row_height=20.,
+                                     cell_padding=5.)
+
+
+    def test_rows(self):
+        """ The rows have the same structure as DotDataGenerator's tables. """
+        assert html_table_rows(['sin0', 'sin1', 'sin2'], ['sout']) == [
+            [(INPUT, 'sin0', 1), (LABEL, None, 3), (OUTPUT, 'sout', 3)],
+            [(INPUT, 'sin1', 1)],
+            [(INPUT, 'sin2', 1)],
+        ]
+        assert html_table_rows([], ['sout0', 'sout1']) == [
+            [(LABEL, None, 2), (OUTPUT, 'sout0', 1)],
+            [(OUTPUT, 'sout1', 1)],
+        ]
+        with self.assertRaises(RuntimeError):
+            html_table_rows(['sin'], [])
+
+
+    def test_cells(self):
+        table = TableGeometry('entity', ['a', 'bb', 'c'], ['out'],
+                              self._metrics)
+        assert table.columns() == (30., 70., 40.)
+        assert (table.width(), table.height()) == (140., 60.)
+
+        rects = {cell.text(): cell.rect() for cell in table.cells()}
+        assert rects['bb'] == (0., 20., 30., 20.)
+        assert rects['entity'] == (30., 0., 70., 60.)
+        assert rects['out'] == (100., 0., 40., 60.)
+
+
+    def test_port_anchors(self):
+        """ The edges are plugged to the middle of the outer side of the
+            ports' cells.
+        """
+        table = TableGeometry('entity', ['a', 'b', 'c'], ['x', 'y'],
+                              self._metrics)
+        assert table.port_anchors(INPUT) == {'a': (0., 10.), 'b': (0., 30.),
+                                             'c': (0., 50.)}
+        # The last output spans the remaining rows:
+        assert table.port_anchors(OUTPUT) == {'x': (110., 10.),
+                                              'y': (110., 40.)}
+
+
+    def test_label_size(self):
+        table = TableGeometry('cluster', ['a'], ['x'], self._metrics,
+                              label_size=(200., 100.))
+        assert (table.width(), table.height()) == (240., 100.)
+        label_cell = [cell for cell in table.cells()
+                      if cell.type() == LABEL][0]
+        # The label is at the top of its cell:
+        assert label_cell.text_center() == (120., 10.)
+
+
+    def test_resized(self):
+        """ A resized table keeps its ports' columns, and its label's column
+            takes the difference of width.
+        """
+        table = TableGeometry('entity', ['a', 'b'], ['x'], self._metrics)
+        resized = table.resized(150., 80.)
+        assert resized.columns() == (20., 110., 20.)
+        assert resized.height() == 80.
+        assert resized.port_anchors(INPUT)['b'] == (0., 60.)
+        # The original geometry is unchanged:
+        assert table.columns() == (20., 70., 20.)
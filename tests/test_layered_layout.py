@@ -0,0 +1,149 @@
+from unittest import TestCase
+
+from sot_gui.layered_layout import LayeredLayout
+from sot_gui.graph_ir import LayoutNode, LayoutEdge
+
+
+class TestLayeredLayout(TestCase):
+    """ Tests for the LayeredLayout class. """
+
+    def setUp(self):
+        self._nodes = [
+            LayoutNode('input', '3.0'),
+            LayoutNode('a', 'A(a)', ['sin0', 'sin1'], ['sout']),
+            LayoutNode('b', 'B(b)', ['sin'], ['sout0', 'sout1']),
+            LayoutNode('c', 'C(c)', ['sin0', 'sin1'], ['sout']),
+        ]
+        self._edges = [
+            LayoutEdge(('input', None), ('a', 'sin0')),
+            LayoutEdge(('a', 'sout'), ('b', 'sin'), '1.5'),
+            LayoutEdge(('b', 'sout0'), ('c', 'sin0'), '2.0'),
+            # Spanning two ranks:
+            LayoutEdge(('a', 'sout'), ('c', 'sin1'), '7.0'),
+            # Making a cycle:
+            LayoutEdge(('c', 'sout'), ('a', 'sin1'), '9.0'),
+        ]
+
+
+    def _get_nodes_data(self, output: dict) -> dict:
+        return {node['name']: node for node in output['objects']}
+
+
+    def test_output_format(self):
+        """ The output has the format of dot's json output. """
+        output = LayeredLayout().layout(self._nodes, self._edges)
+        nodes_data = self._get_nodes_data(output)
+
+        assert len(output['bb'].split(',')) == 4
+        assert '_draw_' in nodes_data['input']
+        assert '_draw_' not in nodes_data['a']
+        # The first cell of a table is its first input, then its label:
+        texts = [data['text'] for data in nodes_data['a']['_ldraw_']
+                 if data['op'] == 'T']
+        assert texts[:2] == ['sin0', 'A(a)']
+        assert sorted(texts) == sorted(['sin0', 'sin1', 'A(a)', 'sout'])
+
+        assert len(output['edges']) == 5
+        for edge in output['edges']:
+            points = edge['_draw_'][1]['points']
+            # Bezier splines: 3 points per curve, plus the first one
+            assert len(points) % 3 == 1
+        # The ports are given as in dot's output:
+        edges_per_ports = {(edge['tailport'], edge['headport'])
+                           for edge in output['edges']}
+        assert ('e', 'sin0:w') in edges_per_ports
+        assert ('sout0:e', 'sin0:w') in edges_per_ports
+
+
+    def test_ranks(self):
+        """ The nodes are laid out from left to right, following the edges. """
+        layout = LayeredLayout()
+        output = layout.layout(self._nodes, self._edges)
+        assert layout._ranks == {'input': 0, 'a': 1, 'b': 2, 'c': 3}
+
+        edges_per_head = {edge['head']: edge for edge in output['edges']}
+        spanning_edge = [edge for edge in output['edges']
+                         if edge['tail'] == 1 and edge['head'] == 3][0]
+        # The edge spanning two ranks goes through a dummy node:
+        assert len(spanning_edge['_draw_'][1]['points']) == 7
+        assert edges_per_head[2]['_draw_'][1]['points'][0][0] < \
+            edges_per_head[2]['_draw_'][1]['points'][-1][0]
+
+
+    def test_incremental_ranks(self):
+        """ The nodes keep their rank when a node is added. """
+        layout = LayeredLayout()
+        layout.layout(self._nodes, self._edges)
+
+        nodes = self._nodes + [LayoutNode('d', 'D(d)', ['sin'], ['sout'])]
+        edges = self._edges + [LayoutEdge(('b', 'sout1'), ('d', 'sin'), '4.0')]
+        layout.layout(nodes, edges)
+        assert layout._ranks == {'input': 0, 'a': 1, 'b': 2, 'c': 3, 'd': 3}
+
+
+    def test_incremental_positions(self):
+        """ The nodes keep their vertical position when a node is added. """
+        layout = LayeredLayout()
+        output = layout.layout(self._nodes, self._edges)
+        centers = dict(layout._centers)
+
+        nodes = self._nodes + [LayoutNode('d', 'D(d)', ['sin'], ['sout'])]
+        edges = self._edges + [LayoutEdge(('b', 'sout1'), ('d', 'sin'), '4.0')]
+        new_output = layout.layout(nodes, edges)
+        for name in centers:
+            assert layout._centers[name] == centers[name]
+
+        # The drawing can only be translated (e.g if `d` is above the others):
+        def label_ys(output: dict) -> list:
+            return [data['pt'][1] for node in output['objects'][:4]
+                    for data in node.get('_ldraw_', []) if data['op'] == 'T']
+        differences = {new_y - y for (y, new_y) in zip(label_ys(output),
+                                                       label_ys(new_output))}
+        assert len({round(difference, 6) for difference in differences}) == 1
+
+
+    def test_retain(self):
+        """ The removed nodes are forgotten, the others keep their rank. """
+        layout = LayeredLayout()
+        layout.layout(self._nodes, self._edges)
+        layout.retain({'input', 'a'})
+        assert layout._ranks == {'input': 0, 'a': 1}
+        assert set(layout._centers) == {'input', 'a'}
+
+
+    def test_no_overlap(self):
+        """ The nodes of a rank do not overlap. """
+        nodes = [LayoutNode('input', '1')] + [
+            LayoutNode(f"n{i}", f"N(n{i})", ['sin'], ['sout'])
+            for i in range(5)]
+        edges = [LayoutEdge(('input', None), (f"n{i}", 'sin'))
+                 for i in range(5)]
+        output = LayeredLayout().layout(nodes, edges)
+
+        tops_and_bottoms = []
+        for node in output['objects'][1:]:
+            ys = [point[1] for data in node['_ldraw_'] if data['op'] == 'p'
+                  for point in data['points']]
+            tops_and_bottoms.append((min(ys), max(ys)))
+        tops_and_bottoms.sort()
+        for (first, second) in zip(tops_and_bottoms[:-1],
+                                   tops_and_bottoms[1:]):
+            assert first[1] <= second[0]
+
+
+    def test_label_size(self):
+        """ A table whose label's cell is sized (e.g an expanded cluster) is at
+            least as big as its label's cell.
+        """
+        nodes = [LayoutNode('cluster', 'cluster', ['sin'], ['sout'],
+                            (200., 150.))]
+        output = LayeredLayout().layout(nodes, [])
+        (x_min, y_min, x_max, y_max) = [float(coord) for coord
+                                        in output['bb'].split(',')]
+        assert x_max - x_min >= 200.
+        assert y_max - y_min >= 150.
+
+
+    def test_unknown_node(self):
+        with self.assertRaises(ValueError):
+            LayeredLayout().layout(self._nodes[:1], self._edges)
@@ -0,0 +1,88 @@
+from unittest import TestCase
+
+from sot_gui.layout_budget import LayoutBudget, LayoutMode
+
+
+class TestLayoutBudget(TestCase):
+    """ Tests for the LayoutBudget class. """
+
+    def setUp(self):
+        self._full = LayoutMode('full', {}, 1e-2)
+        self._fast = LayoutMode('fast', {'splines': 'line'}, 1e-3)
+        self._modes = [self._full, self._fast]
+
+
+    def test_modes_for_size(self):
+        budget = LayoutBudget(1., self._modes)
+        # 0.01 * 10 ** 1.5 ~ 0.3 s:
+        assert budget.modes_for_size(10) == [self._full, self._fast]
+        # 0.01 * 100 ** 1.5 = 10 s and 0.001 * 100 ** 1.5 = 1 s:
+        assert budget.modes_for_size(100) == [self._fast]
+        # The fastest mode is used even if it does not fit:
+        assert budget.modes_for_size(1000) == [self._fast]
+
+        budget.set_budget(None)
+        assert budget.modes_for_size(1000) == [self._full]
+
+
+    def test_default_budget(self):
+        """ There is no budget by default: a mid-size graph (e.g 150 entities,
+            with their input values and edges) is laid out with dot's default
+            settings.
+        """
+        budget = LayoutBudget()
+        assert budget.budget() is None
+        assert budget.modes_for_size(600)[0].name() == 'full'
+
+
+    def test_retry(self):
+        """ A skipped mode is tried again periodically, so that a wrong
+            estimate can be corrected.
+        """
+        budget = LayoutBudget(1., self._modes)
+        for _ in range(LayoutBudget.RETRY_PERIOD - 1):
+            assert budget.modes_for_size(100) == [self._fast]
+        assert budget.modes_for_size(100) == [self._full, self._fast]
+        # The measured durations correct the estimate:
+        for _ in range(10):
+            budget.record(self._full, 100, 0.2)
+        assert budget.modes_for_size(100) == [self._full, self._fast]
+
+
+    def test_record(self):
+        """ The estimates are updated with the measured durations. """
+        budget = LayoutBudget(1., self._modes)
+        for _ in range(20):
+            budget.record(self._full, 100, 0.5)
+        self.assertAlmostEqual(budget.estimate(self._full, 100), 0.5, 2)
+        assert budget.modes_for_size(100) == [self._full, self._fast]
+
+
+    def test_record_timeout(self):
+        budget = LayoutBudget(1., self._modes)
+        budget.record_timeout(self._full, 10, 2.)
+        self.assertAlmostEqual(budget.estimate(self._full, 10), 2.)
+        assert budget.modes_for_size(10) == [self._fast]
+        # A timeout does not lower the estimate:
+        budget.record_timeout(self._full, 10, 0.5)
+        self.assertAlmostEqual(budget.estimate(self._full, 10), 2.)
+
+
+    def test_timeout(self):
+        """ The attempts share the time left before a single deadline. """
+        budget = LayoutBudget(1., self._modes)
+        deadline = budget.deadline()
+        assert 0.9 < budget.timeout(deadline, last_mode=False) <= 1.
+        # Once the deadline has passed, only the last mode gets some time:
+        assert budget.timeout(deadline - 2., last_mode=False) < 0.
+        assert budget.timeout(deadline - 2., last_mode=True) == \
+            LayoutBudget.FALLBACK_SHARE
+
+        budget.set_budget(None)
+        assert budget.deadline() is None
+        assert budget.timeout(deadline, last_mode=True) is None
+
+
+    def test_invalid_budget(self):
+        with self.assertRaises(ValueError):
+            LayoutBudget(0.)
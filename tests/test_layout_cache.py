@@ -0,0 +1,127 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from pathlib import Path
+
+from sot_gui.layout_cache import LayoutCache
+from sot_gui.dot_data_generator import DotDataGenerator
+
+
+class TestLayoutCache(TestCase):
+    """ Tests for the LayoutCache class. """
+
+    def setUp(self):
+        self._tmp_dir = TemporaryDirectory()
+        self._cache_dir = Path(self._tmp_dir.name) / 'layouts'
+
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+
+    def test_memory_cache(self):
+        # Each layout is 13 characters long, so that two of them fit:
+        cache = LayoutCache(max_memory_size=30, max_disk_size=0)
+        cache.put(b'digraph { a }', '{"name": "a"}')
+        cache.put(b'digraph { b }', '{"name": "b"}')
+        # Using the first layout makes the second one the least recently used:
+        assert cache.get(b'digraph { a }') == '{"name": "a"}'
+        cache.put(b'digraph { c }', '{"name": "c"}')
+
+        assert cache.get(b'digraph { b }') is None
+        assert cache.get(b'digraph { a }') == '{"name": "a"}'
+        assert cache.get(b'digraph { c }') == '{"name": "c"}'
+        assert not self._cache_dir.exists()
+
+
+    def test_memory_size_bound(self):
+        """ The memory cache is bounded by the size of the layouts, not by
+            their number: many small layouts are kept, and a big layout evicts
+            the others.
+        """
+        cache = LayoutCache(max_memory_size=1000, max_disk_size=0)
+        for i in range(50):
+            cache.put(f'digraph {{ n{i} }}'.encode(), 'x' * 10)
+        assert all(cache.get(f'digraph {{ n{i} }}'.encode()) is not None
+                   for i in range(50))
+
+        cache.put(b'digraph { big }', 'x' * 2000)
+        assert cache.get(b'digraph { big }') == 'x' * 2000
+        assert cache.get(b'digraph { n49 }') is None
+
+
+    def test_disk_cache(self):
+        """ The layouts cached on disk can be used by another cache (e.g after
+            the GUI was reopened).
+        """
+        cache = LayoutCache(self._cache_dir)
+        cache.put(b'digraph { a }', '{"name": "a"}')
+
+        other_cache = LayoutCache(self._cache_dir)
+        assert other_cache.get(b'digraph { a }') == '{"name": "a"}'
+        assert other_cache.get(b'digraph { b }') is None
+
+        other_cache.clear()
+        assert LayoutCache(self._cache_dir).get(b'digraph { a }') is None
+
+
+    def test_disk_size_bound(self):
+        layout = 'x' * 100
+        cache = LayoutCache(self._cache_dir, max_memory_size=100,
+                            max_disk_size=250)
+        for i in range(5):
+            cache.put(f'digraph {{ n{i} }}'.encode(), layout)
+
+        files = list(self._cache_dir.glob('*.json'))
+        assert sum(file.stat().st_size for file in files) <= 250
+        assert cache.get(b'digraph { n4 }') == layout
+
+
+    def test_existing_disk_files(self):
+        """ The files written before the cache was created count in the size
+            of the disk cache, and are deleted first.
+        """
+        layout = 'x' * 100
+        LayoutCache(self._cache_dir).put(b'digraph { old }', layout)
+
+        cache = LayoutCache(self._cache_dir, max_memory_size=100,
+                            max_disk_size=250)
+        for i in range(2):
+            cache.put(f'digraph {{ n{i} }}'.encode(), layout)
+        assert len(list(self._cache_dir.glob('*.json'))) == 2
+        assert cache.get(b'digraph { old }') is None
+        assert cache.get(b'digraph { n0 }') == layout
+
+
+    def test_output_formats(self):
+        """ The layouts of the same dot code in different output formats are
+            cached separately.
+        """
+        cache = LayoutCache(max_disk_size=0)
+        cache.put(b'digraph { a }', '{"name": "a"}')
+        assert cache.get(b'digraph { a }', 'json0') is None
+
+        cache.put(b'digraph { a }', '{"bb": "0,0,1,1"}', 'json0')
+        assert cache.get(b'digraph { a }', 'json0') == '{"bb": "0,0,1,1"}'
+        assert cache.get(b'digraph { a }') == '{"name": "a"}'
+
+
+    def test_parsed_layout(self):
+        """ A parsed layout is only cached in memory. """
+        cache = LayoutCache(self._cache_dir)
+        cache.put(b'digraph { a }', {'name': 'a'}, 'json0-rendered')
+
+        assert cache.get(b'digraph { a }', 'json0-rendered') == {'name': 'a'}
+        other_cache = LayoutCache(self._cache_dir)
+        assert other_cache.get(b'digraph { a }', 'json0-rendered') is None
+
+
+    def test_dot_data_generator(self):
+        """ A DotDataGenerator has the same key as its encoded dot code. """
+        generator = DotDataGenerator()
+        generator.add_node('a')
+        cache = LayoutCache(max_disk_size=0)
+        assert cache.key(generator) == \
+            cache.key(generator.get_encoded_dot_string())
+        cache.put(generator, '{"name": "a"}')
+        assert cache.get(generator.get_encoded_dot_string()) == \
+            '{"name": "a"}'
@@ -0,0 +1,91 @@
+from unittest import TestCase
+import json
+
+from sot_gui.graph_ir import LayoutNode, LayoutEdge
+from sot_gui.lean_layout import render_lean_layout
+
+
+# dot's json0 output (without the xdot drawing operations) for:
+# input -> a:sin0, a:sout -> b:sin
+LEAN_OUTPUT = json.dumps({
+    'name': 'G', 'directed': True, 'strict': False, 'bb': '0,0,300,80',
+    '_subgraph_cnt': 0,
+    'objects': [
+        {'_gvid': 0, 'name': 'input', 'pos': '27,40', 'width': '0.75',
+         'height': '0.5'},
+        {'_gvid': 1, 'name': 'a', 'pos': '140,40', 'width': '1.25',
+         'height': '0.75'},
+        {'_gvid': 2, 'name': 'b', 'pos': '260,40', 'width': '1',
+         'height': '0.375'},
+    ],
+    'edges': [
+        {'_gvid': 0, 'tail': 0, 'head': 1, 'tailport': 'e',
+         'headport': 'sin0:w', 'pos': 'e,95,50 54,40 64,40 75,50 85,50'},
+        {'_gvid': 1, 'tail': 1, 'head': 2, 'tailport': 'sout:e',
+         'headport': 'sin:w', 'pos': 'e,224,40 185,40 195,40 205,40 214,40',
+         'label': '1.5', 'lp': '200,52'},
+    ],
+})
+
+
+class TestLeanLayout(TestCase):
+    """ Tests for the render_lean_layout function. """
+
+    def setUp(self):
+        self._nodes = [
+            LayoutNode('input', '3.0'),
+            LayoutNode('a', 'A(a)', ['sin0', 'sin1'], ['sout']),
+            LayoutNode('b', 'B(b)', ['sin'], ['sout']),
+        ]
+        self._edges = [
+            LayoutEdge(('input', None), ('a', 'sin0')),
+            LayoutEdge(('a', 'sout'), ('b', 'sin'), '1.5'),
+        ]
+
+
+    def _get_nodes_data(self, output: dict) -> dict:
+        return {node['name']: node for node in output['objects']}
+
+
+    def test_output_format(self):
+        """ The output has the format of dot's full json output, with the
+            nodes drawn in the boxes computed by dot.
+        """
+        output = render_lean_layout(LEAN_OUTPUT, self._nodes, self._edges)
+        nodes_data = self._get_nodes_data(output)
+
+        assert output['bb'] == '0,0,300.00,80.00'
+        assert nodes_data['input']['_draw_'][1]['rect'] == [27., 40., 27., 18.]
+        texts = [data['text'] for data in nodes_data['a']['_ldraw_']
+                 if data['op'] == 'T']
+        assert texts == ['sin0', 'A(a)', 'sout', 'sin1']
+
+        # The table of `a` fills its box: 90 x 54 points around (140, 40)
+        points = [point for data in nodes_data['a']['_ldraw_']
+                  if data['op'] == 'p' for point in data['points']]
+        assert min(x for (x, _) in points) == 95.
+        assert max(x for (x, _) in points) == 185.
+        assert min(y for (_, y) in points) == 13.
+        assert max(y for (_, y) in points) == 67.
+
+
+    def test_edges(self):
+        """ The edges keep dot's splines and label positions. """
+        output = render_lean_layout(LEAN_OUTPUT, self._nodes, self._edges)
+        (first_edge, second_edge) = output['edges']
+
+        assert (first_edge['tail'], first_edge['head']) == (0, 1)
+        assert first_edge['_draw_'][1]['points'] == \
+            [[54., 40.], [64., 40.], [75., 50.], [85., 50.]]
+        assert first_edge['_hdraw_'][2]['points'][1] == [95., 50.]
+        assert '_ldraw_' not in first_edge
+
+        label = second_edge['_ldraw_'][-1]
+        assert label['text'] == '1.5'
+        assert label['pt'][0] == 200.
+
+
+    def test_missing_edge(self):
+        edges = self._edges + [LayoutEdge(('a', 'sout'), ('b', 'sin'))]
+        with self.assertRaises(ValueError):
+            render_lean_layout(LEAN_OUTPUT, self._nodes, edges)
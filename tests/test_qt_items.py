@@ -9,8 +9,9 @@ from PySide2.QtWidgets import QGraphicsItem
 from sot_ipython_connection.sot_kernel import SOTKernel
 from sot_ipython_connection.app.sot_script_executer import (main as
     script_executer)
-from sot_gui.graph import Graph
+from sot_gui.graph import Graph, _get_value_overlay
 from sot_gui.dynamic_graph_communication import DynamicGraphCommunication
+from sot_gui.layout_cache import LayoutCache
 
 
 input_scripts_dir = str(Path(__file__).resolve().parent/'dg_scripts')
@@ -48,11 +49,15 @@ class TestQtItems(TestCase):
         self._kernel.run_non_blocking()
         self._script_executer = script_executer
 
-        self._graph = Graph(DynamicGraphCommunication())
+        # The layouts are only cached in memory, so that the tests do not
+        # write in the user's cache directory:
+        self._graph = Graph(DynamicGraphCommunication(),
+                            LayoutCache(max_disk_size=0))
 
 
     def tearDown(self):
         # Terminating the kernel subprocess
+        self._graph.close()
         del self._graph
         self._kernel.stop_non_blocking()
 
@@ -75,6 +80,12 @@ class TestQtItems(TestCase):
         return nb_qt_items
 
 
+    def _run_script(self, filename: str) -> None:
+        """ Runs a script (located in ./dg_scripts) on the kernel. """
+        script_path = str(Path(input_scripts_dir)/filename)
+        self._script_executer([script_path])
+
+
     def _check_nb_items_for_file(self, filename: str, nb_items: int) -> bool:
         """ Checks the number of qt items generated for a dynamic graph
             initialized via a script.
@@ -89,8 +100,7 @@ class TestQtItems(TestCase):
             True if the number of generated items corresponds to nb_items. If
             not, returns False.
         """
-        script_path = str(Path(input_scripts_dir)/filename)
-        self._script_executer([script_path])
+        self._run_script(filename)
 
         self._graph.refresh_graph_data()
         self._graph.generate_qt_items()
@@ -128,3 +138,219 @@ class TestQtItems(TestCase):
         self._graph.generate_qt_items()
         qt_items = self._graph.get_qt_items()
         assert len(qt_items) == 0
+
+
+    def test_incremental_refresh(self):
+        """ Checks that a refresh only applies the changes of the graph, and
+            keeps the existing nodes and clusters.
+        """
+        self._run_script('normal_dg.py')
+        self._graph.refresh_graph_data()
+        node_a = self._graph._get_node_per_name('a')
+        node_c = self._graph._get_node_per_name('c')
+        cluster = self._graph.add_cluster('cluster', [node_a, node_c])
+
+        # Nothing changed in the graph:
+        changes = self._graph.refresh_graph_data()
+        assert not changes.topology_changed()
+
+        self._run_script('added_entity.py')
+        changes = self._graph.refresh_graph_data()
+        assert sorted(node.name() for node in changes.added_nodes) == \
+            ['d', 'input_d_sin1']
+        assert changes.removed_nodes == []
+        assert len(changes.added_edges) == 2
+        assert self._graph._get_node_per_name('a') is node_a
+        assert self._graph.clusters() == [cluster]
+
+
+    def test_lazy_refresh_keeps_values(self):
+        """ Checks that a refresh fetching no values does not replace the
+            loaded values of the kept elements.
+        """
+        self._run_script('normal_dg.py')
+        self._graph.set_lazy_values(True)
+        self._graph.refresh_graph_data()
+        self._graph.load_values([('c', 'sin0')])
+        node_c = self._graph._get_node_per_name('c')
+        edge = node_c.get_port_per_name('sin0').edge()
+        assert edge.value() == 3
+        # The value is no longer cached, and must be kept anyway:
+        self._graph._value_cache.clear()
+
+        self._run_script('added_entity.py')
+        changes = self._graph.refresh_graph_data()
+        assert changes.topology_changed()
+        assert edge.value() == 3
+
+
+    def test_copy_model(self):
+        """ Checks that a refresh applied to a copy of the graph does not
+            modify the graph until the copy is adopted.
+        """
+        self._run_script('normal_dg.py')
+        self._graph.refresh_graph_data()
+        node_a = self._graph._get_node_per_name('a')
+        self._graph.generate_qt_items()
+        dot_code = self._graph._get_encoded_dot_code()
+
+        self._run_script('added_entity.py')
+        model = self._graph.copy_model()
+        changes = model.apply_graph_update(self._graph.fetch_graph_update())
+        assert changes.topology_changed()
+        assert self._graph._get_encoded_dot_code() == dot_code
+        model_node_a = model._get_node_per_name('a')
+        assert model_node_a is not node_a
+        assert model_node_a.qt_item() is node_a.qt_item()
+
+        copies = self._graph.adopt_model(model)
+        assert copies[node_a] is model_node_a
+        assert self._graph._get_node_per_name('d') is not None
+        # The fingerprint was adopted along with the data:
+        update = self._graph.fetch_graph_update()
+        assert not update.topology_changed()
+
+
+    def test_connected_components(self):
+        """ Checks that the graph is split into its weakly connected
+            components, which are laid out separately.
+        """
+        self._run_script('partially_linked_nodes.py')
+        self._graph.refresh_graph_data()
+
+        components = self._graph._get_components()
+        assert [sorted(node.name() for node in component)
+                for component in components] == \
+            [['a', 'input_a_sin0'], ['b', 'c', 'input_b_sin1']]
+        (layouts, cluster_layouts) = self._graph.compute_layout()
+        assert len(layouts) == 2
+        assert cluster_layouts == {}
+
+
+    def test_batched_components(self):
+        """ Checks that the isolated nodes are laid out together, with a single
+            dot run.
+        """
+        self._run_script('no_linked_nodes.py')
+        self._graph.refresh_graph_data()
+
+        assert len(self._graph._get_components()) == 3
+        (layouts, _) = self._graph.compute_layout()
+        assert len(layouts) == 1
+        self._graph.generate_qt_items()
+        for name in ('a', 'b', 'c'):
+            assert self._graph._get_node_per_name(name).qt_item() is not None
+
+
+    def test_expanded_cluster(self):
+        """ Checks that the interior of an expanded cluster is laid out
+            separately, and displayed inside the cluster's node.
+        """
+        self._run_script('normal_dg.py')
+        self._graph.refresh_graph_data()
+        node_a = self._graph._get_node_per_name('a')
+        node_c = self._graph._get_node_per_name('c')
+        cluster = self._graph.add_cluster('cluster', [node_a, node_c])
+        self._graph.generate_qt_items()
+        assert node_a.qt_item() is None
+
+        self._graph.set_cluster_expanded('cluster', True)
+        (_, cluster_layouts) = self._graph.compute_layout()
+        assert list(cluster_layouts) == [cluster.name()]
+        self._graph.generate_qt_items()
+        cluster_rect = cluster.qt_item().sceneBoundingRect()
+        for node in (node_a, node_c):
+            assert cluster_rect.contains(node.qt_item().sceneBoundingRect())
+
+        # The edge from b is continued inside the cluster, up to c:
+        cluster_port = cluster.get_cluster_port_per_node_port(
+            node_c.inputs()[1])
+        interior_item = cluster_port.interior_edge_qt_item()
+        assert interior_item is not None
+        assert interior_item in self._graph.get_qt_items()
+        assert self._graph.get_elem_per_qt_item(interior_item) \
+            is cluster_port.edge()
+
+
+    def test_stable_layout(self):
+        """ Checks that, with a stable layout, the qt items of the components
+            which did not change are kept when the layout is computed again.
+        """
+        self._run_script('partially_linked_nodes.py')
+        self._graph.set_stable_layout(True)
+        self._graph.refresh_graph_data()
+        self._graph.generate_qt_items()
+        node_a_item = self._graph._get_node_per_name('a').qt_item()
+
+        self._graph.generate_qt_items()
+        assert self._graph._get_node_per_name('a').qt_item() is node_a_item
+
+
+    def test_value_overlays(self):
+        """ Checks that, with value overlays, the layout does not depend on the
+            values, which are displayed by overlay items updated in place.
+        """
+        self._run_script('normal_dg.py')
+        self._graph.set_value_overlays(True)
+        self._graph.refresh_graph_data()
+        dot_code = self._graph._get_encoded_dot_code()
+
+        edge = [port.edge() for port in
+                self._graph._get_node_per_name('c').inputs()
+                if port.edge() is not None][0]
+        edge.set_value(123456789.)
+        assert self._graph._get_encoded_dot_code() == dot_code
+
+        self._graph.generate_qt_items()
+        overlay = _get_value_overlay(edge.qt_item())
+        assert overlay.toPlainText() == '123456789.0'
+        edge.set_value(2.)
+        self._graph.update_qt_items_values()
+        assert _get_value_overlay(edge.qt_item()) is overlay
+        assert overlay.toPlainText() == '2.0'
+
+
+    def test_canonical_dot(self):
+        """ Checks that the canonical dot code does not depend on the order of
+            the kernel's data nor on the values.
+        """
+        self._run_script('normal_dg.py')
+        self._graph.set_canonical_dot(True)
+        self._graph.refresh_graph_data()
+        dot_code = self._graph._get_encoded_dot_code()
+        digest = self._graph.structural_digest()
+
+        self._graph._dg_entities.reverse()
+        self._graph._input_nodes.reverse()
+        for port in self._graph._get_node_per_name('c').inputs():
+            if port.edge() is not None:
+                port.edge().set_value(42.)
+        assert self._graph._get_encoded_dot_code() == dot_code
+        assert self._graph.structural_digest() == digest
+
+        # The digest does not depend on the mode:
+        self._graph.set_canonical_dot(False)
+        assert self._graph.structural_digest() == digest
+
+
+    def test_canonical_cluster_names(self):
+        """ Checks that the name of a cluster, which is part of the canonical
+            dot code, only depends on its nodes, and not on the clusters
+            created before it.
+        """
+        self._run_script('normal_dg.py')
+        self._graph.set_canonical_dot(True)
+        self._graph.refresh_graph_data()
+        node_a = self._graph._get_node_per_name('a')
+        node_c = self._graph._get_node_per_name('c')
+        cluster = self._graph.add_cluster('cluster', [node_a, node_c])
+        dot_code = self._graph._get_encoded_dot_code()
+        digest = self._graph.structural_digest()
+
+        self._graph.remove_cluster('cluster')
+        self._graph.add_cluster('other', [node_a, node_c])
+        self._graph.remove_cluster('other')
+        new_cluster = self._graph.add_cluster('cluster', [node_c, node_a])
+        assert new_cluster.name() == cluster.name()
+        assert self._graph._get_encoded_dot_code() == dot_code
+        assert self._graph.structural_digest() == digest
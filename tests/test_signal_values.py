@@ -0,0 +1,58 @@
+from unittest import TestCase
+from math import sqrt
+
+from sot_gui import kernel_helpers
+from sot_gui.signal_values import (SignalArray, SignalValueSummary,
+                                   decode_value, value_label)
+
+
+class TestSignalValues(TestCase):
+    """ Tests for the compact encoding of the signals' values sent by the
+        kernel, and for their decoding.
+    """
+
+    def test_non_array_values(self):
+        """ Values which are not numeric vectors or matrices are sent as is. """
+        for value in [1.5, 3, True, 'string', None, (), ('a', 'b'),
+                      ((1.0, 2.0), (3.0,))]:
+            encoded = kernel_helpers._encode_value(value)
+            assert encoded == value
+            assert decode_value(encoded) == value
+
+
+    def test_vector(self):
+        value = (1.0, -2.5, 3)
+        encoded = kernel_helpers._encode_value(value)
+        assert encoded[0] == kernel_helpers.ARRAY_MARKER
+
+        decoded = decode_value(encoded)
+        assert decoded == SignalArray((3,), [1.0, -2.5, 3.0])
+        assert str(decoded) == '(1.0, -2.5, 3.0)'
+        assert value_label(decoded) == '(1.0, -2.5, 3.0)'
+
+
+    def test_matrix(self):
+        value = ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+        decoded = decode_value(kernel_helpers._encode_value(value))
+        assert decoded.shape() == (3, 3)
+        assert decoded.to_tuple() == value
+        assert str(decoded) == str(value)
+        # Too many elements to be displayed in the graph:
+        assert value_label(decoded) == 'matrix(3x3)'
+
+
+    def test_large_value(self):
+        """ Large values are only sent as a summary, unless the full value is
+            requested.
+        """
+        size = kernel_helpers.LARGE_VALUE_SIZE + 1
+        value = [float(i) for i in range(size)]
+
+        summary = decode_value(kernel_helpers._encode_value(value))
+        expected_norm = sqrt(sum(i * i for i in range(size)))
+        assert summary == SignalValueSummary((size,), 0.0, size - 1.0,
+                                             expected_norm)
+        assert value_label(summary) == f'vector({size})'
+
+        full_value = decode_value(kernel_helpers._encode_value(value, None))
+        assert full_value == SignalArray((size,), value)
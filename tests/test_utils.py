@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+from sot_gui.utils import quoted, natural_sort_key, dot_port_name
+
+
+class TestUtils(TestCase):
+    """ Tests for the dot strings helpers of utils.py. """
+
+    def test_quoted(self):
+        assert quoted('LR') == '"LR"'
+        # The double quotes and backslashes are escaped:
+        assert quoted('say "hi"') == '"say \\"hi\\""'
+        assert quoted('a\\') == '"a\\\\"'
+        assert quoted('a\\"') != quoted('a"')
+
+
+    def test_natural_sort_key(self):
+        names = ['sin10', 'sout', 'sin2', 'sin', 'sin1']
+        assert sorted(names, key=natural_sort_key) == \
+            ['sin', 'sin1', 'sin2', 'sin10', 'sout']
+
+
+    def test_dot_port_name(self):
+        assert dot_port_name('sout0:e') == 'sout0'
+        assert dot_port_name('sin:w') == 'sin'
+        assert dot_port_name('sin') == 'sin'
+        # Only a compass point, or no port:
+        assert dot_port_name('e') is None
+        assert dot_port_name(None) is None
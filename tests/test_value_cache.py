@@ -0,0 +1,49 @@
+from unittest import TestCase
+from time import sleep
+
+from sot_gui.value_cache import ValueCache
+
+
+class TestValueCache(TestCase):
+    """ Tests for the ValueCache class. """
+
+    def test_get_put(self):
+        cache = ValueCache()
+        assert cache.get(('add1', 'sin0')) is None
+
+        cache.put(('add1', 'sin0'), 1.5, 10)
+        assert cache.get(('add1', 'sin0')) == (1.5, 10)
+
+        cache.update({'add1': {'sin0': (2.0, 11), 'sout': (3.0, 11)}})
+        assert cache.get(('add1', 'sin0')) == (2.0, 11)
+        assert cache.missing([('add1', 'sout'), ('add2', 'sin0')]) \
+            == [('add2', 'sin0')]
+
+
+    def test_ttl(self):
+        cache = ValueCache(ttl=0.05)
+        cache.put(('add1', 'sin0'), 1.5, 10)
+        sleep(0.1)
+        assert cache.get(('add1', 'sin0')) is None
+        assert len(cache) == 0
+
+
+    def test_lru_eviction(self):
+        cache = ValueCache(max_entries=2)
+        cache.put(('add1', 'sin0'), 1.0, 0)
+        cache.put(('add1', 'sin1'), 2.0, 0)
+        # Using the first entry makes the second one the least recently used:
+        cache.get(('add1', 'sin0'))
+        cache.put(('add1', 'sout'), 3.0, 0)
+
+        assert len(cache) == 2
+        assert cache.get(('add1', 'sin1')) is None
+        assert cache.get(('add1', 'sin0')) == (1.0, 0)
+        assert cache.get(('add1', 'sout')) == (3.0, 0)
+
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            ValueCache(ttl=0)
+        with self.assertRaises(ValueError):
+            ValueCache(max_entries=0)